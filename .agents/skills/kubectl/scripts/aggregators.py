@@ -0,0 +1,137 @@
+"""
+Single-pass pod aggregation for the kubectl skill scripts.
+
+fold() walks a stream of record pages (KubeFetcher.iter_pages) once and
+hands every pod to each aggregator, so the status summary, restart totals,
+threshold offenders and usage join of one list cost one fetch, one parse
+and one pass however many reports use them. An aggregator is any object
+with add(pod) and result(); the ones here cover what cluster_status.py,
+restart_monitor.py and metrics_exporter.py report.
+"""
+
+import heapq
+from typing import Iterable
+
+from k8s_ops import TRACER
+
+
+class PhaseCounts:
+    """Pods by phase: total, running, pending, failed and other."""
+
+    def __init__(self):
+        self.counts = {"total": 0, "running": 0, "pending": 0, "failed": 0, "other": 0}
+
+    def add(self, pod) -> None:
+        counts = self.counts
+        counts["total"] += 1
+        phase = pod.phase
+        if phase == "Running":
+            counts["running"] += 1
+        elif phase == "Pending":
+            counts["pending"] += 1
+        elif phase == "Failed":
+            counts["failed"] += 1
+        else:
+            counts["other"] += 1
+
+    def result(self) -> dict:
+        return dict(self.counts)
+
+
+class RestartTotal:
+    """Sum of container restarts over all pods."""
+
+    def __init__(self):
+        self.total = 0
+
+    def add(self, pod) -> None:
+        self.total += pod.restarts
+
+    def result(self) -> int:
+        return self.total
+
+
+class LastTermination:
+    """Latest container termination (epoch seconds) over all pods, or None."""
+
+    def __init__(self):
+        self.latest = None
+
+    def add(self, pod) -> None:
+        finished = pod.last_termination
+        if finished is not None and (self.latest is None or finished > self.latest):
+            self.latest = finished
+
+    def result(self):
+        return self.latest
+
+
+class RunningPods:
+    """The Running pods, in list order, for joins such as the usage report."""
+
+    def __init__(self):
+        self.pods = []
+
+    def add(self, pod) -> None:
+        if pod.phase == "Running":
+            self.pods.append(pod)
+
+    def result(self) -> list:
+        return self.pods
+
+
+class TopK:
+    """The `k` pods with the largest key(pod), largest first (all pods if k is 0).
+
+    Pods are kept in a heap bounded by k, so memory follows k rather than
+    the pod count; ties keep list order.
+    """
+
+    def __init__(self, k: int = 0, key=lambda pod: pod.restarts):
+        self.k = k
+        self.key = key
+        self.seen = 0
+        self.heap = []
+
+    def add(self, pod) -> None:
+        self.seen += 1
+        entry = (self.key(pod), -self.seen, pod)
+        if self.k and len(self.heap) >= self.k:
+            heapq.heappushpop(self.heap, entry)
+        else:
+            heapq.heappush(self.heap, entry)
+
+    def result(self) -> list:
+        return [pod for _, _, pod in sorted(self.heap, reverse=True)]
+
+
+class Offenders(TopK):
+    """Pods with `threshold` or more restarts: result() is (count, top-k pods)."""
+
+    def __init__(self, threshold: int, k: int = 0):
+        super().__init__(k)
+        self.threshold = threshold
+
+    def add(self, pod) -> None:
+        if pod.restarts >= self.threshold:
+            super().add(pod)
+
+    def result(self) -> tuple:
+        return self.seen, super().result()
+
+
+def fold(pages: Iterable[list], aggregators: dict, context: str = "",
+         resource: str = "pods") -> dict:
+    """Feed every item of every page to each aggregator in one pass.
+
+    Returns {name: aggregator.result()}. Errors raised by `pages` (e.g.
+    FetchError) propagate to the caller.
+    """
+    adders = [aggregator.add for aggregator in aggregators.values()]
+    for page in pages:
+        with TRACER.phase("aggregate", context, resource):
+            for item in page:
+                for add in adders:
+                    add(item)
+    with TRACER.phase("aggregate", context, resource):
+        return {name: aggregator.result() for name, aggregator in aggregators.items()}
@@ -0,0 +1,271 @@
+"""
+Benchmarks for the kubectl skill scripts against a fake kubectl.
+
+Requires pytest and pytest-benchmark. Run from the scripts directory:
+
+    python3 -m pytest bench/bench_k8s_ops.py \
+        --benchmark-json bench/results/$(date +%Y%m%d-%H%M%S).json
+
+and compare two saved runs offline with:
+
+    pytest-benchmark compare bench/results/A.json bench/results/B.json
+
+Environment:
+  BENCH_PODS     synthetic pod count (default: 10000; try 1000..200000)
+  BENCH_DATA     reuse a directory produced by gen_cluster.py instead of
+                 generating one per session
+  BENCH_LATENCY  FAKE_KUBECTL_LATENCY for every call (default: 0)
+  BENCH_ROUNDS   rounds per case (default: 5)
+
+Every round starts with an empty FETCHER cache so each case pays for its
+kubectl calls. Fetch modes: plain JSON, --projection and --chunk-size.
+The ApiBackend cases run against fake_apiserver.py over HTTP and, when
+openssl is installed, HTTPS, and check connection reuse, exec-credential
+caching and coalescing from the server's counters.
+Timings include the fake kubectl's own work (it re-reads the data file on
+every call), so compare modes against each other and runs against runs,
+not against a real cluster.
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import cluster_status  # noqa: E402
+import fake_apiserver  # noqa: E402
+import gen_cluster  # noqa: E402
+import k8s_ops  # noqa: E402
+import resource_usage  # noqa: E402
+import restart_monitor  # noqa: E402
+
+
+BENCH_PODS = int(os.environ.get("BENCH_PODS", "10000"))
+BENCH_LATENCY = os.environ.get("BENCH_LATENCY", "0")
+BENCH_ROUNDS = int(os.environ.get("BENCH_ROUNDS", "5"))
+
+PROD = k8s_ops.CLUSTERS["prod"]
+
+API_TOKEN = "bench-token"
+
+# Exec credential plugin for the ApiBackend cases; appends one "x" to
+# argv[1] per run so the cases can count how often it ran.
+EXEC_PLUGIN = (
+    "import json, sys\n"
+    "open(sys.argv[1], 'a').write('x')\n"
+    "print(json.dumps({'kind': 'ExecCredential', 'status': {"
+    f"'token': '{API_TOKEN}', 'expirationTimestamp': '2999-01-01T00:00:00Z'}}}}))\n"
+)
+
+FETCH_MODES = {
+    "json": {"chunk_size": 0, "projection": False},
+    "projection": {"chunk_size": 0, "projection": True},
+    "chunked": {"chunk_size": 500, "projection": False},
+}
+
+
+@pytest.fixture(scope="session")
+def cluster_data(tmp_path_factory):
+    if os.environ.get("BENCH_DATA"):
+        return os.environ["BENCH_DATA"]
+    out = str(tmp_path_factory.mktemp("cluster"))
+    args = gen_cluster.build_parser().parse_args([
+        "--out", out,
+        "--pods", str(BENCH_PODS),
+        "--deployments", str(max(1, BENCH_PODS // 50)),
+        "--nodes", str(max(1, BENCH_PODS // 100)),
+    ])
+    gen_cluster.generate(out, args)
+    return out
+
+
+@pytest.fixture(autouse=True)
+def fake_kubectl(cluster_data, monkeypatch):
+    monkeypatch.setenv("PATH", os.path.join(BENCH_DIR, "bin") + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_KUBECTL_DATA", cluster_data)
+    monkeypatch.setenv("FAKE_KUBECTL_LATENCY", BENCH_LATENCY)
+    monkeypatch.delenv("MDE_K8S_BACKEND", raising=False)
+    monkeypatch.delenv("MDE_K8S_MAX_AGE", raising=False)
+    k8s_ops.FETCHER.backend = k8s_ops.KubectlBackend()
+    k8s_ops.FETCHER.reset()
+    yield
+    k8s_ops.FETCHER.chunk_size = 0
+    k8s_ops.FETCHER.projection = False
+    k8s_ops.FETCHER.reset()
+
+
+@pytest.fixture(params=sorted(FETCH_MODES))
+def fetch_mode(request):
+    for name, value in FETCH_MODES[request.param].items():
+        setattr(k8s_ops.FETCHER, name, value)
+    return request.param
+
+
+@pytest.fixture(params=["http", "https"])
+def api_server(request, cluster_data, tmp_path):
+    cert = key = None
+    if request.param == "https":
+        if not shutil.which("openssl"):
+            pytest.skip("openssl is not installed")
+        cert, key = str(tmp_path / "server.crt"), str(tmp_path / "server.key")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                        "-keyout", key, "-out", cert], check=True, capture_output=True)
+    server = fake_apiserver.FakeApiServer(cluster_data, token=API_TOKEN, cert=cert, key=key).start()
+    yield server, cert
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api_backend(api_server, tmp_path):
+    """Point FETCHER at an ApiBackend whose every CLUSTERS context is the fake server."""
+    server, ca = api_server
+    calls = tmp_path / "exec-calls"
+    contexts = sorted({config["context"] for config in k8s_ops.CLUSTERS.values()})
+    clusters = []
+    for n, context in enumerate(contexts):
+        # A path prefix per context keeps their requests apart in server.requests.
+        cluster = {"server": f"{server.url}/cluster-{n}"}
+        if ca:
+            cluster["certificate-authority"] = ca
+        clusters.append({"name": f"cluster-{n}", "cluster": cluster})
+    kubeconfig = {
+        "_dir": str(tmp_path),
+        "clusters": clusters,
+        "users": [{"name": "bench", "user": {
+            "exec": {"command": sys.executable, "args": ["-c", EXEC_PLUGIN, str(calls)]},
+        }}],
+        "contexts": [{"name": context, "context": {"cluster": f"cluster-{n}", "user": "bench"}}
+                     for n, context in enumerate(contexts)],
+    }
+    backend = k8s_ops.FETCHER.backend = k8s_ops.ApiBackend(kubeconfig)
+    return backend, server, calls
+
+
+def run(benchmark, func, *args):
+    return benchmark.pedantic(func, args=args, setup=k8s_ops.FETCHER.reset,
+                              rounds=BENCH_ROUNDS, iterations=1)
+
+
+def test_get_pod_summary(benchmark, fetch_mode):
+    summary = run(benchmark, cluster_status.get_pod_summary, PROD["context"], PROD["namespace"])
+    assert "error" not in summary and summary["total"] > 0
+
+
+def test_get_deployment_summary(benchmark, fetch_mode):
+    summary = run(benchmark, cluster_status.get_deployment_summary, PROD["context"], PROD["namespace"])
+    assert "error" not in summary
+
+
+def test_get_node_summary(benchmark, fetch_mode):
+    summary = run(benchmark, cluster_status.get_node_summary, PROD["context"])
+    assert "error" not in summary
+
+
+def test_get_pods_with_restarts(benchmark, fetch_mode):
+    run(benchmark, restart_monitor.get_pods_with_restarts, PROD["context"], PROD["namespace"], 3)
+
+
+def test_cache_revalidate(benchmark, monkeypatch, tmp_path):
+    cache = k8s_ops.SnapshotCache(0, str(tmp_path))
+    monkeypatch.setattr(k8s_ops.FETCHER, "cache", cache)
+    monkeypatch.setattr(k8s_ops.TRACER, "enabled", True)
+    monkeypatch.setattr(k8s_ops.TRACER, "records", [])
+    key = (PROD["context"], PROD["namespace"], "pods", None)
+    items = k8s_ops.FETCHER.list_items(*key)
+    assert cache.load(key)["resource_version"]
+    # Every later round finds the snapshot stale and replays a watch from
+    # its resourceVersion instead of listing again.
+    assert len(run(benchmark, k8s_ops.FETCHER.list_items, *key)) == len(items)
+    fetches = [r for r in k8s_ops.TRACER.records if r["phase"] == "fetch"]
+    assert [r.get("revalidate", False) for r in fetches] == [False] + [True] * BENCH_ROUNDS
+
+
+def test_relist_pods(benchmark, cluster_data):
+    with open(os.path.join(cluster_data, f"pods.{PROD['namespace']}.json")) as handle:
+        expected = json.load(handle)["metadata"]["resourceVersion"]
+    table = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        resource_version = run(benchmark, restart_monitor.relist_pods, PROD, table, 3, True)
+    # The watch resumes from the server's list resourceVersion; from "" it
+    # would replay every pod as ADDED.
+    assert resource_version == expected
+    assert table
+
+
+def test_api_backend_list(benchmark, api_backend):
+    backend, server, calls = api_backend
+    document = run(benchmark, backend.list, PROD["context"], PROD["namespace"], "pods")
+    assert document["items"]
+    # One keep-alive connection and one exec-plugin run serve every round.
+    assert server.connections == 1
+    assert calls.read_text() == "x"
+
+
+def test_api_backend_scan(benchmark, api_backend):
+    backend, server, calls = api_backend
+    env_keys = list(k8s_ops.CLUSTERS)
+    for env_key in env_keys:
+        k8s_ops.FETCHER.plan(k8s_ops.CLUSTERS[env_key]["context"], [k8s_ops.CLUSTERS[env_key]["namespace"]])
+    results = run(benchmark, cluster_status.collect_cluster_status, env_keys)
+    for summaries in results.values():
+        assert not any("error" in summary for summary in summaries.values())
+    # Every distinct list is requested once per round, however many envs
+    # read it, and concurrent first requests share one credential.
+    assert set(server.requests.values()) == {BENCH_ROUNDS}
+    assert calls.read_text() == "x"
+
+
+@pytest.mark.parametrize("script,argv", [
+    (cluster_status, ["cluster_status.py", "--env", "all"]),
+    (restart_monitor, ["restart_monitor.py", "--env", "all"]),
+    (restart_monitor, ["restart_monitor.py", "--env", "all", "--with-events"]),
+    (cluster_status, ["cluster_status.py", "--env", "all", "--report", "status,restarts"]),
+    (cluster_status, ["cluster_status.py", "--env", "all", "--report", "status,usage"]),
+    (cluster_status, ["cluster_status.py", "--env", "all", "--report", "status,usage", "--chunk-size", "500"]),
+])
+def test_main(benchmark, monkeypatch, script, argv):
+    monkeypatch.setattr(sys, "argv", argv)
+
+    def quiet_main():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return script.main()
+
+    run(benchmark, quiet_main)
+
+
+def test_collect_logs(benchmark, monkeypatch, tmp_path):
+    monkeypatch.setattr(sys, "argv", ["restart_monitor.py", "--env", "prod", "--top", "50",
+                                      "--collect-logs", str(tmp_path), "--gzip"])
+
+    def quiet_main():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return restart_monitor.main()
+
+    run(benchmark, quiet_main)
+    assert (tmp_path / "index.json").exists()
+
+
+@pytest.mark.parametrize("vectorized", [False, True], ids=["python", "numpy"])
+def test_group_percentiles(benchmark, vectorized):
+    if vectorized and resource_usage.np is None:
+        pytest.skip("numpy is not installed")
+    rng = random.Random(0)
+    groups = [i % max(1, BENCH_PODS // 50) for i in range(BENCH_PODS)]
+    rows = [tuple(rng.random() for _ in resource_usage.USAGE_COLUMNS) for _ in groups]
+    result = benchmark.pedantic(resource_usage.group_percentiles, args=(groups, rows),
+                                kwargs={"vectorized": vectorized}, rounds=BENCH_ROUNDS, iterations=1)
+    assert result == resource_usage.group_percentiles(groups, rows, vectorized=False)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Fake Kubernetes API server for benchmarks.
+
+Serves the lists written by bench/gen_cluster.py over HTTP/1.1 keep-alive
+(HTTPS with --cert/--key) so k8s_ops.ApiBackend can run without a cluster.
+Usage: python3 fake_apiserver.py --data DIR [--port N] [--token TOKEN]
+
+Supports the calls ApiBackend makes:
+  GET /api/v1[/namespaces/NS]/{pods,events,nodes}
+  GET /apis/apps/v1[/namespaces/NS]/deployments
+  GET /apis/metrics.k8s.io/v1beta1[/namespaces/NS]/{pods,nodes}
+      with ?limit=N&continue=TOKEN pages, and ?watch=1 (empty stream)
+
+With a token set, requests without `Authorization: Bearer TOKEN` get 401.
+The server counts connections and requests per path (`connections`,
+`requests`) so a caller can check connection reuse and coalescing.
+"""
+
+import argparse
+import json
+import os
+import ssl
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def resource_for(path: str) -> tuple:
+    """Return (data file resource, namespace or None) for a list path."""
+    segments = path.strip("/").split("/")
+    namespace = segments[segments.index("namespaces") + 1] if "namespaces" in segments else None
+    resource = segments[-1]
+    if "metrics.k8s.io" in segments:
+        resource += ".metrics.k8s.io"
+    if resource.startswith("nodes"):
+        namespace = None
+    return resource, namespace
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        with self.server.lock:
+            self.server.requests[parts.path] += 1
+        if self.server.token and self.headers.get("Authorization") != f"Bearer {self.server.token}":
+            return self.reply(401, {"kind": "Status", "code": 401, "message": "Unauthorized"})
+        query = parse_qs(parts.query)
+        if query.get("watch"):
+            return self.reply(200, None)
+        items = self.server.load_items(*resource_for(parts.path))
+        start = int(query.get("continue", ["0"])[0])
+        limit = int(query.get("limit", [str(len(items) or 1)])[0])
+        metadata = {"resourceVersion": "1000"}
+        if start + limit < len(items):
+            metadata["continue"] = str(start + limit)
+        self.reply(200, {"kind": "List", "metadata": metadata, "items": items[start:start + limit]})
+
+    def reply(self, status: int, document) -> None:
+        body = b"" if document is None else json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer over a gen_cluster.py data directory."""
+
+    daemon_threads = True
+
+    def __init__(self, data: str, port: int = 0, token: str = "",
+                 cert: str = None, key: str = None):
+        super().__init__(("127.0.0.1", port), FakeApiHandler)
+        self.data = data
+        self.token = token
+        self.scheme = "http"
+        if cert and key:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert, key)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+            self.scheme = "https"
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = Counter()
+        self._lists = {}
+
+    @property
+    def url(self) -> str:
+        return f"{self.scheme}://127.0.0.1:{self.server_address[1]}"
+
+    def load_items(self, resource: str, namespace) -> list:
+        name = f"{resource}.json" if namespace is None else f"{resource}.{namespace}.json"
+        with self.lock:
+            if name not in self._lists:
+                try:
+                    with open(os.path.join(self.data, name)) as handle:
+                        self._lists[name] = json.load(handle)["items"]
+                except FileNotFoundError:
+                    self._lists[name] = []
+            return self._lists[name]
+
+    def start(self) -> "FakeApiServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Kubernetes API server")
+    parser.add_argument("--data", required=True, help="Directory written by gen_cluster.py")
+    parser.add_argument("--port", type=int, default=8001, help="Port on 127.0.0.1 (default: 8001)")
+    parser.add_argument("--token", default="", help="Bearer token to require (default: none)")
+    parser.add_argument("--cert", help="Serve HTTPS with this certificate (PEM)")
+    parser.add_argument("--key", help="Private key for --cert (PEM)")
+    args = parser.parse_args()
+
+    server = FakeApiServer(args.data, args.port, args.token, args.cert, args.key)
+    print(f"Serving {args.data} on {server.url} (Ctrl-C to stop)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
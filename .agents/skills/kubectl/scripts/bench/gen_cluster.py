@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Synthetic Cluster Generator
+
+Writes pod, deployment, node and event lists shaped like `kubectl get -o json`
+output for benchmarking the kubectl skill scripts without a live cluster.
+Usage: python3 gen_cluster.py --out DIR [--pods N] [--restarts DIST]
+
+Files written to DIR (served by bench/bin/kubectl):
+  pods.json, deployments.json, nodes.json, events.json   all namespaces
+  pods.<ns>.json, deployments.<ns>.json, events.<ns>.json one namespace each
+  pods.metrics.k8s.io[.<ns>].json, nodes.metrics.k8s.io.json
+                                                         metrics API usage
+
+Pods that restarted get Warning events (BackOff, Unhealthy, ...) and every
+tenth pod a Normal one, so event lookups have realistic noise to skip.
+
+Running pods get usage metrics drawn around their requests: some
+deployments idle well below them, a few run up to their limits.
+
+Restart distributions:
+  pareto    heavy tail: most pods 0, a few with hundreds (default)
+  uniform   0..--max-restarts
+  none      every restartCount is 0
+"""
+
+import argparse
+import json
+import os
+import random
+import zlib
+from datetime import datetime, timedelta, timezone
+
+
+PHASES = (("Running", 0.90), ("Pending", 0.04), ("Succeeded", 0.04), ("Failed", 0.02))
+
+
+def restart_count(rng: random.Random, dist: str, max_restarts: int) -> int:
+    """Draw one container restartCount."""
+    if dist == "none":
+        return 0
+    if dist == "uniform":
+        return rng.randint(0, max_restarts)
+    return min(max_restarts, int(rng.paretovariate(1.2)) - 1)
+
+
+def iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+WARNINGS = (
+    ("BackOff", "Back-off restarting failed container {container} in pod {pod}"),
+    ("Unhealthy", "Liveness probe failed: HTTP probe failed with statuscode: 503"),
+    ("Failed", "Error: ImagePullBackOff"),
+)
+
+
+def make_events(rng: random.Random, pod: dict, now: datetime) -> list:
+    """Build the events a pod would have: warnings if it restarted, sometimes a Normal one."""
+    metadata = pod["metadata"]
+    involved = {"kind": "Pod", "namespace": metadata["namespace"], "name": metadata["name"],
+                "uid": metadata["uid"]}
+    restarting = [cs for cs in pod["status"]["containerStatuses"] if cs["restartCount"]]
+    kinds = []
+    for cs in restarting:
+        kinds += [("Warning",) + rng.choice(WARNINGS) + (cs["name"], cs["restartCount"])]
+    if rng.random() < 0.1:
+        kinds.append(("Normal", "Pulled", "Container image already present on machine", "c0", 1))
+    events = []
+    for n, (kind, reason, message, container, count) in enumerate(kinds):
+        seen = now - timedelta(minutes=rng.randint(1, 55))
+        events.append({
+            "apiVersion": "v1",
+            "kind": "Event",
+            "metadata": {"name": f"{metadata['name']}.{n:x}", "namespace": metadata["namespace"]},
+            "involvedObject": involved,
+            "type": kind,
+            "reason": reason,
+            "message": message.format(container=container, pod=metadata["name"]),
+            "count": count,
+            "firstTimestamp": iso(seen - timedelta(minutes=count)),
+            "lastTimestamp": iso(seen),
+        })
+    return events
+
+
+def make_pod_metrics(rng: random.Random, pod: dict, now: datetime) -> dict:
+    """Build the PodMetrics object `kubectl top pods` would read for a running pod.
+
+    Load is a per-deployment multiple of the requests, so some workloads
+    idle and a few run into their limits (usage never exceeds a limit).
+    """
+    deployment = pod["metadata"]["labels"]["app"]
+    load = random.Random(zlib.crc32(deployment.encode())).choice((0.05, 0.1, 0.4, 0.7, 1.0, 3.0))
+    containers = []
+    for container in pod["spec"]["containers"]:
+        requests, limits = container["resources"]["requests"], container["resources"]["limits"]
+        cpu = min(int(requests["cpu"].rstrip("m")) * load * rng.uniform(0.5, 1.5),
+                  int(limits["cpu"].rstrip("m")))
+        memory = min(int(requests["memory"].rstrip("Mi")) * load * rng.uniform(0.8, 1.2),
+                     int(limits["memory"].rstrip("Mi")))
+        containers.append({"name": container["name"],
+                           "usage": {"cpu": f"{int(cpu * 1e6)}n", "memory": f"{int(memory * 1024)}Ki"}})
+    return {
+        "kind": "PodMetrics",
+        "apiVersion": "metrics.k8s.io/v1beta1",
+        "metadata": {"name": pod["metadata"]["name"], "namespace": pod["metadata"]["namespace"]},
+        "timestamp": iso(now),
+        "window": "15s",
+        "containers": containers,
+    }
+
+
+def make_pod(rng: random.Random, index: int, namespace: str, deployment: str,
+             now: datetime, args) -> dict:
+    """Build one pod; --payload realistic adds the bulk real pods carry."""
+    template_hash = f"{zlib.crc32(deployment.encode()):08x}"
+    name = f"{deployment}-{template_hash}-{index:05x}"
+    phase = rng.choices([p for p, _ in PHASES], [w for _, w in PHASES])[0]
+    crashlooping = rng.random() < args.crashloop_fraction
+
+    statuses = []
+    containers = []
+    for c in range(rng.randint(1, args.max_containers)):
+        restarts = restart_count(rng, args.restarts, args.max_restarts)
+        if crashlooping:
+            restarts = max(restarts, rng.randint(10, max(10, args.max_restarts)))
+        status = {
+            "name": f"c{c}",
+            "ready": phase == "Running" and not crashlooping,
+            "restartCount": restarts,
+            "image": f"registry.example.com/{deployment}:1.{c}",
+            "state": {"running": {"startedAt": iso(now - timedelta(minutes=rng.randint(1, 600)))}},
+            "lastState": {},
+        }
+        if restarts:
+            age = timedelta(minutes=rng.randint(1, 30)) if crashlooping else \
+                timedelta(hours=rng.uniform(0, args.max_age_hours))
+            status["lastState"] = {"terminated": {
+                "exitCode": rng.choice((1, 137, 143)),
+                "reason": rng.choice(("Error", "OOMKilled", "Completed")),
+                "finishedAt": iso(now - age),
+            }}
+            if rng.random() < 0.1:
+                # The API omits reason for some terminations (e.g. a killed runtime).
+                del status["lastState"]["terminated"]["reason"]
+        statuses.append(status)
+        containers.append({
+            "name": f"c{c}",
+            "image": status["image"],
+            "resources": {
+                "requests": {"cpu": f"{rng.choice((50, 100, 250, 500))}m",
+                             "memory": f"{rng.choice((64, 128, 256, 512))}Mi"},
+                "limits": {"cpu": f"{rng.choice((500, 1000, 2000))}m",
+                           "memory": f"{rng.choice((256, 512, 1024))}Mi"},
+            },
+        })
+
+    pod = {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {
+            "name": name,
+            "namespace": namespace,
+            "uid": f"{index:08x}-0000-4000-8000-{rng.getrandbits(48):012x}",
+            "resourceVersion": str(1000 + index),
+            "labels": {"app": deployment, "pod-template-hash": template_hash},
+            "ownerReferences": [{"apiVersion": "apps/v1", "kind": "ReplicaSet",
+                                 "name": f"{deployment}-{template_hash}", "controller": True}],
+        },
+        "spec": {"containers": containers, "nodeName": f"node-{index % max(1, args.nodes)}"},
+        "status": {"phase": phase, "containerStatuses": statuses},
+    }
+    if index % 20 == 0:
+        # A non-controller reference ahead of the controller (e.g. from a
+        # policy engine) must not decide the pod's workload.
+        pod["metadata"]["ownerReferences"].insert(0, {
+            "apiVersion": "example.com/v1", "kind": "Policy", "name": f"policy-{namespace}",
+        })
+    if args.payload == "realistic":
+        for container in containers:
+            container["env"] = [{"name": f"ENV_{k}", "value": "x" * 24} for k in range(20)]
+            container["volumeMounts"] = [{"name": f"vol{k}", "mountPath": f"/mnt/{k}"} for k in range(4)]
+        pod["spec"]["volumes"] = [{"name": f"vol{k}", "configMap": {"name": f"cm-{k}"}} for k in range(4)]
+        pod["metadata"]["managedFields"] = [{
+            "manager": "kube-controller-manager",
+            "operation": "Update",
+            "fieldsV1": {f"f:field{k}": {} for k in range(30)},
+        }]
+    return pod
+
+
+def generate(out_dir: str, args) -> dict:
+    """Write the synthetic lists and return counts per resource."""
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    namespaces = args.namespaces.split(",")
+    os.makedirs(out_dir, exist_ok=True)
+
+    deployments = []
+    for d in range(args.deployments):
+        namespace = namespaces[d % len(namespaces)]
+        replicas = rng.randint(1, 5)
+        roll = rng.random()
+        available = replicas if roll < 0.85 else (rng.randint(1, replicas) if roll < 0.95 else 0)
+        deployments.append({
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "metadata": {"name": f"svc-{d:04d}", "namespace": namespace},
+            "spec": {"replicas": replicas},
+            "status": {"availableReplicas": available} if available else {},
+        })
+
+    pods = [
+        make_pod(rng, i, deployments[i % len(deployments)]["metadata"]["namespace"],
+                 deployments[i % len(deployments)]["metadata"]["name"], now, args)
+        for i in range(args.pods)
+    ]
+
+    events = [event for pod in pods for event in make_events(rng, pod, now)]
+
+    nodes = [{
+        "apiVersion": "v1",
+        "kind": "Node",
+        "metadata": {"name": f"node-{n}"},
+        "status": {
+            "allocatable": {"cpu": "7910m", "memory": "31792920Ki", "pods": "110"},
+            "conditions": [
+                {"type": "MemoryPressure", "status": "False"},
+                {"type": "Ready", "status": "True" if rng.random() > 0.05 else "False"},
+            ],
+        },
+    } for n in range(args.nodes)]
+
+    pod_metrics = [make_pod_metrics(rng, pod, now) for pod in pods if pod["status"]["phase"] == "Running"]
+    node_metrics = [{
+        "kind": "NodeMetrics",
+        "apiVersion": "metrics.k8s.io/v1beta1",
+        "metadata": {"name": node["metadata"]["name"]},
+        "timestamp": iso(now),
+        "window": "20s",
+        "usage": {"cpu": f"{rng.randint(200, 7500)}m", "memory": f"{rng.randint(2, 30)}Gi"},
+    } for node in nodes]
+
+    for resource, items in (("pods", pods), ("deployments", deployments), ("nodes", nodes),
+                            ("events", events), ("pods.metrics.k8s.io", pod_metrics),
+                            ("nodes.metrics.k8s.io", node_metrics)):
+        write_list(os.path.join(out_dir, f"{resource}.json"), items)
+        if not resource.startswith("nodes"):
+            for namespace in namespaces:
+                write_list(
+                    os.path.join(out_dir, f"{resource}.{namespace}.json"),
+                    [item for item in items if item["metadata"]["namespace"] == namespace],
+                )
+    return {"pods": len(pods), "deployments": len(deployments), "nodes": len(nodes),
+            "events": len(events), "pod_metrics": len(pod_metrics)}
+
+
+def write_list(path: str, items: list) -> None:
+    with open(path, "w") as handle:
+        json.dump({
+            "apiVersion": "v1",
+            "kind": "List",
+            "metadata": {"resourceVersion": str(1000 + len(items))},
+            "items": items,
+        }, handle)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Synthetic Cluster Generator")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--pods", type=int, default=10000, help="Pod count (default: 10000)")
+    parser.add_argument("--deployments", type=int, default=200, help="Deployment count (default: 200)")
+    parser.add_argument("--nodes", type=int, default=50, help="Node count (default: 50)")
+    parser.add_argument("--namespaces", default="production,staging,simplex",
+                        help="Comma-separated namespaces (default: production,staging,simplex)")
+    parser.add_argument("--restarts", choices=["pareto", "uniform", "none"], default="pareto",
+                        help="restartCount distribution (default: pareto)")
+    parser.add_argument("--max-restarts", type=int, default=500, help="restartCount cap (default: 500)")
+    parser.add_argument("--crashloop-fraction", type=float, default=0.01,
+                        help="Fraction of pods restarting right now (default: 0.01)")
+    parser.add_argument("--max-age-hours", type=float, default=24 * 30,
+                        help="Oldest lastState.terminated.finishedAt (default: 720)")
+    parser.add_argument("--max-containers", type=int, default=2, help="Containers per pod, max (default: 2)")
+    parser.add_argument("--payload", choices=["realistic", "slim"], default="realistic",
+                        help="Include env/volumes/managedFields bulk (default: realistic)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    counts = generate(args.out, args)
+    print(f"✅ Wrote {counts['pods']} pods, {counts['deployments']} deployments, "
+          f"{counts['nodes']} nodes, {counts['events']} events to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
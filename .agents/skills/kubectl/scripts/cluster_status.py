@@ -3,238 +3,342 @@
 Kubernetes Cluster Status Summary
 
 Generates a quick overview of cluster health across all environments.
-Usage: python3 cluster_status.py [--env ENV]
+Usage: python3 cluster_status.py [--env ENV | --contexts GLOB] [--report REPORTS]
+       python3 cluster_status.py --daemon | --client
 
 ENV options: all, prod, staging, local (default: all)
+Run with --help for the fetch, cache, profiling and daemon options.
 """
 
-import subprocess
-import json
-import argparse
-from typing import Optional
-
-
-# Cluster configurations matching shell aliases
-CLUSTERS = {
-    "prod": {
-        "name": "Production (k1)",
-        "context": "arn:aws:eks:us-east-1:830101142436:cluster/production",
-        "namespace": "production",
-        "alias": "k1"
-    },
-    "staging": {
-        "name": "Staging (k2)",
-        "context": "arn:aws:eks:us-east-1:830101142436:cluster/production",
-        "namespace": "staging",
-        "alias": "k2"
-    },
-    "local": {
-        "name": "Local K3s (k)",
-        "context": "k3s-117",
-        "namespace": "simplex",
-        "alias": "k"
-    }
-}
-
-
-def run_kubectl(context: str, namespace: str, args: list) -> Optional[str]:
-    """Execute kubectl command and return output."""
-    cmd = ["kubectl", f"--context={context}", f"-n={namespace}"] + args
+import sys
+
+from status_client import (
+    DAEMON_READY_TIMEOUT,
+    DAEMON_SOCKET,
+    TIMED_OUT,
+    client_requested,
+    main as client_main,
+    print_report,
+)
+
+if __name__ == "__main__" and client_requested(sys.argv[1:]):
+    # Answer from the daemon before importing the fetch stack below.
+    sys.exit(client_main())
+
+import json  # noqa: E402
+import argparse  # noqa: E402
+import signal  # noqa: E402
+from functools import partial  # noqa: E402
+from typing import Optional  # noqa: E402
+
+from k8s_ops import (  # noqa: E402
+    CLUSTERS,
+    DEADLINES,
+    FETCHER,
+    TRACER,
+    BackgroundRefresher,
+    NODE_METRICS,
+    POD_METRICS,
+    ClusterTimeout,
+    FetchError,
+    add_common_arguments,
+    apply_common_arguments,
+    report_profile,
+    run_scan,
+    serve_status,
+)
+from aggregators import Offenders, PhaseCounts, RestartTotal, RunningPods, fold  # noqa: E402
+from resource_usage import USAGE_TOP, print_usage_report, summarize_usage  # noqa: E402
+from restart_monitor import print_environment, print_restart_report  # noqa: E402
+
+
+def get_pod_reports(context: str, namespace: str, restarts: Optional[tuple] = None,
+                    usage: bool = False) -> dict:
+    """Fold the pod list once into every pod report that was asked for.
+
+    Always builds the status summary; with restarts=(threshold, top) the
+    same pass also selects restart offenders for restart_monitor's report,
+    and with `usage` it keeps the running pods for get_usage_summary().
+    Returns {"pods": summary, "restarts": (count, pods) or None, "usage":
+    summary or None}, where None means not requested or timed out.
+    """
+    aggregators = {"phases": PhaseCounts(), "restarts": RestartTotal()}
+    if restarts:
+        aggregators["offenders"] = Offenders(*restarts)
+    if usage:
+        aggregators["running"] = RunningPods()
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        if result.returncode == 0:
-            return result.stdout
-        return None
-    except (subprocess.TimeoutExpired, Exception):
-        return None
+        result = fold(FETCHER.iter_pages(context, namespace, "pods"), aggregators, context)
+    except ClusterTimeout:
+        return {"pods": TIMED_OUT, "restarts": None, "usage": None}
+    except FetchError:
+        error = {"error": "Unable to fetch pods"}
+        return {"pods": error, "restarts": (0, []) if restarts else None, "usage": usage and error}
+    except json.JSONDecodeError:
+        error = {"error": "Invalid JSON response"}
+        return {"pods": error, "restarts": (0, []) if restarts else None, "usage": usage and error}
+    return {
+        "pods": {**result["phases"], "restarts": result["restarts"]},
+        "restarts": result.get("offenders"),
+        "usage": get_usage_summary(context, namespace, result["running"]) if usage else None,
+    }
 
 
 def get_pod_summary(context: str, namespace: str) -> dict:
-    """Get pod status summary."""
-    output = run_kubectl(context, namespace, [
-        "get", "pods", "-o", "json"
-    ])
-
-    if not output:
-        return {"error": "Unable to fetch pods"}
-
-    try:
-        data = json.loads(output)
-        pods = data.get("items", [])
-
-        summary = {
-            "total": len(pods),
-            "running": 0,
-            "pending": 0,
-            "failed": 0,
-            "other": 0,
-            "restarts": 0
-        }
-
-        for pod in pods:
-            phase = pod.get("status", {}).get("phase", "Unknown")
-            if phase == "Running":
-                summary["running"] += 1
-            elif phase == "Pending":
-                summary["pending"] += 1
-            elif phase == "Failed":
-                summary["failed"] += 1
-            else:
-                summary["other"] += 1
-
-            # Count restarts
-            for cs in pod.get("status", {}).get("containerStatuses", []):
-                summary["restarts"] += cs.get("restartCount", 0)
-
-        return summary
-    except json.JSONDecodeError:
-        return {"error": "Invalid JSON response"}
+    """Get pod status summary, folding one page of pods at a time."""
+    return get_pod_reports(context, namespace)["pods"]
 
 
 def get_deployment_summary(context: str, namespace: str) -> dict:
     """Get deployment status summary."""
-    output = run_kubectl(context, namespace, [
-        "get", "deployments", "-o", "json"
-    ])
-
-    if not output:
-        return {"error": "Unable to fetch deployments"}
+    summary = {
+        "total": 0,
+        "ready": 0,
+        "progressing": 0,
+        "degraded": 0
+    }
 
     try:
-        data = json.loads(output)
-        deployments = data.get("items", [])
-
-        summary = {
-            "total": len(deployments),
-            "ready": 0,
-            "progressing": 0,
-            "degraded": 0
-        }
-
-        for deploy in deployments:
-            desired = deploy.get("spec", {}).get("replicas", 0)
-            available = deploy.get("status", {}).get("availableReplicas", 0)
-
-            if available == desired:
-                summary["ready"] += 1
-            elif available > 0:
-                summary["progressing"] += 1
-            else:
-                summary["degraded"] += 1
+        for deployments in FETCHER.iter_pages(context, namespace, "deployments"):
+            with TRACER.phase("aggregate", context, "deployments"):
+                summary["total"] += len(deployments)
+                for deploy in deployments:
+                    available = deploy.available
+
+                    if available == deploy.replicas:
+                        summary["ready"] += 1
+                    elif available > 0:
+                        summary["progressing"] += 1
+                    else:
+                        summary["degraded"] += 1
 
         return summary
+    except ClusterTimeout:
+        return TIMED_OUT
+    except FetchError:
+        return {"error": "Unable to fetch deployments"}
     except json.JSONDecodeError:
         return {"error": "Invalid JSON response"}
 
 
 def get_node_summary(context: str) -> dict:
     """Get node status summary (cluster-wide, not namespace-scoped)."""
-    cmd = ["kubectl", f"--context={context}", "get", "nodes", "-o", "json"]
+    summary = {
+        "total": 0,
+        "ready": 0,
+        "not_ready": 0
+    }
+
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        if result.returncode != 0:
-            return {"error": "Unable to fetch nodes"}
+        for nodes in FETCHER.iter_pages(context, None, "nodes"):
+            with TRACER.phase("aggregate", context, "nodes"):
+                summary["total"] += len(nodes)
+                for node in nodes:
+                    if node.ready:
+                        summary["ready"] += 1
+                    else:
+                        summary["not_ready"] += 1
+
+        return summary
+    except ClusterTimeout:
+        return TIMED_OUT
+    except (json.JSONDecodeError, Exception):
+        return {"error": "Unable to fetch nodes"}
+
 
-        data = json.loads(result.stdout)
-        nodes = data.get("items", [])
+def get_usage_summary(context: str, namespace: str, pods: list) -> dict:
+    """Get resource usage against requests/limits (resource_usage.summarize_usage).
 
-        summary = {
-            "total": len(nodes),
-            "ready": 0,
-            "not_ready": 0
+    `pods` are the running pods get_pod_reports() kept from its pass, so the
+    pod list is not fetched again; the node list is the one the node
+    summary uses, so it is coalesced with that.
+    """
+    try:
+        pod_usage = FETCHER.list_items(context, namespace, POD_METRICS)
+        node_usage = FETCHER.list_items(context, None, NODE_METRICS)
+        nodes = FETCHER.list_items(context, None, "nodes")
+    except json.JSONDecodeError:
+        return {"error": "Invalid JSON response"}
+    if DEADLINES.expired(context):
+        return TIMED_OUT
+    if pod_usage is None:
+        return {"error": "Metrics API unavailable (is metrics-server installed?)"}
+    with TRACER.phase("aggregate", context, "usage"):
+        return summarize_usage(pods, pod_usage, nodes, node_usage)
+
+
+def collect_cluster_status(env_keys: list, concurrency: int = 8,
+                           restarts: Optional[tuple] = None, usage: bool = False) -> dict:
+    """Fetch pod, deployment and node summaries for every env concurrently.
+
+    Returns {env_key: {"pods": ..., "deployments": ..., "nodes": ...}};
+    summaries not finished within the --budget are TIMED_OUT. With
+    restarts=(threshold, top) each env also gets "restarts", the
+    get_restart_offenders()-style result from the same pod pass, and with
+    `usage` it gets "usage", the get_usage_summary() result joined from
+    that pass too.
+    """
+    tasks = {}
+    for env_key in env_keys:
+        config = CLUSTERS[env_key]
+        tasks[env_key, "pods"] = partial(get_pod_reports, config['context'], config['namespace'],
+                                         restarts, usage)
+        tasks[env_key, "deployments"] = partial(get_deployment_summary, config['context'], config['namespace'])
+        tasks[env_key, "nodes"] = partial(get_node_summary, config['context'])
+    results = run_scan(tasks, concurrency)
+    status = {}
+    for env_key in env_keys:
+        pods = results[env_key, "pods"] or {"pods": TIMED_OUT, "restarts": None, "usage": None}
+        status[env_key] = {
+            "pods": pods["pods"],
+            "deployments": results[env_key, "deployments"] or TIMED_OUT,
+            "nodes": results[env_key, "nodes"] or TIMED_OUT,
+        }
+        if restarts:
+            status[env_key]["restarts"] = pods["restarts"]
+        if usage:
+            status[env_key]["usage"] = pods["usage"] or TIMED_OUT
+    return status
+
+
+def run_daemon(args, env_keys: list) -> int:
+    """Refresh status in the background and serve it on args.socket."""
+    def collect():
+        DEADLINES.configure(args.cluster_timeout, args.budget)
+        return collect_cluster_status(env_keys, args.concurrency)
+
+    refresher = BackgroundRefresher(collect, args.interval).start()
+
+    def answer(request: dict) -> dict:
+        results, refreshed = refresher.latest(DAEMON_READY_TIMEOUT)
+        if results is None:
+            return {"error": "first refresh still running"}
+        env = request.get("env", "all")
+        keys = [key for key in env_keys if env in ("all", key, CLUSTERS[key]["context"])]
+        if not keys:
+            return {"error": f"not scanning {env} (scanning: {', '.join(env_keys)})"}
+        return {
+            "refreshed": refreshed,
+            "env_keys": keys,
+            "clusters": {key: CLUSTERS[key] for key in keys},
+            "results": {key: results[key] for key in keys},
         }
 
-        for node in nodes:
-            conditions = node.get("status", {}).get("conditions", [])
-            is_ready = any(
-                c.get("type") == "Ready" and c.get("status") == "True"
-                for c in conditions
-            )
-            if is_ready:
-                summary["ready"] += 1
-            else:
-                summary["not_ready"] += 1
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        serve_status(args.socket, answer, f"🛰️  Serving cluster status on {args.socket} "
+                                          f"(refresh every {args.interval:g}s, Ctrl-C to stop)")
+    except KeyboardInterrupt:
+        pass
+    return 0
 
-        return summary
-    except (subprocess.TimeoutExpired, json.JSONDecodeError, Exception):
-        return {"error": "Unable to fetch nodes"}
+
+REPORTS = ("status", "restarts", "usage")
 
 
-def print_cluster_status(env_key: str, config: dict):
-    """Print status for a single cluster."""
-    print(f"\n{'='*60}")
-    print(f"📍 {config['name']}")
-    print(f"   Context: {config['context']}")
-    print(f"   Namespace: {config['namespace']}")
-    print(f"{'='*60}")
-
-    # Pods
-    pods = get_pod_summary(config['context'], config['namespace'])
-    if "error" in pods:
-        print(f"\n🔴 Pods: {pods['error']}")
-    else:
-        status_icon = "🟢" if pods['failed'] == 0 and pods['pending'] == 0 else "🟡"
-        if pods['failed'] > 0:
-            status_icon = "🔴"
-        print(f"\n{status_icon} Pods: {pods['running']}/{pods['total']} running")
-        if pods['pending'] > 0:
-            print(f"   ⏳ Pending: {pods['pending']}")
-        if pods['failed'] > 0:
-            print(f"   ❌ Failed: {pods['failed']}")
-        if pods['restarts'] > 0:
-            print(f"   🔄 Total restarts: {pods['restarts']}")
-
-    # Deployments
-    deploys = get_deployment_summary(config['context'], config['namespace'])
-    if "error" in deploys:
-        print(f"\n🔴 Deployments: {deploys['error']}")
-    else:
-        status_icon = "🟢" if deploys['degraded'] == 0 else "🔴"
-        print(f"\n{status_icon} Deployments: {deploys['ready']}/{deploys['total']} ready")
-        if deploys['progressing'] > 0:
-            print(f"   🔄 Progressing: {deploys['progressing']}")
-        if deploys['degraded'] > 0:
-            print(f"   ❌ Degraded: {deploys['degraded']}")
-
-    # Nodes (only show once per unique context)
-    nodes = get_node_summary(config['context'])
-    if "error" not in nodes:
-        status_icon = "🟢" if nodes['not_ready'] == 0 else "🔴"
-        print(f"\n{status_icon} Nodes: {nodes['ready']}/{nodes['total']} ready")
+def parse_reports(value: str) -> list:
+    reports = [part.strip() for part in value.split(",") if part.strip()]
+    unknown = sorted(set(reports) - set(REPORTS))
+    if unknown or not reports:
+        raise argparse.ArgumentTypeError(f"choose from {', '.join(REPORTS)}")
+    return reports
 
 
 def main():
     parser = argparse.ArgumentParser(description="Kubernetes Cluster Status Summary")
+    add_common_arguments(parser)
+    parser.add_argument(
+        "--report",
+        type=parse_reports,
+        default=["status"],
+        metavar="status,restarts,usage",
+        help=("Reports to print from one scan: status, restarts (restart_monitor.py's report) "
+              "and usage; one pod list feeds them all (default: status)")
+    )
     parser.add_argument(
-        "--env", "-e",
-        choices=["all", "prod", "staging", "local"],
-        default="all",
-        help="Environment to check (default: all)"
+        "--threshold", "-t",
+        type=int,
+        default=3,
+        help="restarts report: list pods with N or more restarts (default: 3)"
     )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=0,
+        help="restarts report: show only the N pods with the most restarts (default: all)"
+    )
+    parser.add_argument(
+        "--usage",
+        action="store_true",
+        help=("Also print CPU/memory usage per workload against requests and limits "
+              "(same as adding usage to --report; needs metrics-server)")
+    )
+    parser.add_argument(
+        "--usage-top",
+        type=int,
+        default=USAGE_TOP,
+        help=f"usage report: show at most N workloads per list (default: {USAGE_TOP}, 0 = all)"
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Refresh in the background and serve reports on --socket"
+    )
+    mode.add_argument(
+        "--client",
+        action="store_true",
+        help=("Print the report from a running --daemon's latest state without touching the cluster "
+              "(takes only --env and --socket; --env may name any env or context the daemon scans)")
+    )
+    parser.add_argument(
+        "--socket",
+        default=DAEMON_SOCKET,
+        help="Unix socket of the status daemon (default: $MDE_K8S_SOCKET or the k8s cache dir)"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=30,
+        help="Seconds between daemon refreshes (default: 30)"
+    )
+    if client_requested(sys.argv[1:]):
+        return client_main()
     args = parser.parse_args()
-
-    print("🔍 Kubernetes Cluster Status Report")
-    print(f"{'='*60}")
-
-    if args.env == "all":
-        for env_key, config in CLUSTERS.items():
-            print_cluster_status(env_key, config)
-    else:
-        config = CLUSTERS.get(args.env)
-        if config:
-            print_cluster_status(args.env, config)
-        else:
-            print(f"Unknown environment: {args.env}")
-            return 1
-
-    print(f"\n{'='*60}")
-    print("✅ Status check complete")
-    return 0
+    if args.usage and "usage" not in args.report:
+        args.report.append("usage")
+    if args.daemon and args.report != ["status"]:
+        parser.error("--daemon only serves the status report")
+    env_keys = apply_common_arguments(args)
+    if args.daemon:
+        return run_daemon(args, env_keys)
+
+    with_restarts = "restarts" in args.report
+    with_usage = "usage" in args.report
+    results = collect_cluster_status(
+        env_keys, args.concurrency, (args.threshold, args.top) if with_restarts else None,
+        with_usage,
+    )
+    healthy = True
+    if "status" in args.report:
+        print_report(env_keys, CLUSTERS, results)
+    if with_restarts:
+        if "status" in args.report:
+            print()
+        print("🔄 Pod Restart Monitor")
+        print(f"   Threshold: {args.threshold}+ restarts")
+        print("=" * 50)
+        healthy = print_restart_report(
+            env_keys, CLUSTERS, {key: results[key]["restarts"] for key in env_keys},
+            partial(print_environment, threshold=args.threshold),
+        )
+    if with_usage:
+        if "status" in args.report or with_restarts:
+            print()
+        print_usage_report(env_keys, CLUSTERS, {key: results[key]["usage"] for key in env_keys},
+                           args.usage_top)
+    report_profile(args)
+    return 0 if healthy else 1
 
 
 if __name__ == "__main__":
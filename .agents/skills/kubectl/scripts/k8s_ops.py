@@ -0,0 +1,2123 @@
+"""
+Shared kubectl helpers for the kubectl skill scripts.
+
+Holds the CLUSTERS table, run_kubectl, the list backends, the per-run
+fetch layer and the instrumentation used by cluster_status.py,
+restart_monitor.py and metrics_exporter.py.
+
+KubeFetcher is a per-run fetch layer: identical list requests, keyed by
+(context, namespace, resource, selector), are coalesced into one backend
+call, and namespaced resources for every namespace planned on a context are
+listed once across all namespaces and partitioned locally.
+
+Two backends are available:
+  KubectlBackend  shells out to `kubectl get --raw` for every list
+                  (default), keeping the server's list resourceVersion;
+                  stdout streams through an asyncio subprocess into
+                  JsonItemParser, converting each item as it arrives
+  ApiBackend      talks to the API server in-process, reusing keep-alive
+                  connections and caching exec-plugin credentials
+
+Targets are the CLUSTERS table or, with --contexts, kubeconfig contexts
+matched by glob (discover_clusters). run_scan fans work out with bounded
+parallelism, and DEADLINES caps every call by a per-cluster deadline and a
+global budget so slow clusters are reported as timed out.
+
+With --max-age, list results survive between runs in a SnapshotCache under
+~/.cache/macos-development-environment/k8s and are revalidated from their
+resourceVersion once they are older than the TTL.
+
+BackgroundRefresher and serve_status back the resident
+`cluster_status.py --daemon`; its `--client` side is status_client.py.
+AdaptiveScheduler drives `restart_monitor.py --monitor`, polling each
+target as often as it changes, with jitter and per-context backoff.
+
+Every kubectl/API call is recorded on TRACER (phase timings, bytes read,
+exit code, timeouts) when profiling is enabled with --profile or
+--trace-json.
+"""
+
+import asyncio
+import base64
+import codecs
+import hashlib
+import heapq
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import socketserver
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from fnmatch import fnmatchcase
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from urllib.parse import urlencode, urlsplit
+
+from status_client import query_status
+
+try:
+    import yaml
+except ImportError:  # PyYAML is optional; kubectl config view is the fallback
+    yaml = None
+
+
+# Cluster configurations matching shell aliases
+CLUSTERS = {
+    "prod": {
+        "name": "Production",
+        "context": "arn:aws:eks:us-east-1:830101142436:cluster/production",
+        "namespace": "production",
+        "alias": "k1"
+    },
+    "staging": {
+        "name": "Staging",
+        "context": "arn:aws:eks:us-east-1:830101142436:cluster/production",
+        "namespace": "staging",
+        "alias": "k2"
+    },
+    "local": {
+        "name": "Local K3s",
+        "context": "k3s-117",
+        "namespace": "simplex",
+        "alias": "k"
+    }
+}
+
+# Sentinel namespace for --all-namespaces requests.
+ALL_NAMESPACES = "*"
+
+# Seconds before a kubectl call is killed.
+KUBECTL_TIMEOUT = 30
+
+# Phases reported by --profile, in display order.
+PROFILE_PHASES = ("spawn", "fetch", "parse", "aggregate")
+
+# Metrics API lists behind `kubectl top pods` / `kubectl top nodes`.
+POD_METRICS = "pods.metrics.k8s.io"
+NODE_METRICS = "nodes.metrics.k8s.io"
+
+# resource -> (API group path, namespaced)
+RESOURCE_PATHS = {
+    "pods": ("/api/v1", True),
+    "events": ("/api/v1", True),
+    "nodes": ("/api/v1", False),
+    "deployments": ("/apis/apps/v1", True),
+    POD_METRICS: ("/apis/metrics.k8s.io/v1beta1", True),
+    NODE_METRICS: ("/apis/metrics.k8s.io/v1beta1", False),
+}
+
+BACKENDS = ("kubectl", "api")
+
+# Lists that grow with workload size and are paged when chunk_size is set;
+# the rest stay cached and coalesced (e.g. the node list shared by envs).
+PAGED_RESOURCES = ("pods",)
+
+# Refresh exec-plugin credentials this long before they expire.
+CREDENTIAL_SKEW = timedelta(seconds=60)
+
+# On-disk snapshot cache used with --max-age (MDE_K8S_CACHE_DIR overrides).
+CACHE_DIR = os.environ.get("MDE_K8S_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "macos-development-environment", "k8s",
+)
+CACHE_MAX_BYTES = int(os.environ.get("MDE_K8S_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+# Server-side timeout (seconds) of the watch that revalidates a stale snapshot.
+REVALIDATE_TIMEOUT = 1
+
+
+class WatchExpired(Exception):
+    """The watch resourceVersion is too old (HTTP 410); relist and rewatch."""
+
+
+class FetchError(Exception):
+    """A paginated or streamed list could not be fetched."""
+
+
+class ClusterTimeout(FetchError):
+    """The cluster's --cluster-timeout or the run's --budget ran out."""
+
+
+class Tracer:
+    """Record per-call timings for --profile and --trace-json.
+
+    Each record is a dict with phase, cluster (kube context), resource,
+    seconds and, for fetches, bytes / exit_code / timed_out. Recording is a
+    no-op until `enabled` is set.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.records = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def record(self, phase: str, cluster: str, resource: str, seconds: float, **extra) -> None:
+        """Append one timing record."""
+        if not self.enabled:
+            return
+        entry = {"phase": phase, "cluster": cluster, "resource": resource,
+                 "seconds": round(seconds, 6)}
+        entry.update(extra)
+        with self._lock:
+            self.records.append(entry)
+
+    @contextmanager
+    def phase(self, phase: str, cluster: str, resource: str):
+        """Time the enclosed block as one record."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, cluster, resource, time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        """Return {cluster: {phase: seconds, "calls", "bytes", "timeouts"}}."""
+        clusters = {}
+        for entry in self.records:
+            totals = clusters.setdefault(entry["cluster"], {
+                **{phase: 0.0 for phase in PROFILE_PHASES},
+                "calls": 0, "bytes": 0, "timeouts": 0,
+            })
+            totals[entry["phase"]] = totals.get(entry["phase"], 0.0) + entry["seconds"]
+            if entry["phase"] == "fetch":
+                totals["calls"] += 1
+                totals["bytes"] += entry.get("bytes", 0)
+                totals["timeouts"] += 1 if entry.get("timed_out") else 0
+        for totals in clusters.values():
+            for phase in PROFILE_PHASES:
+                totals[phase] = round(totals[phase], 6)
+        return clusters
+
+    def print_profile(self, file=sys.stdout) -> None:
+        """Print the per-cluster, per-phase breakdown."""
+        print(f"\n⏱️  Profile (wall {time.perf_counter() - self._started:.3f}s)", file=file)
+        header = "".join(f"{phase:>10}" for phase in PROFILE_PHASES)
+        print(f"   {'cluster':<40}{header}{'calls':>7}{'bytes':>12}{'timeouts':>10}", file=file)
+        for cluster, totals in sorted(self.summary().items()):
+            label = cluster if len(cluster) <= 38 else "…" + cluster[-37:]
+            phases = "".join(f"{totals[phase]:>9.3f}s" for phase in PROFILE_PHASES)
+            print(f"   {label:<40}{phases}{totals['calls']:>7}{totals['bytes']:>12}"
+                  f"{totals['timeouts']:>10}", file=file)
+
+    def write_json(self, path: str) -> None:
+        """Export all records plus the summary as JSON."""
+        with open(path, "w") as handle:
+            json.dump({
+                "wall_seconds": round(time.perf_counter() - self._started, 6),
+                "summary": self.summary(),
+                "records": self.records,
+            }, handle, indent=2)
+
+
+TRACER = Tracer()
+
+
+class Deadlines:
+    """Per-cluster deadlines and a global time budget for one scan.
+
+    A cluster's clock starts with its first call, so clusters still queued
+    behind --concurrency are not charged for the wait. timeout() caps each
+    kubectl/API call by whichever deadline comes first; both limits are off
+    (0) by default.
+    """
+
+    def __init__(self):
+        self.cluster_timeout = 0.0
+        self._budget_deadline = None
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def configure(self, cluster_timeout: float = 0, budget: float = 0) -> None:
+        """Arm the limits (in seconds, 0 = unlimited); the budget starts now."""
+        with self._lock:
+            self.cluster_timeout = cluster_timeout
+            self._budget_deadline = time.monotonic() + budget if budget else None
+            self._started.clear()
+
+    def budget_remaining(self) -> Optional[float]:
+        """Seconds left in the global budget, or None if there is none."""
+        if self._budget_deadline is None:
+            return None
+        return max(0.0, self._budget_deadline - time.monotonic())
+
+    def remaining(self, context: str) -> Optional[float]:
+        """Seconds left for a cluster (starting its clock), or None if unlimited."""
+        now = time.monotonic()
+        deadline = self._budget_deadline
+        if self.cluster_timeout:
+            with self._lock:
+                started = self._started.setdefault(context, now)
+            cluster_deadline = started + self.cluster_timeout
+            deadline = cluster_deadline if deadline is None else min(deadline, cluster_deadline)
+        if deadline is None:
+            return None
+        return max(0.0, deadline - now)
+
+    def expired(self, context: str) -> bool:
+        """True once a started cluster (or the budget) has run out of time."""
+        if self.budget_remaining() == 0:
+            return True
+        return context in self._started and self.remaining(context) == 0
+
+    def timeout(self, context: str, default: float) -> float:
+        """Timeout for one call on `context`: `default` capped by the deadlines."""
+        remaining = self.remaining(context)
+        return default if remaining is None else min(default, remaining)
+
+
+DEADLINES = Deadlines()
+
+
+def _resource_label(args: list) -> str:
+    """Best-effort resource name of a kubectl invocation, for tracing."""
+    if len(args) > 2 and args[:2] == ["get", "--raw"]:
+        path = urlsplit(args[2]).path.rstrip("/")
+        resource = path.rsplit("/", 1)[-1]
+        return f"{resource}.metrics.k8s.io" if "/metrics.k8s.io/" in path else resource
+    if len(args) > 1 and args[0] == "get":
+        return args[1]
+    return args[0] if args else ""
+
+
+def run_kubectl(context: str, namespace: Optional[str], args: list,
+                timeout: float = KUBECTL_TIMEOUT) -> Optional[str]:
+    """Execute kubectl command and return output (namespace None = no -n)."""
+    cmd = ["kubectl", f"--context={context}"]
+    if namespace is not None:
+        cmd.append(f"-n={namespace}")
+    cmd += args
+    resource = _resource_label(args)
+    timeout = DEADLINES.timeout(context, timeout)
+    if timeout <= 0:
+        TRACER.record("fetch", context, resource, 0.0, bytes=0, exit_code=None, timed_out=True)
+        return None
+    try:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        spawned = time.perf_counter()
+        TRACER.record("spawn", context, resource, spawned - start)
+        try:
+            stdout, _ = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            TRACER.record("fetch", context, resource, time.perf_counter() - spawned,
+                          bytes=0, exit_code=None, timed_out=True)
+            return None
+        TRACER.record("fetch", context, resource, time.perf_counter() - spawned,
+                      bytes=len(stdout), exit_code=proc.returncode, timed_out=False)
+        if proc.returncode == 0:
+            return stdout.decode("utf-8", "replace")
+        return None
+    except Exception:
+        return None
+
+
+class JsonItemParser:
+    """Incrementally parse a JSON list document fed in byte chunks.
+
+    feed() returns the elements of the top-level `items` array completed by
+    that chunk, so callers can convert and drop each object while the rest
+    is still arriving; other top-level keys (kind, metadata, ...) are kept
+    in `document`. Only the unparsed tail of the input is buffered. Raises
+    json.JSONDecodeError on malformed input (a missing ',' included), or
+    from close() if it was truncated.
+    """
+
+    _WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, key: str = "items"):
+        self.key = key
+        self.document = {}
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")("replace")
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._current = None
+        self._final = False
+
+    def feed(self, chunk: bytes) -> list:
+        """Consume a chunk; return the items it completed."""
+        self._buffer = self._buffer[self._pos:] + self._utf8.decode(chunk)
+        self._pos = 0
+        items = []
+        while self._step(items):
+            pass
+        return items
+
+    def close(self) -> list:
+        """Finish the input; return any remaining items."""
+        self._final = True
+        items = self.feed(b"")
+        self._buffer += self._utf8.decode(b"", final=True)
+        if self._state != "done":
+            raise self._error("Unterminated JSON list document")
+        return items
+
+    def _next_char(self) -> str:
+        self._pos = self._WHITESPACE.match(self._buffer, self._pos).end()
+        return self._buffer[self._pos:self._pos + 1]
+
+    def _decode(self):
+        """Decode one value at the cursor; None (with the cursor unmoved) if incomplete."""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if self._final:
+                raise
+            return None
+        if not self._final and not isinstance(value, (dict, list, str)):
+            # A number split at a chunk boundary decodes early ("1." + "5" as 1),
+            # so a scalar counts only once the delimiter after it has arrived.
+            following = self._WHITESPACE.match(self._buffer, end).end()
+            if self._buffer[following:following + 1] not in (",", "]", "}"):
+                return None
+        self._pos = end
+        return (value,)
+
+    def _step(self, items: list) -> bool:
+        """Advance one token; return False when more input is needed."""
+        char = self._next_char()
+        if not char:
+            return False
+        state = self._state
+        if state == "start":
+            if char != "{":
+                raise self._error("Expecting '{'")
+            self._pos += 1
+            self._state = "first key"
+        elif state in ("first key", "key"):
+            if char == "}" and state == "first key":
+                self._pos += 1
+                self._state = "done"
+                return True
+            if char != '"':
+                raise self._error("Expecting property name enclosed in double quotes")
+            decoded = self._decode()
+            if decoded is None:
+                return False
+            self._current = decoded[0]
+            self._state = "colon"
+        elif state == "colon":
+            if char != ":":
+                raise self._error("Expecting ':' delimiter")
+            self._pos += 1
+            self._state = "value"
+        elif state == "value":
+            if self._current == self.key and char == "[":
+                self._pos += 1
+                self._state = "first item"
+            else:
+                decoded = self._decode_value(char)
+                if decoded is None:
+                    return False
+                self.document[self._current] = decoded[0]
+                self._state = "after value"
+        elif state == "after value":
+            if char == ",":
+                self._state = "key"
+            elif char == "}":
+                self._state = "done"
+            else:
+                raise self._error("Expecting ',' delimiter")
+            self._pos += 1
+        elif state in ("first item", "item"):
+            if char == "]" and state == "first item":
+                self._pos += 1
+                self._state = "after value"
+                return True
+            decoded = self._decode_value(char)
+            if decoded is None:
+                return False
+            items.append(decoded[0])
+            self._state = "after item"
+        elif state == "after item":
+            if char == ",":
+                self._state = "item"
+            elif char == "]":
+                self._state = "after value"
+            else:
+                raise self._error("Expecting ',' delimiter")
+            self._pos += 1
+        else:
+            raise self._error("Extra data")
+        return True
+
+    def _decode_value(self, char: str):
+        if char in ",]}":
+            raise self._error("Expecting value")
+        return self._decode()
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+
+async def stream_kubectl(context: str, namespace: Optional[str], args: list,
+                         parser: JsonItemParser, timeout: float = KUBECTL_TIMEOUT):
+    """Run kubectl and yield each element of `items` as soon as it is parsed.
+
+    stdout is read in chunks and fed to `parser`, so parsing overlaps the
+    transfer and neither the raw output nor the whole decoded document is
+    ever held at once; `parser.document` has the remaining keys afterwards.
+    If the (DEADLINES-capped) timeout runs out the child is killed and
+    asyncio.TimeoutError raised; a non-zero exit raises CalledProcessError
+    and malformed or truncated output json.JSONDecodeError.
+
+    Time spent parsing chunks and in the caller between items (converting
+    them) is recorded as the parse phase and left out of fetch.
+    """
+    cmd = ["kubectl", f"--context={context}"]
+    if namespace is not None:
+        cmd.append(f"-n={namespace}")
+    cmd += args
+    resource = _resource_label(args)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    start = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    spawned = time.perf_counter()
+    TRACER.record("spawn", context, resource, spawned - start)
+    received = 0
+    parsing = 0.0
+    try:
+        while True:
+            chunk = await asyncio.wait_for(proc.stdout.read(65536), max(0.0, deadline - loop.time()))
+            if not chunk:
+                break
+            received += len(chunk)
+            parse_start = time.perf_counter()
+            for item in parser.feed(chunk):
+                yield item
+            parsing += time.perf_counter() - parse_start
+        returncode = await asyncio.wait_for(proc.wait(), max(0.0, deadline - loop.time()))
+        if returncode == 0:
+            # Only a successful kubectl's output is judged complete; a failed
+            # one raises CalledProcessError below instead.
+            parse_start = time.perf_counter()
+            for item in parser.close():
+                yield item
+            parsing += time.perf_counter() - parse_start
+    except asyncio.TimeoutError:
+        TRACER.record("parse", context, resource, parsing, streamed=True)
+        TRACER.record("fetch", context, resource, time.perf_counter() - spawned - parsing,
+                      bytes=received, exit_code=None, timed_out=True, streamed=True)
+        raise
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    TRACER.record("parse", context, resource, parsing, streamed=True)
+    TRACER.record("fetch", context, resource, time.perf_counter() - spawned - parsing,
+                  bytes=received, exit_code=returncode, timed_out=False, streamed=True)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Turn an RFC 3339 timestamp ("2024-01-02T03:04:05Z") into epoch seconds."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+# Quantity suffix -> multiplier (resource.Quantity: decimal SI and binary).
+QUANTITY_SUFFIXES = {
+    "n": 1e-9, "u": 1e-6, "m": 1e-3, "": 1.0,
+    "k": 1e3, "M": 1e6, "G": 1e9, "T": 1e12, "P": 1e15, "E": 1e18,
+    "Ki": 2.0 ** 10, "Mi": 2.0 ** 20, "Gi": 2.0 ** 30, "Ti": 2.0 ** 40, "Pi": 2.0 ** 50, "Ei": 2.0 ** 60,
+}
+
+_QUANTITY = re.compile(r"^([+-]?[0-9.]+(?:[eE][+-]?[0-9]+)?)([a-zA-Z]*)$")
+
+
+def parse_quantity(value: Optional[str]) -> float:
+    """Turn a resource quantity ("250m", "1.5", "512Mi", "12345n") into a float.
+
+    CPU comes out in cores and memory in bytes; empty or malformed
+    quantities are 0.0.
+    """
+    match = _QUANTITY.match(str(value or "").strip())
+    if not match or match.group(2) not in QUANTITY_SUFFIXES:
+        return 0.0
+    try:
+        return float(match.group(1)) * QUANTITY_SUFFIXES[match.group(2)]
+    except ValueError:
+        return 0.0
+
+
+def pod_owner(kind: str, name: str, template_hash: str = "") -> str:
+    """Return the pod's workload as "Kind/name" ("" for a bare pod).
+
+    Pods of a Deployment are owned by a ReplicaSet named
+    <deployment>-<pod-template-hash>, so that suffix is dropped instead of
+    listing ReplicaSets.
+    """
+    if not kind or not name:
+        return ""
+    if kind == "ReplicaSet" and template_hash and name.endswith("-" + template_hash):
+        return f"Deployment/{name[:-len(template_hash) - 1]}"
+    return f"{kind}/{name}"
+
+
+def sum_resources(values: list, containers: int, limit: bool = False) -> float:
+    """Pod total of per-container quantities; a limit is 0.0 (none) unless every container sets one."""
+    if limit and len(values) < containers:
+        return 0.0
+    return sum(parse_quantity(value) for value in values)
+
+
+class PodRecord:
+    """The fields the pod summaries read, without the nested API object.
+
+    `restarts` is the sum of restartCount over all containers and
+    `last_termination` the latest lastState.terminated.finishedAt as epoch
+    seconds (None if no container has terminated); `last_reason` and
+    `exit_code` belong to that same termination. `restarted` names the
+    containers with a non-zero restartCount.
+
+    `owner` is the controlling workload (pod_owner) and the requests and
+    limits are totals over the pod's containers, in cores and bytes; 0.0
+    means unset.
+    """
+
+    __slots__ = ("namespace", "name", "uid", "phase", "restarts", "last_termination",
+                 "last_reason", "exit_code", "restarted", "owner", "cpu_request",
+                 "cpu_limit", "memory_request", "memory_limit")
+
+    def __init__(self, namespace: str, name: str, uid: str, phase: str,
+                 restarts: int = 0, last_termination: Optional[float] = None,
+                 last_reason: Optional[str] = None, exit_code: Optional[int] = None,
+                 restarted: tuple = (), owner: str = "", cpu_request: float = 0.0,
+                 cpu_limit: float = 0.0, memory_request: float = 0.0,
+                 memory_limit: float = 0.0):
+        self.namespace = namespace
+        self.name = name
+        self.uid = uid
+        self.phase = phase
+        self.restarts = restarts
+        self.last_termination = last_termination
+        self.last_reason = last_reason
+        self.exit_code = exit_code
+        self.restarted = restarted
+        self.owner = owner
+        self.cpu_request = cpu_request
+        self.cpu_limit = cpu_limit
+        self.memory_request = memory_request
+        self.memory_limit = memory_limit
+
+    @classmethod
+    def from_object(cls, pod: dict) -> "PodRecord":
+        metadata = pod.get("metadata", {})
+        status = pod.get("status", {})
+        restarts = 0
+        last_termination = None
+        last = {}
+        restarted = []
+        for cs in status.get("containerStatuses", []):
+            restarts += cs.get("restartCount", 0)
+            if cs.get("restartCount"):
+                restarted.append(cs.get("name", ""))
+            terminated = cs.get("lastState", {}).get("terminated", {})
+            finished = parse_timestamp(terminated.get("finishedAt")) if terminated else None
+            if finished is not None and (last_termination is None or finished > last_termination):
+                last_termination = finished
+                last = terminated
+        owners = metadata.get("ownerReferences") or [{}]
+        owner = next((ref for ref in owners if ref.get("controller")), owners[0])
+        containers = pod.get("spec", {}).get("containers", [])
+        resources = [c.get("resources") or {} for c in containers]
+        totals = [
+            sum_resources([r[kind][resource] for r in resources if resource in (r.get(kind) or {})],
+                          len(containers), kind == "limits")
+            for resource in ("cpu", "memory") for kind in ("requests", "limits")
+        ]
+        return cls(
+            metadata.get("namespace", ""),
+            metadata.get("name", "unknown"),
+            metadata.get("uid", ""),
+            status.get("phase", "Unknown"),
+            restarts,
+            last_termination,
+            last.get("reason"),
+            last.get("exitCode"),
+            tuple(restarted),
+            pod_owner(owner.get("kind", ""), owner.get("name", ""),
+                      (metadata.get("labels") or {}).get("pod-template-hash", "")),
+            *totals,
+        )
+
+    @classmethod
+    def from_row(cls, row: list) -> "PodRecord":
+        (namespace, name, uid, phase, names, restarts, terminations,
+         owner_kind, owner_name, template_hash, containers, *resources) = row
+        counts = [int(count) for count in restarts.split()]
+        # Owner columns hold "<controller ref> <first ref>"; like from_object,
+        # prefer the controller and fall back to the first reference.
+        owner_kind = next(iter(owner_kind.split()), "")
+        owner_name = next(iter(owner_name.split()), "")
+        # One "finishedAt,reason,exitCode" entry per container, empty fields
+        # included: a plain [*] column would drop missing ones and misalign.
+        last_termination = last_reason = exit_code = None
+        for entry in terminations.split():
+            finished, reason, code = entry.split(",")
+            finished = parse_timestamp(finished)
+            if finished is not None and (last_termination is None or finished > last_termination):
+                last_termination = finished
+                last_reason = reason or None
+                exit_code = int(code) if code else None
+        return cls(
+            namespace,
+            name,
+            uid,
+            phase or "Unknown",
+            sum(counts),
+            last_termination,
+            last_reason,
+            exit_code,
+            tuple(name for name, count in zip(names.split(), counts) if count),
+            pod_owner(owner_kind, owner_name, template_hash),
+            *(sum_resources(column.split(), len(containers.split()), n % 2 == 1)
+              for n, column in enumerate(resources)),
+        )
+
+
+class DeploymentRecord:
+    """Desired and available replica counts of one deployment."""
+
+    __slots__ = ("namespace", "name", "replicas", "available")
+
+    def __init__(self, namespace: str, name: str, replicas: int = 0, available: int = 0):
+        self.namespace = namespace
+        self.name = name
+        self.replicas = replicas
+        self.available = available
+
+    @classmethod
+    def from_object(cls, deploy: dict) -> "DeploymentRecord":
+        metadata = deploy.get("metadata", {})
+        return cls(
+            metadata.get("namespace", ""),
+            metadata.get("name", "unknown"),
+            deploy.get("spec", {}).get("replicas", 0),
+            deploy.get("status", {}).get("availableReplicas", 0),
+        )
+
+    @classmethod
+    def from_row(cls, row: list) -> "DeploymentRecord":
+        namespace, name, replicas, available = row
+        return cls(namespace, name, int(replicas or 0), int(available or 0))
+
+
+class NodeRecord:
+    """Name, Ready condition and allocatable CPU (cores) / memory (bytes) of one node."""
+
+    __slots__ = ("namespace", "name", "ready", "cpu_allocatable", "memory_allocatable")
+
+    def __init__(self, name: str, ready: bool, cpu_allocatable: float = 0.0,
+                 memory_allocatable: float = 0.0):
+        self.namespace = ""
+        self.name = name
+        self.ready = ready
+        self.cpu_allocatable = cpu_allocatable
+        self.memory_allocatable = memory_allocatable
+
+    @classmethod
+    def from_object(cls, node: dict) -> "NodeRecord":
+        status = node.get("status", {})
+        conditions = status.get("conditions", [])
+        allocatable = status.get("allocatable") or {}
+        return cls(
+            node.get("metadata", {}).get("name", "unknown"),
+            any(c.get("type") == "Ready" and c.get("status") == "True" for c in conditions),
+            parse_quantity(allocatable.get("cpu")),
+            parse_quantity(allocatable.get("memory")),
+        )
+
+    @classmethod
+    def from_row(cls, row: list) -> "NodeRecord":
+        name, ready, cpu, memory = row
+        return cls(name, ready == "True", parse_quantity(cpu), parse_quantity(memory))
+
+
+class EventRecord:
+    """One event, reduced to what is shown next to the object it is about.
+
+    `last_seen` is the latest of lastTimestamp, series.lastObservedTime,
+    eventTime and firstTimestamp as epoch seconds; `count` is how many
+    times the event has been observed.
+    """
+
+    __slots__ = ("namespace", "name", "object_kind", "object_name", "object_uid",
+                 "type", "reason", "message", "count", "last_seen")
+
+    def __init__(self, namespace: str, name: str, object_kind: str, object_name: str,
+                 object_uid: str, type: str, reason: str, message: str = "",
+                 count: int = 1, last_seen: Optional[float] = None):
+        self.namespace = namespace
+        self.name = name
+        self.object_kind = object_kind
+        self.object_name = object_name
+        self.object_uid = object_uid
+        self.type = type
+        self.reason = reason
+        self.message = message
+        self.count = count
+        self.last_seen = last_seen
+
+    @classmethod
+    def from_object(cls, event: dict) -> "EventRecord":
+        metadata = event.get("metadata", {})
+        involved = event.get("involvedObject") or event.get("regarding") or {}
+        series = event.get("series") or {}
+        times = (event.get("lastTimestamp"), series.get("lastObservedTime"),
+                 event.get("eventTime"), event.get("firstTimestamp"))
+        return cls(
+            metadata.get("namespace", ""),
+            metadata.get("name", "unknown"),
+            involved.get("kind", ""),
+            involved.get("name", ""),
+            involved.get("uid", ""),
+            event.get("type", "Normal"),
+            event.get("reason", ""),
+            event.get("message") or event.get("note") or "",
+            event.get("count") or series.get("count") or 1,
+            max(filter(None, map(parse_timestamp, times)), default=None),
+        )
+
+
+class UsageRecord:
+    """CPU (cores) and memory (bytes) in use by one pod or node, as `kubectl top` shows.
+
+    Built from a PodMetrics / NodeMetrics object of the metrics API; pod
+    usage is summed over its containers.
+    """
+
+    __slots__ = ("namespace", "name", "cpu", "memory")
+
+    def __init__(self, namespace: str, name: str, cpu: float = 0.0, memory: float = 0.0):
+        self.namespace = namespace
+        self.name = name
+        self.cpu = cpu
+        self.memory = memory
+
+    @classmethod
+    def from_object(cls, metrics: dict) -> "UsageRecord":
+        metadata = metrics.get("metadata", {})
+        usages = [c.get("usage") or {} for c in metrics.get("containers", [])]
+        if "containers" not in metrics:
+            usages = [metrics.get("usage") or {}]
+        return cls(
+            metadata.get("namespace", ""),
+            metadata.get("name", "unknown"),
+            sum(parse_quantity(usage.get("cpu")) for usage in usages),
+            sum(parse_quantity(usage.get("memory")) for usage in usages),
+        )
+
+
+# resource -> record type the fetch layer hands to the summaries
+RECORD_TYPES = {
+    "pods": PodRecord,
+    "deployments": DeploymentRecord,
+    "nodes": NodeRecord,
+    "events": EventRecord,
+    POD_METRICS: UsageRecord,
+    NODE_METRICS: UsageRecord,
+}
+
+
+def to_records(resource: str, items: list) -> list:
+    """Convert API objects to RECORD_TYPES records (other resources pass through)."""
+    record_type = RECORD_TYPES.get(resource)
+    if record_type is None:
+        return items
+    from_object = record_type.from_object
+    return [from_object(item) for item in items]
+
+
+def record_values(record) -> list:
+    """Return a record's slot values, in __slots__ order."""
+    return [getattr(record, name) for name in record.__slots__]
+
+
+def record_from_values(record_type, values: list):
+    """Rebuild a record from record_values() output."""
+    record = record_type.__new__(record_type)
+    for name, value in zip(record_type.__slots__, values):
+        setattr(record, name, value)
+    return record
+
+
+class SnapshotCache:
+    """List results of RECORD_TYPES resources kept on disk between runs.
+
+    One JSON file per (context, namespace, resource, selector) key holds
+    the list resourceVersion, the time it was stored and the records as
+    value lists; snapshots written with other record fields are ignored.
+    Files are replaced atomically, so concurrent runs never read a partial
+    snapshot. Hits refresh the file's mtime and, once the directory grows
+    past `max_bytes`, least recently used files go first.
+    """
+
+    def __init__(self, max_age: float, directory: str = CACHE_DIR,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.max_age = max_age
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def load(self, key: tuple) -> Optional[dict]:
+        """Return {"age", "resource_version", "items"} for a key, or None."""
+        path = self._path(key)
+        try:
+            with open(path) as handle:
+                snapshot = json.load(handle)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        record_type = RECORD_TYPES[key[2]]
+        if snapshot.get("key") != list(key) or snapshot.get("fields") != list(record_type.__slots__):
+            return None
+        return {
+            "age": time.time() - snapshot["stored"],
+            "resource_version": snapshot.get("resourceVersion", ""),
+            "items": [record_from_values(record_type, values) for values in snapshot["items"]],
+        }
+
+    def store(self, key: tuple, resource_version: str, items: list) -> None:
+        """Write a snapshot for a key, then trim the cache to max_bytes."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as handle:
+                json.dump({
+                    "key": list(key),
+                    "fields": list(RECORD_TYPES[key[2]].__slots__),
+                    "resourceVersion": resource_version,
+                    "stored": time.time(),
+                    "items": [record_values(item) for item in items],
+                }, handle, separators=(",", ":"))
+            os.replace(tmp, self._path(key))
+            self._evict()
+        except OSError:
+            pass
+
+    def _path(self, key: tuple) -> str:
+        digest = hashlib.sha256(json.dumps(list(key)).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest[:32]}.json")
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+# resource -> (jsonpath template emitting one tab-separated row per object,
+#              row -> record with only the fields the summaries read)
+PROJECTIONS = {
+    "pods": (
+        '{range .items[*]}{.metadata.namespace}{"\\t"}{.metadata.name}{"\\t"}'
+        '{.metadata.uid}{"\\t"}{.status.phase}{"\\t"}'
+        '{.status.containerStatuses[*].name}{"\\t"}'
+        '{.status.containerStatuses[*].restartCount}{"\\t"}'
+        '{range .status.containerStatuses[*]}{.lastState.terminated.finishedAt}{","}'
+        '{.lastState.terminated.reason}{","}{.lastState.terminated.exitCode}{" "}{end}{"\\t"}'
+        '{.metadata.ownerReferences[?(@.controller==true)].kind} {.metadata.ownerReferences[0].kind}{"\\t"}'
+        '{.metadata.ownerReferences[?(@.controller==true)].name} {.metadata.ownerReferences[0].name}{"\\t"}'
+        '{.metadata.labels.pod-template-hash}{"\\t"}{.spec.containers[*].name}{"\\t"}'
+        '{.spec.containers[*].resources.requests.cpu}{"\\t"}'
+        '{.spec.containers[*].resources.limits.cpu}{"\\t"}'
+        '{.spec.containers[*].resources.requests.memory}{"\\t"}'
+        '{.spec.containers[*].resources.limits.memory}{"\\n"}{end}',
+        PodRecord.from_row,
+    ),
+    "deployments": (
+        '{range .items[*]}{.metadata.namespace}{"\\t"}{.metadata.name}{"\\t"}'
+        '{.spec.replicas}{"\\t"}{.status.availableReplicas}{"\\n"}{end}',
+        DeploymentRecord.from_row,
+    ),
+    "nodes": (
+        '{range .items[*]}{.metadata.name}{"\\t"}'
+        '{.status.conditions[?(@.type=="Ready")].status}{"\\t"}'
+        '{.status.allocatable.cpu}{"\\t"}{.status.allocatable.memory}{"\\n"}{end}',
+        NodeRecord.from_row,
+    ),
+}
+
+
+def parse_projection(resource: str, output: str) -> list:
+    """Turn jsonpath projection output into records."""
+    from_row = PROJECTIONS[resource][1]
+    return [from_row(line.split("\t")) for line in output.splitlines() if line]
+
+
+class KubectlBackend:
+    """List resources by running `kubectl get --raw` on their API path.
+
+    `runner(context, namespace, args)` executes kubectl and returns stdout
+    or None; a namespace of None means no -n flag is passed. With the
+    default runner, `streaming` is set and list_streamed() parses kubectl's
+    stdout item by item (stream_kubectl) instead of buffering it; a custom
+    runner sees every call instead.
+    """
+
+    supports_projection = True
+
+    def __init__(self, runner: Callable[[str, Optional[str], list], Optional[str]] = run_kubectl):
+        self.runner = runner
+        self.streaming = runner is run_kubectl
+
+    def list(self, context: str, namespace: Optional[str], resource: str,
+             selector: Optional[str] = None) -> Optional[dict]:
+        """Return the parsed list document, or None if kubectl failed."""
+        namespace, args = self._list_args(namespace, resource, selector)
+        output = self.runner(context, namespace, args)
+        if not output:
+            return None
+        with TRACER.phase("parse", context, resource):
+            return json.loads(output)
+
+    def list_streamed(self, context: str, namespace: Optional[str], resource: str,
+                      selector: Optional[str] = None,
+                      convert: Callable[[dict], object] = None) -> Optional[tuple]:
+        """Return (items, list resourceVersion), or None if kubectl failed.
+
+        Each object is passed through `convert` (e.g. a record's
+        from_object) as soon as it is parsed, so only one decoded object is
+        alive at a time. Runs stream_kubectl on an event loop of its own, so
+        it can be called from any thread. Raises json.JSONDecodeError if
+        kubectl succeeded but its output is malformed.
+        """
+        namespace, args = self._list_args(namespace, resource, selector)
+        timeout = DEADLINES.timeout(context, KUBECTL_TIMEOUT)
+        if timeout <= 0:
+            TRACER.record("fetch", context, resource, 0.0, bytes=0, exit_code=None, timed_out=True)
+            return None
+
+        async def collect():
+            parser = JsonItemParser()
+            items = []
+            async for item in stream_kubectl(context, namespace, args, parser, timeout):
+                items.append(convert(item) if convert else item)
+            return items, parser.document.get("metadata", {}).get("resourceVersion", "")
+
+        try:
+            return asyncio.run(collect())
+        except json.JSONDecodeError:
+            raise
+        except (OSError, ValueError, asyncio.TimeoutError, subprocess.CalledProcessError):
+            return None
+
+    @staticmethod
+    def _list_args(namespace: Optional[str], resource: str, selector: Optional[str]) -> tuple:
+        # `kubectl get -o json` re-wraps the items in a v1 List whose
+        # resourceVersion is empty; --raw keeps the server's, which cache
+        # revalidation and watches resume from.
+        url = api_path(resource, namespace)
+        if selector:
+            url += "?" + urlencode({"labelSelector": selector})
+        return None, ["get", "--raw", url]
+
+    def list_projected(self, context: str, namespace: Optional[str], resource: str,
+                       selector: Optional[str] = None, chunk_size: int = 0) -> Optional[list]:
+        """List records via a PROJECTIONS jsonpath template.
+
+        kubectl still downloads full objects, but only a few short columns
+        cross the pipe and no JSON tree is built in Python. Returns None if
+        kubectl failed; an empty list is a valid (empty) result.
+        """
+        args = ["get", resource, "-o", f"jsonpath={PROJECTIONS[resource][0]}"]
+        if namespace == ALL_NAMESPACES:
+            args.append("--all-namespaces")
+            namespace = None
+        if selector:
+            args += ["-l", selector]
+        if chunk_size:
+            args.append(f"--chunk-size={chunk_size}")
+        output = self.runner(context, namespace, args)
+        if output is None:
+            return None
+        with TRACER.phase("parse", context, resource):
+            return parse_projection(resource, output)
+
+    def list_pages(self, context: str, namespace: Optional[str], resource: str,
+                   limit: int, selector: Optional[str] = None):
+        """Yield `items` one page of at most `limit` objects at a time.
+
+        `kubectl get --chunk-size` merges pages before printing, so each page
+        is requested with `kubectl get --raw` and a continue token instead.
+        """
+        path = api_path(resource, namespace)
+        return paginate(
+            lambda query: self._raw_page(context, f"{path}?{urlencode(query)}"), limit, selector
+        )
+
+    def _raw_page(self, context: str, url: str) -> Optional[dict]:
+        output = self.runner(context, None, ["get", "--raw", url])
+        if not output:
+            return None
+        with TRACER.phase("parse", context, _resource_label(["get", "--raw", url])):
+            return json.loads(output)
+
+    def watch(self, context: str, namespace: Optional[str], resource: str,
+              resource_version: str, timeout_seconds: int = 300,
+              selector: Optional[str] = None):
+        """Yield watch events newer than resource_version.
+
+        Uses `kubectl get --raw` on the watch URL so the stream can resume
+        from a resourceVersion. Returns when the server ends the watch;
+        raises CalledProcessError if kubectl exits with an error.
+        """
+        url = api_path(resource, namespace) + "?" + urlencode(
+            watch_query(resource_version, timeout_seconds, selector)
+        )
+        cmd = ["kubectl", f"--context={context}", "get", "--raw", url]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            for line in proc.stdout:
+                if line.strip():
+                    yield check_watch_event(json.loads(line))
+            if proc.wait() != 0:
+                raise subprocess.CalledProcessError(proc.returncode, cmd)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+    def logs(self, context: str, namespace: str, pod: str, container: str,
+             previous: bool = False, tail: Optional[int] = None,
+             limit_bytes: Optional[int] = None, timeout: float = KUBECTL_TIMEOUT):
+        """Yield a container's log as byte chunks, as `kubectl logs` writes them.
+
+        Raises CalledProcessError if kubectl fails (e.g. no previous
+        container) and TimeoutError if the log is still streaming after
+        `timeout` seconds; kubectl is killed either way.
+        """
+        cmd = ["kubectl", f"--context={context}", f"-n={namespace}", "logs", pod, "-c", container]
+        if previous:
+            cmd.append("--previous")
+        if tail is not None:
+            cmd.append(f"--tail={tail}")
+        if limit_bytes:
+            cmd.append(f"--limit-bytes={limit_bytes}")
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        timer = threading.Timer(timeout, proc.kill)
+        timer.start()
+        try:
+            while True:
+                chunk = proc.stdout.read1(65536)
+                if not chunk:
+                    break
+                yield chunk
+            if proc.wait() != 0:
+                if not timer.is_alive():
+                    raise TimeoutError(f"kubectl logs {pod} timed out after {timeout:g}s")
+                raise subprocess.CalledProcessError(proc.returncode, cmd)
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+
+class ApiBackend:
+    """List resources through the Kubernetes REST API without kubectl.
+
+    Contexts are resolved from kubeconfig (KUBECONFIG or ~/.kube/config).
+    Exec-plugin credentials (e.g. `aws eks get-token`) are cached until
+    shortly before their expirationTimestamp, and each thread keeps one
+    keep-alive connection per API server for the life of the backend.
+    """
+
+    # Status fields cannot be projected server-side, so --projection is a
+    # no-op here; the full JSON list is decoded as usual.
+    supports_projection = False
+
+    def __init__(self, kubeconfig: Optional[dict] = None, timeout: float = 30):
+        self.timeout = timeout
+        self._kubeconfig = kubeconfig
+        self._lock = threading.Lock()
+        self._targets = {}
+        self._credentials = {}
+        self._pending_credentials = {}
+        self._local = threading.local()
+
+    def list(self, context: str, namespace: Optional[str], resource: str,
+             selector: Optional[str] = None) -> Optional[dict]:
+        """Return the parsed list document, or None if the request failed."""
+        query = {"labelSelector": selector} if selector else None
+        return self.get_json(context, api_path(resource, namespace), query)
+
+    def list_pages(self, context: str, namespace: Optional[str], resource: str,
+                   limit: int, selector: Optional[str] = None):
+        """Yield `items` one page of at most `limit` objects at a time."""
+        path = api_path(resource, namespace)
+        return paginate(lambda query: self.get_json(context, path, query), limit, selector)
+
+    def watch(self, context: str, namespace: Optional[str], resource: str,
+              resource_version: str, timeout_seconds: int = 300,
+              selector: Optional[str] = None):
+        """Yield watch events newer than resource_version.
+
+        The watch runs on its own connection so pooled connections stay
+        free for list calls. Returns when the server ends the watch.
+        """
+        conn, response = self._send(
+            context, api_path(resource, namespace),
+            watch_query(resource_version, timeout_seconds, selector),
+            timeout_seconds + 30, pooled=False,
+        )
+        try:
+            if response.status == 410:
+                raise WatchExpired(resource_version)
+            if response.status != 200:
+                raise http.client.HTTPException(f"watch failed: HTTP {response.status}")
+            for line in response:
+                if line.strip():
+                    yield check_watch_event(json.loads(line))
+        finally:
+            conn.close()
+
+    def logs(self, context: str, namespace: str, pod: str, container: str,
+             previous: bool = False, tail: Optional[int] = None,
+             limit_bytes: Optional[int] = None, timeout: Optional[float] = None):
+        """Yield a container's log as byte chunks from the pod log endpoint.
+
+        Runs on its own connection, like watch(); `timeout` bounds each
+        read. Raises HTTPException on a non-200 response.
+        """
+        query = {"container": container}
+        if previous:
+            query["previous"] = "true"
+        if tail is not None:
+            query["tailLines"] = str(tail)
+        if limit_bytes:
+            query["limitBytes"] = str(limit_bytes)
+        conn, response = self._send(
+            context, f"/api/v1/namespaces/{namespace}/pods/{pod}/log", query, timeout, pooled=False
+        )
+        try:
+            if response.status != 200:
+                raise http.client.HTTPException(f"logs failed: HTTP {response.status}")
+            while True:
+                chunk = response.read1(65536)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            conn.close()
+
+    def get_json(self, context: str, path: str, query: Optional[dict] = None) -> Optional[dict]:
+        """GET a path on the context's API server and decode the JSON body."""
+        resource = path.rstrip("/").rsplit("/", 1)[-1]
+        timeout = DEADLINES.timeout(context, self.timeout)
+        start = time.perf_counter()
+        if timeout <= 0:
+            TRACER.record("fetch", context, resource, 0.0, bytes=0, exit_code=None, timed_out=True)
+            return None
+        try:
+            response = self.request(context, path, query, timeout)
+            body = response.read()
+        except socket.timeout:
+            TRACER.record("fetch", context, resource, time.perf_counter() - start,
+                          bytes=0, exit_code=None, timed_out=True)
+            return None
+        except (OSError, http.client.HTTPException, subprocess.SubprocessError, KeyError, ValueError):
+            return None
+        TRACER.record("fetch", context, resource, time.perf_counter() - start,
+                      bytes=len(body), exit_code=response.status, timed_out=False)
+        if response.status != 200:
+            return None
+        with TRACER.phase("parse", context, resource):
+            return json.loads(body)
+
+    def request(self, context: str, path: str, query: Optional[dict] = None,
+                timeout: Optional[float] = None) -> http.client.HTTPResponse:
+        """Send a GET over a pooled connection and return the open response.
+
+        The caller must read the response to the end before the connection
+        can be reused by the next request on this thread.
+        """
+        return self._send(context, path, query, timeout, pooled=True)[1]
+
+    def _send(self, context: str, path: str, query: Optional[dict],
+              timeout: Optional[float], pooled: bool) -> tuple:
+        """Return (connection, response); unpooled connections belong to the caller."""
+        target = self._target(context)
+        url = target["base_path"] + path
+        if query:
+            url += "?" + urlencode(query)
+        for attempt in (0, 1):
+            headers, ssl_context = self._auth(target, refresh=attempt > 0)
+            headers["Accept"] = "application/json, */*"
+            if pooled:
+                conn = self._connection(target, ssl_context, timeout)
+            else:
+                conn = self._new_connection(target, ssl_context, timeout)
+            try:
+                conn.request("GET", url, headers=headers)
+                response = conn.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                # Stale keep-alive connection; reconnect once.
+                if pooled:
+                    self._drop_connection(target, ssl_context)
+                else:
+                    conn.close()
+                if attempt:
+                    raise
+                continue
+            if response.status == 401 and not attempt and target["user"].get("exec"):
+                response.read()
+                if not pooled:
+                    conn.close()
+                continue
+            return conn, response
+        raise http.client.HTTPException(f"request to {context} failed")
+
+    def _kubeconfig_doc(self) -> dict:
+        with self._lock:
+            if self._kubeconfig is None:
+                self._kubeconfig = load_kubeconfig()
+            return self._kubeconfig
+
+    def _target(self, context: str) -> dict:
+        config = self._kubeconfig_doc()
+        with self._lock:
+            target = self._targets.get(context)
+            if target is None:
+                target = self._targets[context] = _build_target(config, context)
+            return target
+
+    def _auth(self, target: dict, refresh: bool = False) -> tuple:
+        """Return (headers, ssl_context) for the target's kubeconfig user."""
+        user = target["user"]
+        headers = {}
+        ssl_context = target["ssl"]
+        if user.get("exec"):
+            credential = self._exec_credential(target, refresh)
+            if credential.get("token"):
+                headers["Authorization"] = f"Bearer {credential['token']}"
+            if credential.get("ssl"):
+                ssl_context = credential["ssl"]
+        elif user.get("token"):
+            headers["Authorization"] = f"Bearer {user['token']}"
+        elif user.get("tokenFile"):
+            with open(_resolve_path(target, user["tokenFile"])) as handle:
+                headers["Authorization"] = f"Bearer {handle.read().strip()}"
+        elif user.get("username"):
+            pair = f"{user['username']}:{user.get('password', '')}".encode()
+            headers["Authorization"] = f"Basic {base64.b64encode(pair).decode()}"
+        return headers, ssl_context
+
+    def _exec_credential(self, target: dict, refresh: bool) -> dict:
+        """Return the user's cached credential, running the exec plugin if needed.
+
+        The plugin runs outside self._lock; threads needing the same user's
+        credential meanwhile wait on its in-flight future instead.
+        """
+        key = target["user_name"]
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            cached = self._credentials.get(key)
+            if cached and not refresh and (cached["expires"] is None or now < cached["expires"]):
+                return cached
+            future = self._pending_credentials.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending_credentials[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            with TRACER.phase("spawn", target["context"], "exec-credential"):
+                credential = _run_exec_plugin(target)
+        except Exception as exc:
+            with self._lock:
+                del self._pending_credentials[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._credentials[key] = credential
+            del self._pending_credentials[key]
+        future.set_result(credential)
+        return credential
+
+    def _connection(self, target: dict, ssl_context, timeout: Optional[float]):
+        pool = getattr(self._local, "connections", None)
+        if pool is None:
+            pool = self._local.connections = {}
+        key = (target["scheme"], target["host"], target["port"], id(ssl_context))
+        conn = pool.get(key)
+        if conn is None:
+            conn = pool[key] = self._new_connection(target, ssl_context, None)
+        conn.timeout = timeout if timeout is not None else self.timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(conn.timeout)
+        return conn
+
+    def _new_connection(self, target: dict, ssl_context, timeout: Optional[float]):
+        timeout = timeout if timeout is not None else self.timeout
+        if target["scheme"] == "https":
+            return http.client.HTTPSConnection(
+                target["host"], target["port"], timeout=timeout, context=ssl_context
+            )
+        return http.client.HTTPConnection(target["host"], target["port"], timeout=timeout)
+
+    def _drop_connection(self, target: dict, ssl_context) -> None:
+        pool = getattr(self._local, "connections", {})
+        key = (target["scheme"], target["host"], target["port"], id(ssl_context))
+        conn = pool.pop(key, None)
+        if conn is not None:
+            conn.close()
+
+
+def api_path(resource: str, namespace: Optional[str]) -> str:
+    """Return the REST collection path for a resource."""
+    group, namespaced = RESOURCE_PATHS[resource]
+    plural = resource.split(".", 1)[0]
+    if namespaced and namespace not in (None, ALL_NAMESPACES):
+        return f"{group}/namespaces/{namespace}/{plural}"
+    return f"{group}/{plural}"
+
+
+def paginate(get_page: Callable[[dict], Optional[dict]], limit: int,
+             selector: Optional[str] = None):
+    """Follow limit/continue tokens, yielding each page's items.
+
+    Only one page is referenced at a time, so peak memory is bounded by the
+    page size. Raises FetchError if a page cannot be fetched.
+    """
+    query = {"limit": str(limit)}
+    if selector:
+        query["labelSelector"] = selector
+    while True:
+        page = get_page(query)
+        if page is None:
+            raise FetchError("unable to fetch page")
+        token = page.get("metadata", {}).get("continue")
+        yield page.get("items", [])
+        if not token:
+            return
+        query["continue"] = token
+        page = None
+
+
+def watch_query(resource_version: str, timeout_seconds: int,
+                selector: Optional[str] = None) -> dict:
+    """Query parameters for a resumable watch request."""
+    query = {
+        "watch": "1",
+        "resourceVersion": resource_version,
+        "allowWatchBookmarks": "true",
+        "timeoutSeconds": str(timeout_seconds),
+    }
+    if selector:
+        query["labelSelector"] = selector
+    return query
+
+
+def check_watch_event(event: dict) -> dict:
+    """Return a watch event, raising WatchExpired for 410 Gone errors."""
+    if event.get("type") == "ERROR":
+        status = event.get("object", {})
+        if status.get("code") == 410:
+            raise WatchExpired(status.get("message", ""))
+        raise http.client.HTTPException(status.get("message", "watch error"))
+    return event
+
+
+def load_kubeconfig() -> dict:
+    """Load the merged kubeconfig as a dict.
+
+    A single kubeconfig file is parsed in-process when PyYAML is installed;
+    otherwise (or when KUBECONFIG lists several files) `kubectl config view`
+    does the merge once per run.
+    """
+    paths = [p for p in os.environ.get("KUBECONFIG", "").split(os.pathsep) if p]
+    if not paths:
+        paths = [os.path.expanduser("~/.kube/config")]
+    if len(paths) == 1:
+        with open(paths[0]) as handle:
+            text = handle.read()
+        try:
+            config = json.loads(text)
+        except ValueError:
+            config = yaml.safe_load(text) if yaml is not None else None
+        if config is not None:
+            config.setdefault("_dir", os.path.dirname(os.path.abspath(paths[0])))
+            return config
+    output = subprocess.check_output(
+        ["kubectl", "config", "view", "--raw", "-o", "json"], text=True, timeout=30
+    )
+    return json.loads(output)
+
+
+def _named(entries: list, name: str) -> dict:
+    for entry in entries or []:
+        if entry.get("name") == name:
+            return entry
+    raise KeyError(name)
+
+
+def _resolve_path(target: dict, path: str) -> str:
+    return os.path.join(target["dir"], os.path.expanduser(path))
+
+
+def _build_target(config: dict, context_name: str) -> dict:
+    """Resolve server, TLS settings and user for a kubeconfig context."""
+    context = _named(config.get("contexts"), context_name)["context"]
+    cluster = _named(config.get("clusters"), context["cluster"])["cluster"]
+    user_name = context.get("user", "")
+    user = _named(config.get("users"), user_name)["user"] if user_name else {}
+
+    server = urlsplit(cluster["server"])
+    target = {
+        "scheme": server.scheme,
+        "host": server.hostname,
+        "port": server.port or (443 if server.scheme == "https" else 80),
+        "base_path": server.path.rstrip("/"),
+        "user": user,
+        "user_name": user_name,
+        "context": context_name,
+        "dir": config.get("_dir", os.getcwd()),
+        "ssl": None,
+    }
+    if server.scheme == "https":
+        ssl_context = ssl.create_default_context()
+        if cluster.get("insecure-skip-tls-verify"):
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        elif cluster.get("certificate-authority-data"):
+            ssl_context.load_verify_locations(
+                cadata=base64.b64decode(cluster["certificate-authority-data"]).decode()
+            )
+        elif cluster.get("certificate-authority"):
+            ssl_context.load_verify_locations(
+                cafile=_resolve_path(target, cluster["certificate-authority"])
+            )
+        cert = user.get("client-certificate-data") or user.get("client-certificate")
+        key = user.get("client-key-data") or user.get("client-key")
+        if cert and key:
+            if user.get("client-certificate-data"):
+                cert = base64.b64decode(cert).decode()
+                key = base64.b64decode(key).decode()
+                _load_cert_chain(ssl_context, cert, key)
+            else:
+                ssl_context.load_cert_chain(_resolve_path(target, cert), _resolve_path(target, key))
+        target["ssl"] = ssl_context
+    return target
+
+
+def _load_cert_chain(ssl_context: ssl.SSLContext, cert_pem: str, key_pem: str) -> None:
+    """Load in-memory PEM data; ssl only accepts files, so stage them briefly."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_file = os.path.join(tmp, "client.crt")
+        key_file = os.path.join(tmp, "client.key")
+        for path, data in ((cert_file, cert_pem), (key_file, key_pem)):
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+            with os.fdopen(fd, "w") as handle:
+                handle.write(data)
+        ssl_context.load_cert_chain(cert_file, key_file)
+
+
+def _run_exec_plugin(target: dict) -> dict:
+    """Run a kubeconfig exec credential plugin and parse its ExecCredential."""
+    spec = target["user"]["exec"]
+    env = dict(os.environ)
+    for item in spec.get("env") or []:
+        env[item["name"]] = item["value"]
+    env["KUBERNETES_EXEC_INFO"] = json.dumps({
+        "apiVersion": spec.get("apiVersion", "client.authentication.k8s.io/v1beta1"),
+        "kind": "ExecCredential",
+        "spec": {"interactive": False},
+    })
+    output = subprocess.check_output(
+        [spec["command"]] + list(spec.get("args") or []), env=env, text=True, timeout=30
+    )
+    status = json.loads(output).get("status", {})
+
+    expires = None
+    if status.get("expirationTimestamp"):
+        expires = datetime.fromisoformat(status["expirationTimestamp"].replace("Z", "+00:00"))
+        expires -= CREDENTIAL_SKEW
+
+    credential = {"token": status.get("token"), "expires": expires, "ssl": None}
+    if status.get("clientCertificateData") and status.get("clientKeyData") and target["ssl"]:
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = target["ssl"].check_hostname
+        ssl_context.verify_mode = target["ssl"].verify_mode
+        if ssl_context.verify_mode != ssl.CERT_NONE:
+            for ca in target["ssl"].get_ca_certs(binary_form=True):
+                ssl_context.load_verify_locations(cadata=ca)
+        _load_cert_chain(ssl_context, status["clientCertificateData"], status["clientKeyData"])
+        credential["ssl"] = ssl_context
+    return credential
+
+
+def make_backend(name: str, runner: Callable[[str, Optional[str], list], Optional[str]] = run_kubectl):
+    """Build the backend selected with --backend."""
+    if name == "api":
+        return ApiBackend()
+    return KubectlBackend(runner)
+
+
+class KubeFetcher:
+    """Coalesce identical list calls within a single run.
+
+    `backend` is a KubectlBackend or ApiBackend; it may be swapped before
+    the first fetch (e.g. from a --backend flag). With a non-zero
+    `chunk_size`, iter_pages() streams PAGED_RESOURCES page by page; those
+    pages are neither cached nor coalesced, since holding them would defeat
+    paging. With `projection` set, backends that support it return records
+    built from a PROJECTIONS jsonpath template instead of full JSON.
+
+    Items of RECORD_TYPES resources are returned as __slots__ records
+    (PodRecord, ...) rather than API objects, so the summaries run over a
+    few flat attributes per object; other resources come back unchanged.
+
+    With a SnapshotCache set as `cache`, unpaged lists of those resources
+    are served from disk while younger than cache.max_age. Older snapshots
+    are revalidated by replaying a short watch from their resourceVersion
+    and applying the changes; only if that fails (e.g. 410 Gone) is the
+    list fetched again in full.
+    """
+
+    def __init__(self, backend, chunk_size: int = 0, projection: bool = False,
+                 cache: Optional[SnapshotCache] = None):
+        self.backend = backend
+        self.chunk_size = chunk_size
+        self.projection = projection
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._namespaces = {}
+
+    def plan(self, context: str, namespaces) -> None:
+        """Declare the namespaces that will be queried on a context."""
+        with self._lock:
+            self._namespaces.setdefault(context, set()).update(namespaces)
+
+    def reset(self) -> None:
+        """Forget cached results so the next fetch goes to the backend again."""
+        with self._lock:
+            self._calls.clear()
+
+    def list_items(self, context: str, namespace: Optional[str], resource: str,
+                   selector: Optional[str] = None) -> Optional[list]:
+        """Return the `items` of a list call, or None if the backend failed.
+
+        Raises json.JSONDecodeError if the backend returned malformed output.
+        """
+        planned = self._namespaces.get(context, ())
+        if namespace is not None and namespace in planned and len(planned) > 1:
+            by_namespace = self._call(
+                (context, ALL_NAMESPACES, resource, selector), self._load_partitioned
+            )
+            if by_namespace is None:
+                return None
+            return by_namespace.get(namespace, [])
+        return self._call((context, namespace, resource, selector), self._load_items)
+
+    def iter_pages(self, context: str, namespace: Optional[str], resource: str,
+                   selector: Optional[str] = None):
+        """Yield lists of items for a list call.
+
+        Without chunking this is a single page from list_items(). Raises
+        FetchError if the backend failed and json.JSONDecodeError on
+        malformed output.
+        """
+        if self.chunk_size > 0 and resource in PAGED_RESOURCES and not self._projected(resource):
+            try:
+                for items in self.backend.list_pages(context, namespace, resource, self.chunk_size, selector):
+                    with TRACER.phase("parse", context, resource):
+                        records = to_records(resource, items)
+                    yield records
+            except FetchError as exc:
+                if DEADLINES.expired(context) and not isinstance(exc, ClusterTimeout):
+                    raise ClusterTimeout(f"timed out fetching {resource}") from exc
+                raise
+            return
+        items = self.list_items(context, namespace, resource, selector)
+        if items is None:
+            if DEADLINES.expired(context):
+                raise ClusterTimeout(f"timed out fetching {resource}")
+            raise FetchError(f"unable to fetch {resource}")
+        yield items
+
+    def _call(self, key: tuple, loader: Callable[[tuple], object]):
+        with self._lock:
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = self._calls[key] = Future()
+        if owner:
+            try:
+                future.set_result(loader(key))
+            except Exception as exc:
+                future.set_exception(exc)
+        return future.result()
+
+    def _projected(self, resource: str) -> bool:
+        return self.projection and resource in PROJECTIONS and self.backend.supports_projection
+
+    def _load_items(self, key: tuple) -> Optional[list]:
+        cache = self.cache if key[2] in RECORD_TYPES else None
+        if cache is not None:
+            with TRACER.phase("parse", key[0], key[2]):
+                snapshot = cache.load(key)
+            if snapshot is not None:
+                if snapshot["age"] <= cache.max_age:
+                    return snapshot["items"]
+                if snapshot["resource_version"]:
+                    items = self._revalidate(key, snapshot)
+                    if items is not None:
+                        return items
+
+        resource_version = ""
+        if self._projected(key[2]):
+            # Projected rows are small, so let kubectl page the server calls.
+            items = self.backend.list_projected(*key, chunk_size=self.chunk_size)
+        elif getattr(self.backend, "streaming", False):
+            record_type = RECORD_TYPES.get(key[2])
+            listed = self.backend.list_streamed(*key, convert=record_type and record_type.from_object)
+            if listed is None:
+                return None
+            items, resource_version = listed
+        else:
+            document = self.backend.list(*key)
+            if document is None:
+                return None
+            resource_version = document.get("metadata", {}).get("resourceVersion", "")
+            with TRACER.phase("parse", key[0], key[2]):
+                items = to_records(key[2], document.get("items", []))
+        if cache is not None and items is not None:
+            cache.store(key, resource_version, items)
+        return items
+
+    def _revalidate(self, key: tuple, snapshot: dict) -> Optional[list]:
+        """Bring a stale snapshot up to date from a watch; None if that fails."""
+        context, namespace, resource, selector = key
+        from_object = RECORD_TYPES[resource].from_object
+        items = {(item.namespace, item.name): item for item in snapshot["items"]}
+        resource_version = snapshot["resource_version"]
+        start = time.perf_counter()
+        try:
+            for event in self.backend.watch(context, namespace, resource, resource_version,
+                                            REVALIDATE_TIMEOUT, selector):
+                obj = event.get("object", {})
+                metadata = obj.get("metadata", {})
+                resource_version = metadata.get("resourceVersion", resource_version)
+                name = (metadata.get("namespace", ""), metadata.get("name", ""))
+                if event.get("type") == "DELETED":
+                    items.pop(name, None)
+                elif event.get("type") in ("ADDED", "MODIFIED"):
+                    items[name] = from_object(obj)
+        except Exception:
+            return None
+        finally:
+            TRACER.record("fetch", context, resource, time.perf_counter() - start,
+                          bytes=0, exit_code=None, timed_out=False, revalidate=True)
+        items = list(items.values())
+        self.cache.store(key, resource_version, items)
+        return items
+
+    def _load_partitioned(self, key: tuple) -> Optional[dict]:
+        items = self._load_items(key)
+        if items is None:
+            return None
+        by_namespace = {}
+        for item in items:
+            if isinstance(item, dict):
+                namespace = item.get("metadata", {}).get("namespace", "")
+            else:
+                namespace = item.namespace
+            by_namespace.setdefault(namespace, []).append(item)
+        return by_namespace
+
+
+# Per-run fetch layer shared by every script in the process.
+FETCHER = KubeFetcher(KubectlBackend(run_kubectl))
+
+
+def discover_clusters(patterns: list, namespaces: Optional[list] = None) -> list:
+    """Add kubeconfig contexts matching any glob in `patterns` to CLUSTERS.
+
+    Each matching context is scanned in every namespace of `namespaces`, or
+    in the context's own default namespace ("default" if unset). Returns the
+    new env keys ("<context>/<namespace>") in kubeconfig order.
+    """
+    config = load_kubeconfig()
+    env_keys = []
+    for entry in config.get("contexts") or []:
+        name = entry.get("name", "")
+        if not any(fnmatchcase(name, pattern) for pattern in patterns):
+            continue
+        for namespace in namespaces or [(entry.get("context") or {}).get("namespace") or "default"]:
+            env_key = f"{name}/{namespace}"
+            CLUSTERS.setdefault(env_key, {
+                "name": name,
+                "context": name,
+                "namespace": namespace,
+                "alias": namespace,
+            })
+            env_keys.append(env_key)
+    return env_keys
+
+
+def run_scan(tasks: dict, concurrency: int, timed_out=None) -> dict:
+    """Run {key: callable} with at most `concurrency` in flight.
+
+    Returns {key: result}. Tasks still queued or running when the DEADLINES
+    budget runs out map to `timed_out`, so one slow cluster cannot hold up
+    the report; their kubectl calls are already capped by the same budget.
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = {key: pool.submit(task) for key, task in tasks.items()}
+        done, _ = wait(futures.values(), timeout=DEADLINES.budget_remaining())
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return {key: future.result() if future in done else timed_out
+            for key, future in futures.items()}
+
+
+class BackgroundRefresher:
+    """Re-run `collect()` every `interval` seconds on a daemon thread.
+
+    latest() hands out the most recent result without blocking on the
+    cluster. FETCHER is reset before each run so coalesced results never
+    outlive a cycle; a failed run keeps the previous result.
+    """
+
+    def __init__(self, collect: Callable[[], object], interval: float):
+        self.collect = collect
+        self.interval = interval
+        self._result = None
+        self._refreshed = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> "BackgroundRefresher":
+        threading.Thread(target=self._run, name="refresher", daemon=True).start()
+        return self
+
+    def latest(self, timeout: Optional[float] = None) -> tuple:
+        """Return (result, refreshed epoch); waits up to `timeout` for the first run."""
+        self._ready.wait(timeout)
+        with self._lock:
+            return self._result, self._refreshed
+
+    def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                FETCHER.reset()
+                result = self.collect()
+            except Exception as exc:
+                print(f"⚠️  Refresh failed: {exc}", file=sys.stderr, flush=True)
+            else:
+                with self._lock:
+                    self._result, self._refreshed = result, time.time()
+                self._ready.set()
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+class AdaptiveScheduler:
+    """Poll targets at intervals that follow how often each one changes.
+
+    `poll(key)` checks one target and returns True if its state changed
+    since the last poll; an exception counts as a failure. After a change
+    the key's interval halves (down to `min_interval`), after a quiet poll
+    it grows by half (up to `max_interval`), and it never drops below
+    LATENCY_FACTOR times the poll's own latency, so slow API servers are
+    asked less often. Failures back off exponentially per `group(key)`
+    (e.g. the context): while a group backs off, only the first key due
+    after each retry probes it and the others due meanwhile wait for that
+    probe's outcome, so an unreachable cluster costs one call per backoff
+    step. Due times carry +/-`jitter` and the first polls are spread over
+    `min_interval`, so instances started together drift apart.
+    """
+
+    # Minimum interval as a multiple of the last poll's latency.
+    LATENCY_FACTOR = 10
+
+    def __init__(self, poll: Callable[[str], bool], min_interval: float = 5,
+                 max_interval: float = 300, jitter: float = 0.2, concurrency: int = 8,
+                 group: Callable[[str], str] = lambda key: key,
+                 on_error: Optional[Callable[[str, Exception, float], None]] = None):
+        self.poll = poll
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.group = group
+        self.on_error = on_error
+        self.intervals = {}
+        self._failures = {}
+        self._retry_at = {}
+        self._probing = {}
+        self._parked = {}
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+
+    def add(self, key: str) -> None:
+        """Schedule a key, first polled within min_interval."""
+        with self._lock:
+            self.intervals[key] = self.min_interval
+            heapq.heappush(self._heap, (time.monotonic() + random.uniform(0, self.min_interval), key))
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._wake.set()
+
+    def run(self) -> None:
+        """Poll due keys on up to `concurrency` threads until stop() is called."""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while not self._stopped:
+                now = time.monotonic()
+                with self._lock:
+                    while self._heap and self._heap[0][0] <= now:
+                        _, key = heapq.heappop(self._heap)
+                        group = self.group(key)
+                        retry_at = self._retry_at.get(group)
+                        if retry_at is None:
+                            pool.submit(self._poll, key)
+                        elif retry_at > now:
+                            retry_at += random.uniform(0, self.jitter * self.min_interval)
+                            heapq.heappush(self._heap, (retry_at, key))
+                        elif group in self._probing:
+                            # Another key is probing the group; wait for its outcome.
+                            self._parked.setdefault(group, []).append(key)
+                        else:
+                            self._probing[group] = key
+                            pool.submit(self._poll, key)
+                    wait_for = self._heap[0][0] - now if self._heap else None
+                self._wake.wait(wait_for)
+                self._wake.clear()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self, key: str) -> None:
+        start = time.monotonic()
+        try:
+            changed, error = self.poll(key), None
+        except Exception as exc:
+            changed, error = False, exc
+        now = time.monotonic()
+        group = self.group(key)
+        with self._lock:
+            parked = []
+            if self._probing.get(group) == key:
+                del self._probing[group]
+                parked = self._parked.pop(group, [])
+            if error is not None:
+                # Keys of a group already backing off do not extend the backoff.
+                if self._retry_at.get(group, 0) <= start:
+                    failures = self._failures[group] = self._failures.get(group, 0) + 1
+                    backoff = min(self.max_interval, self.min_interval * 2 ** failures)
+                    # Jitter between half and all of the backoff.
+                    self._retry_at[group] = now + random.uniform(backoff / 2, backoff)
+                due = resume = self._retry_at[group]
+            else:
+                self._failures.pop(group, None)
+                self._retry_at.pop(group, None)
+                interval = self.intervals[key]
+                interval = interval / 2 if changed else interval * 1.5
+                interval = max(interval, self.min_interval, self.LATENCY_FACTOR * (now - start))
+                interval = self.intervals[key] = min(interval, self.max_interval)
+                due = now + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+                resume = now
+            heapq.heappush(self._heap, (due, key))
+            for other in parked:
+                heapq.heappush(self._heap, (resume + random.uniform(0, self.jitter * self.min_interval), other))
+        if error is not None and self.on_error:
+            self.on_error(key, error, due - now)
+        self._wake.set()
+
+
+class _StatusHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+            reply = self.server.answer(request)
+        except Exception as exc:
+            reply = {"error": str(exc)}
+        self.wfile.write(json.dumps(reply, default=str).encode() + b"\n")
+
+
+def serve_status(path: str, answer: Callable[[dict], dict], banner: str = "") -> None:
+    """Serve `answer(request)` as one JSON line per connection on a unix socket.
+
+    A stale socket file left by a dead daemon is replaced; a live one makes
+    this raise SystemExit. `banner` is printed once the socket is bound.
+    Runs until interrupted and removes the socket.
+    """
+    if os.path.exists(path):
+        try:
+            query_status(path, {}, timeout=1)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise SystemExit(f"❌ A status daemon is already listening on {path}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    server = socketserver.ThreadingUnixStreamServer(path, _StatusHandler)
+    server.daemon_threads = True
+    server.answer = answer
+    try:
+        os.chmod(path, 0o600)
+        if banner:
+            print(banner, flush=True)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _comma_list(value: str) -> list:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def add_common_arguments(parser, pods_only: bool = False) -> None:
+    """Add the target/--backend/fetch/scan/profiling options shared by the scripts."""
+    parser.add_argument(
+        "--env", "-e",
+        choices=["all", *CLUSTERS],
+        default="all",
+        help="Environment to check (default: all)"
+    )
+    parser.add_argument(
+        "--contexts",
+        type=_comma_list,
+        metavar="GLOB[,GLOB]",
+        help="Scan kubeconfig contexts matching these globs instead of --env"
+    )
+    parser.add_argument(
+        "--namespaces",
+        type=_comma_list,
+        metavar="NS[,NS]",
+        help="Namespaces to scan in each --contexts match (default: the context's namespace)"
+    )
+    parser.add_argument(
+        "--concurrency", "-j",
+        type=int,
+        default=8,
+        help="Maximum kubectl calls in flight at once (default: 8, 1 = sequential)"
+    )
+    parser.add_argument(
+        "--cluster-timeout",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="Report a cluster as timed out after SECONDS (default: 0 = no limit)"
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="Finish the whole scan within SECONDS (default: 0 = no limit)"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=os.environ.get("MDE_K8S_BACKEND", "kubectl"),
+        help="kubectl subprocesses or in-process API client (default: $MDE_K8S_BACKEND or kubectl)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=0,
+        help="List pods in pages of N to bound memory (default: 0 = single list)"
+    )
+    parser.add_argument(
+        "--projection",
+        action="store_true",
+        help=("Fetch only name/phase/restart fields via kubectl jsonpath" if pods_only
+              else "Fetch only the fields the summaries read via kubectl jsonpath")
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=float(os.environ.get("MDE_K8S_MAX_AGE", "0")),
+        metavar="SECONDS",
+        help=("Reuse on-disk snapshots up to SECONDS old and revalidate older ones "
+              "(default: $MDE_K8S_MAX_AGE or 0 = no cache)")
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-cluster spawn/fetch/parse/aggregate timing breakdown"
+    )
+    parser.add_argument(
+        "--trace-json",
+        metavar="PATH",
+        help="Write every recorded kubectl/API call as JSON to PATH"
+    )
+
+
+def apply_common_arguments(args) -> list:
+    """Configure FETCHER/TRACER/DEADLINES from parsed args; return the selected env keys.
+
+    With --contexts the targets are discovered from kubeconfig and added to
+    CLUSTERS; otherwise they are the --env selection.
+    """
+    FETCHER.backend = make_backend(args.backend)
+    FETCHER.chunk_size = args.chunk_size
+    FETCHER.projection = args.projection
+    FETCHER.cache = SnapshotCache(args.max_age) if args.max_age > 0 else None
+    TRACER.enabled = bool(args.profile or args.trace_json)
+    DEADLINES.configure(args.cluster_timeout, args.budget)
+    if args.contexts:
+        try:
+            env_keys = discover_clusters(args.contexts, args.namespaces)
+        except Exception as exc:
+            raise SystemExit(f"❌ Unable to read kubeconfig: {exc}")
+        if not env_keys:
+            raise SystemExit(f"❌ No kubeconfig contexts match {', '.join(args.contexts)}")
+    else:
+        env_keys = list(CLUSTERS) if args.env == "all" else [args.env]
+    for env_key in env_keys:
+        FETCHER.plan(CLUSTERS[env_key]['context'], [CLUSTERS[env_key]['namespace']])
+    return env_keys
+
+
+def report_profile(args) -> None:
+    """Emit --profile / --trace-json output after a run."""
+    if args.profile:
+        TRACER.print_profile()
+    if args.trace_json:
+        TRACER.write_json(args.trace_json)
@@ -0,0 +1,133 @@
+"""
+Parallel, bounded log capture for restart_monitor.py --collect-logs.
+
+For every restarted container of the listed pods, the previous
+container's log (the one that crashed) and the current one are fetched
+through FETCHER.backend.logs() by a pool of at most `concurrency`
+workers. Each log is bounded by --tail lines and --limit-bytes on the
+server side, and again while writing, and is streamed chunk by chunk
+into its file (gzip-compressed with --gzip), so a large log never sits in
+memory.
+
+Files land under DIR/<env>/<namespace>/<pod>/<container>.{previous,current}.log[.gz]
+and DIR/index.json lists every capture with its pod, restart details,
+size, whether it was truncated and any error.
+"""
+
+import gzip
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+from k8s_ops import FETCHER, KUBECTL_TIMEOUT, TRACER
+
+# Default --log-concurrency, --tail and --limit-bytes.
+LOG_CONCURRENCY = 8
+LOG_TAIL = 2000
+LOG_LIMIT_BYTES = 1024 * 1024
+
+INDEX_FILE = "index.json"
+
+
+def safe_name(text: str) -> str:
+    """Make a context, namespace or pod name usable as a path component."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", text).strip("._") or "_"
+
+
+def log_jobs(env_key: str, config: dict, pods: list) -> list:
+    """Return one job per (restarted container, previous/current) of PodRecords."""
+    jobs = []
+    for pod in pods:
+        for container in pod.restarted:
+            for previous in (True, False):
+                jobs.append({
+                    "env": env_key,
+                    "context": config['context'],
+                    "namespace": pod.namespace or config['namespace'],
+                    "pod": pod.name,
+                    "container": container,
+                    "previous": previous,
+                    "restarts": pod.restarts,
+                    "last_reason": pod.last_reason,
+                    "exit_code": pod.exit_code,
+                })
+    return jobs
+
+
+def capture_log(job: dict, directory: str, tail: Optional[int], limit_bytes: int,
+                compress: bool, timeout: float = KUBECTL_TIMEOUT) -> dict:
+    """Stream one container log to disk; return the job with its index fields."""
+    kind = "previous" if job["previous"] else "current"
+    relative = os.path.join(
+        safe_name(job["env"]), safe_name(job["namespace"]), safe_name(job["pod"]),
+        f"{safe_name(job['container'])}.{kind}.log" + (".gz" if compress else ""),
+    )
+    path = os.path.join(directory, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    truncated = False
+    timed_out = False
+    error = None
+    start = time.perf_counter()
+    opener = gzip.open if compress else open
+    try:
+        with opener(path, "wb") as handle:
+            for chunk in FETCHER.backend.logs(job["context"], job["namespace"], job["pod"],
+                                              job["container"], job["previous"], tail,
+                                              limit_bytes, timeout):
+                if limit_bytes and written + len(chunk) > limit_bytes:
+                    chunk = chunk[:limit_bytes - written]
+                    truncated = True
+                handle.write(chunk)
+                written += len(chunk)
+                if truncated:
+                    break
+    except TimeoutError as exc:
+        timed_out = True
+        error = str(exc) or "timed out"
+    except Exception as exc:
+        error = str(exc) or type(exc).__name__
+    seconds = time.perf_counter() - start
+    TRACER.record("fetch", job["context"], "logs", seconds, bytes=written, exit_code=None,
+                  timed_out=timed_out)
+    if error and not written:
+        os.remove(path)
+        relative = None
+    # kubectl stops at --limit-bytes itself, so a log that fills it was cut too.
+    truncated = truncated or (bool(limit_bytes) and written >= limit_bytes)
+    return dict(job, kind=kind, path=relative, bytes=written, truncated=truncated,
+                seconds=round(seconds, 3), error=error)
+
+
+def collect_logs(jobs: list, directory: str, concurrency: int = LOG_CONCURRENCY,
+                 tail: Optional[int] = LOG_TAIL, limit_bytes: int = LOG_LIMIT_BYTES,
+                 compress: bool = False) -> list:
+    """Capture every job's log with at most `concurrency` in flight; write the index.
+
+    Returns the index entries in job order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        entries = list(pool.map(
+            lambda job: capture_log(job, directory, tail, limit_bytes, compress), jobs
+        ))
+    write_index(directory, entries)
+    return entries
+
+
+def write_index(directory: str, entries: list) -> str:
+    """Write DIR/index.json atomically and return its path."""
+    path = os.path.join(directory, INDEX_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as handle:
+        json.dump({
+            "collected": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "logs": entries,
+        }, handle, indent=2)
+        handle.write("\n")
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Kubernetes Summary Metrics Exporter
+
+Serves the cluster_status.py summaries and per-pod restart counts as
+Prometheus / OpenMetrics gauges over HTTP.
+Usage: python3 metrics_exporter.py [--env ENV | --contexts GLOB] [--port N]
+
+Clusters are scanned on a background thread every --interval seconds and
+the exposition text is rendered once per refresh, so a scrape only copies
+the latest snapshot: scrape cost and API server load do not depend on how
+many scrapers there are or how often they poll.
+
+Endpoints:
+  /metrics   OpenMetrics when the scraper accepts it, Prometheus text otherwise
+  /          a short index page
+
+Metrics (all gauges, labelled env/context/namespace):
+  mde_k8s_pods{phase}                 pods by running/pending/failed/other
+  mde_k8s_pod_restarts                sum of container restarts
+  mde_k8s_pod_restart_count{pod}      restarts of each pod with --min-restarts+
+  mde_k8s_deployments{state}          deployments by ready/progressing/degraded
+  mde_k8s_nodes{condition}            nodes by ready/not_ready
+  mde_k8s_up{kind}                    1 if the last fetch of kind succeeded
+  mde_k8s_last_refresh_timestamp_seconds, mde_k8s_refresh_duration_seconds
+
+Accepts the shared --backend/--chunk-size/--projection/--max-age and
+--cluster-timeout/--budget options; the deadlines apply to each refresh.
+"""
+
+import argparse
+import signal
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from k8s_ops import (
+    CLUSTERS,
+    DEADLINES,
+    BackgroundRefresher,
+    add_common_arguments,
+    apply_common_arguments,
+)
+from cluster_status import collect_cluster_status
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# name -> help text, in exposition order
+METRICS = {
+    "mde_k8s_up": "Whether the last fetch of a resource kind succeeded.",
+    "mde_k8s_pods": "Pods by phase.",
+    "mde_k8s_pod_restarts": "Sum of container restarts over all pods.",
+    "mde_k8s_pod_restart_count": "Container restarts of pods at or above --min-restarts.",
+    "mde_k8s_deployments": "Deployments by rollout state.",
+    "mde_k8s_nodes": "Nodes by Ready condition.",
+    "mde_k8s_last_refresh_timestamp_seconds": "Unix time the last refresh finished.",
+    "mde_k8s_refresh_duration_seconds": "Wall time of the last refresh.",
+}
+
+
+def escape_label(value: str) -> str:
+    """Escape a label value for the text exposition formats."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def labels(**pairs) -> str:
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in pairs.items()) + "}"
+
+
+def collect_metrics(env_keys: list, args) -> dict:
+    """Scan every env once and return {metric name: [(labels, value), ...]}."""
+    started = time.monotonic()
+    DEADLINES.configure(args.cluster_timeout, args.budget)
+    # Summaries and per-pod restart counts come from one pass over each pod list.
+    status = collect_cluster_status(env_keys, args.concurrency, (args.min_restarts, args.top))
+
+    samples = {name: [] for name in METRICS}
+    for env_key in env_keys:
+        config = CLUSTERS[env_key]
+        base = {"env": env_key, "context": config['context'], "namespace": config['namespace']}
+        summaries = status[env_key]
+        for kind in ("pods", "deployments", "nodes"):
+            summary = summaries[kind]
+            samples["mde_k8s_up"].append((labels(**base, kind=kind), 0 if "error" in summary else 1))
+
+        pods = summaries["pods"]
+        if "error" not in pods:
+            for phase in ("running", "pending", "failed", "other"):
+                samples["mde_k8s_pods"].append((labels(**base, phase=phase), pods[phase]))
+            samples["mde_k8s_pod_restarts"].append((labels(**base), pods["restarts"]))
+        if summaries["restarts"] is not None:
+            for pod in summaries["restarts"][1]:
+                samples["mde_k8s_pod_restart_count"].append((labels(**base, pod=pod.name), pod.restarts))
+
+        deploys = summaries["deployments"]
+        if "error" not in deploys:
+            for state in ("ready", "progressing", "degraded"):
+                samples["mde_k8s_deployments"].append((labels(**base, state=state), deploys[state]))
+
+        nodes = summaries["nodes"]
+        if "error" not in nodes:
+            for condition in ("ready", "not_ready"):
+                samples["mde_k8s_nodes"].append((labels(**base, condition=condition), nodes[condition]))
+
+    samples["mde_k8s_last_refresh_timestamp_seconds"].append(("", round(time.time(), 3)))
+    samples["mde_k8s_refresh_duration_seconds"].append(("", round(time.monotonic() - started, 6)))
+    return samples
+
+
+def render(samples: dict) -> bytes:
+    """Render samples as OpenMetrics text (also valid Prometheus text)."""
+    lines = []
+    for name, help_text in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{label_set} {value}" for label_set, value in samples[name])
+    lines.append("# EOF")
+    return ("\n".join(lines) + "\n").encode()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serve the refresher's latest rendering; never touches the clusters."""
+
+    refresher = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, _ = self.refresher.latest(timeout=30)
+            if body is None:
+                self.send_error(503, "first refresh still running")
+                return
+            accept = self.headers.get("Accept", "")
+            self.send_response(200)
+            self.send_header("Content-Type",
+                             OPENMETRICS_TYPE if "application/openmetrics-text" in accept else PROMETHEUS_TYPE)
+        elif path == "/":
+            body = b'<html><body><a href="/metrics">metrics</a></body></html>\n'
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+        else:
+            self.send_error(404)
+            return
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kubernetes Summary Metrics Exporter")
+    add_common_arguments(parser)
+    parser.add_argument(
+        "--listen",
+        default="127.0.0.1",
+        help="Address to bind (default: 127.0.0.1)"
+    )
+    parser.add_argument(
+        "--port", "-p",
+        type=int,
+        default=9464,
+        help="Port to serve /metrics on (default: 9464)"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=30,
+        help="Seconds between cluster refreshes (default: 30)"
+    )
+    parser.add_argument(
+        "--min-restarts",
+        type=int,
+        default=1,
+        help="Export per-pod restart counts for pods with N or more restarts (default: 1)"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=0,
+        help="Export per-pod restart counts for at most N pods per environment (default: all)"
+    )
+    args = parser.parse_args()
+    env_keys = apply_common_arguments(args)
+
+    MetricsHandler.refresher = BackgroundRefresher(
+        lambda: render(collect_metrics(env_keys, args)), args.interval
+    ).start()
+    server = ThreadingHTTPServer((args.listen, args.port), MetricsHandler)
+    server.daemon_threads = True
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"📈 Serving metrics on http://{args.listen}:{args.port}/metrics "
+          f"(refresh every {args.interval:g}s, Ctrl-C to stop)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
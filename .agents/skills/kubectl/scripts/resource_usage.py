@@ -0,0 +1,259 @@
+"""
+CPU and memory usage against requests and limits, for cluster_status.py --report usage.
+
+summarize_usage() joins every running pod (PodRecord: owner, requests,
+limits) with its metrics-API usage (UsageRecord, what `kubectl top pods`
+shows) and groups the pods by owning workload: Deployment/<name> through
+the pod's ReplicaSet, otherwise its controller, otherwise the bare pod.
+p50/p95/max of CPU and memory per workload come from one vectorized pass
+over a pods x columns matrix (group_percentiles); nodes are summarized the
+same way against their allocatable capacity (`kubectl top nodes`).
+
+Every pod is also measured against its own requests and limits, so a
+rollout mixing old and new specs is judged pod by pod. Workloads whose
+busiest pod reaches HIGH_UTILIZATION of its limit are listed as at or over
+limit (CPU throttling, OOM kills), and those whose p95 stays at or below
+LOW_UTILIZATION of the request as under-utilized.
+
+NumPy is optional: without it group_percentiles sorts each group in pure
+Python. Both paths use nearest-rank percentiles and give the same numbers.
+"""
+
+import math
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; group_percentiles falls back to pure Python
+    np = None
+
+# Percentiles reported per workload and node; 100 is the max.
+USAGE_PERCENTILES = (50, 95, 100)
+
+# Max usage at or above this fraction of a limit lists a workload as at or over limit.
+HIGH_UTILIZATION = 0.9
+
+# p95 usage at or below this fraction of the request lists a workload as under-utilized.
+LOW_UTILIZATION = 0.2
+
+# Default --usage-top: rows per list.
+USAGE_TOP = 10
+
+# Columns of the per-pod matrix: usage (cores, bytes), the pod's requests and
+# limits (0.0 = unset) and usage as a fraction of them (0.0 when unset).
+USAGE_COLUMNS = ("cpu", "memory", "cpu_request", "cpu_limit", "memory_request", "memory_limit",
+                 "cpu_of_request", "cpu_of_limit", "memory_of_request", "memory_of_limit")
+
+
+def percentile_label(percent: int) -> str:
+    return "max" if percent == 100 else f"p{percent}"
+
+
+def nearest_rank(count: int, percent: int) -> int:
+    """Index of the nearest-rank `percent` percentile in `count` sorted values."""
+    return max(1, math.ceil(count * percent / 100)) - 1
+
+
+def group_percentiles(groups: list, rows: list, percents: tuple = USAGE_PERCENTILES,
+                      vectorized: bool = None) -> list:
+    """Percentiles of every column of `rows` within each group.
+
+    `groups[i]` is the group (0..G-1, every one used) of `rows[i]`, a
+    tuple of C numbers. Returns G nested lists of P x C values, using
+    nearest rank so every value is an observed one. With NumPy (or
+    vectorized=True) all columns are ranked by one 2-D argsort and sorted
+    by (group, rank) packed into one int64 key, and the percentiles are
+    picked by fancy indexing: no Python loop over pods, groups or columns.
+    """
+    if not rows:
+        return []
+    if vectorized is None:
+        vectorized = np is not None
+    if vectorized:
+        keys = np.asarray(groups, dtype=np.int64)
+        values = np.array(rows, dtype=float)
+        count = len(keys)
+        sizes = np.bincount(keys)
+        starts = np.cumsum(sizes) - sizes
+        ranks = np.maximum(np.ceil(np.outer(sizes, percents) / 100).astype(np.int64), 1) - 1
+        order = np.argsort(values, axis=0)
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(count)[:, None], axis=0)
+        packed = np.sort(keys[:, None] * count + rank, axis=0)
+        picked = packed[starts[:, None] + ranks] % count
+        by_value = np.take_along_axis(values, order, axis=0)
+        return by_value[picked, np.arange(values.shape[1])].tolist()
+
+    members = [[] for _ in range(max(groups) + 1)]
+    for group, row in zip(groups, rows):
+        members[group].append(row)
+    result = []
+    for group_rows in members:
+        columns = [sorted(column) for column in zip(*group_rows)]
+        result.append([[column[nearest_rank(len(column), percent)] for column in columns]
+                       for percent in percents])
+    return result
+
+
+def percentiles(stats: list, column: int) -> dict:
+    """{"p50": ..., "p95": ..., "max": ...} of one column of a group's P x C stats."""
+    return {percentile_label(percent): stats[n][column] for n, percent in enumerate(USAGE_PERCENTILES)}
+
+
+def summarize_nodes(nodes: list, node_usage: list) -> dict:
+    """Node count and p50/p95/max of CPU and memory use as fractions of allocatable."""
+    usage = {record.name: record for record in node_usage}
+    rows = [
+        (usage[node.name].cpu / node.cpu_allocatable, usage[node.name].memory / node.memory_allocatable)
+        for node in nodes
+        if node.name in usage and node.cpu_allocatable and node.memory_allocatable
+    ]
+    if not rows:
+        return {"nodes": 0}
+    stats = group_percentiles([0] * len(rows), rows)[0]
+    return {"nodes": len(rows), "cpu": percentiles(stats, 0), "memory": percentiles(stats, 1)}
+
+
+def summarize_usage(pods: list, pod_usage: list, nodes: list = None, node_usage: list = None,
+                    high: float = HIGH_UTILIZATION, low: float = LOW_UTILIZATION) -> dict:
+    """Per-workload usage against requests/limits for one namespace's pods.
+
+    Returns {"pods", "missing", "workloads", "over_limit", "under_utilized",
+    "nodes"}: "missing" counts running pods without metrics, workloads are
+    sorted by p95 CPU, and each workload's request/limit is its median
+    pod's (0.0 = unset). Usage and usage-of-request/limit columns are
+    percentile dicts. "nodes" is summarize_nodes() or None.
+    """
+    usage = {record.name: record for record in pod_usage}
+    owners = {}
+    groups = []
+    rows = []
+    missing = 0
+    for pod in pods:
+        if pod.phase != "Running":
+            continue
+        metrics = usage.get(pod.name)
+        if metrics is None:
+            missing += 1
+            continue
+        groups.append(owners.setdefault(pod.owner or f"Pod/{pod.name}", len(owners)))
+        bounds = (pod.cpu_request, pod.cpu_limit, pod.memory_request, pod.memory_limit)
+        used = (metrics.cpu, metrics.cpu, metrics.memory, metrics.memory)
+        rows.append((metrics.cpu, metrics.memory) + bounds +
+                     tuple(u / b if b else 0.0 for u, b in zip(used, bounds)))
+
+    stats = group_percentiles(groups, rows)
+    sizes = Counter(groups)
+    workloads = []
+    for owner, index in owners.items():
+        workload = {"workload": owner, "pods": sizes[index]}
+        for column, name in enumerate(USAGE_COLUMNS):
+            bound = 2 <= column < 6
+            workload[name] = stats[index][0][column] if bound else percentiles(stats[index], column)
+        workloads.append(workload)
+    workloads.sort(key=lambda w: (-w["cpu"]["p95"], w["workload"]))
+
+    over_limit = []
+    under_utilized = []
+    for workload in workloads:
+        for resource in ("cpu", "memory"):
+            of_limit = workload[f"{resource}_of_limit"]["max"]
+            of_request = workload[f"{resource}_of_request"]["p95"]
+            entry = {"workload": workload["workload"], "resource": resource, "pods": workload["pods"]}
+            if workload[f"{resource}_limit"] and of_limit >= high:
+                over_limit.append(dict(entry, bound=workload[f"{resource}_limit"], ratio=of_limit))
+            if workload[f"{resource}_request"] and of_request <= low:
+                under_utilized.append(dict(entry, bound=workload[f"{resource}_request"], ratio=of_request))
+    over_limit.sort(key=lambda entry: -entry["ratio"])
+    # Lowest ratio first; among equals, the workload reserving the most idle capacity.
+    under_utilized.sort(key=lambda entry: (round(entry["ratio"], 2), -entry["pods"]))
+
+    return {
+        "pods": len(rows),
+        "missing": missing,
+        "workloads": workloads,
+        "over_limit": over_limit,
+        "under_utilized": under_utilized,
+        "nodes": summarize_nodes(nodes, node_usage) if nodes is not None and node_usage is not None else None,
+    }
+
+
+def format_cpu(cores: float) -> str:
+    return f"{cores * 1000:.0f}m" if cores < 1 else f"{cores:.2f}"
+
+
+def format_bytes(value: float) -> str:
+    for unit, size in (("Gi", 2 ** 30), ("Mi", 2 ** 20), ("Ki", 2 ** 10)):
+        if value >= size:
+            return f"{value / size:.1f}{unit}" if unit == "Gi" else f"{value / size:.0f}{unit}"
+    return f"{value:.0f}"
+
+
+FORMATTERS = {"cpu": format_cpu, "memory": format_bytes}
+
+
+def format_spread(resource: str, used: dict) -> str:
+    fmt = FORMATTERS[resource]
+    return " / ".join(fmt(used[percentile_label(percent)]) for percent in USAGE_PERCENTILES)
+
+
+def print_usage_environment(config: dict, usage: dict, top: int = USAGE_TOP) -> int:
+    """Print one env's summarize_usage() result; return how many workloads are at or over limit."""
+    print(f"\n📍 {config['name']} ({config['alias']})")
+    print("-" * 50)
+
+    if "error" in usage:
+        print(f"   🔴 {usage['error']}")
+        return 0
+
+    nodes = usage["nodes"]
+    if nodes and nodes["nodes"]:
+        cpu = " / ".join(f"{nodes['cpu'][percentile_label(p)]:.0%}" for p in USAGE_PERCENTILES)
+        memory = " / ".join(f"{nodes['memory'][percentile_label(p)]:.0%}" for p in USAGE_PERCENTILES)
+        print(f"   🖥️  Nodes ({nodes['nodes']}): CPU {cpu}, memory {memory} of allocatable")
+
+    workloads = usage["workloads"]
+    missing = f" ({usage['missing']} running without metrics)" if usage["missing"] else ""
+    print(f"   📦 {len(workloads)} workload(s), {usage['pods']} pod(s) with metrics{missing}")
+    if not workloads:
+        return 0
+
+    print("\n   Busiest by CPU p95 (CPU, memory: " +
+          " / ".join(percentile_label(p) for p in USAGE_PERCENTILES) + "):")
+    for workload in workloads[:top or None]:
+        print(f"      {workload['workload']} [{workload['pods']}]  "
+              f"cpu {format_spread('cpu', workload['cpu'])}  "
+              f"memory {format_spread('memory', workload['memory'])}")
+
+    over_limit = usage["over_limit"]
+    if over_limit:
+        print(f"\n   🔥 At or over limit (max ≥ {HIGH_UTILIZATION:.0%} of limit): {len(over_limit)}")
+        for entry in over_limit[:top or None]:
+            fmt = FORMATTERS[entry["resource"]]
+            print(f"      {entry['workload']} [{entry['pods']}]  {entry['resource']} max "
+                  f"{entry['ratio']:.0%} of limit ({fmt(entry['bound'])})")
+    else:
+        print("\n   ✅ No workload near its limits")
+
+    under = usage["under_utilized"]
+    if under:
+        print(f"\n   💤 Under-utilized (p95 ≤ {LOW_UTILIZATION:.0%} of request): {len(under)}")
+        for entry in under[:top or None]:
+            fmt = FORMATTERS[entry["resource"]]
+            print(f"      {entry['workload']} [{entry['pods']}]  {entry['resource']} p95 "
+                  f"{entry['ratio']:.0%} of request ({fmt(entry['bound'])})")
+    return len({entry["workload"] for entry in over_limit})
+
+
+def print_usage_report(env_keys: list, clusters: dict, results: dict, top: int = USAGE_TOP) -> None:
+    """Print every env's usage summary and the number of workloads at or over limit."""
+    print("📊 Resource Usage (metrics API, like kubectl top)")
+    print("=" * 50)
+    hot = 0
+    for env_key in env_keys:
+        hot += print_usage_environment(clusters[env_key], results[env_key], top)
+    print("\n" + "=" * 50)
+    if hot:
+        print(f"🔥 Total: {hot} workload(s) at or over a limit")
+    else:
+        print("✅ No workload at or over a limit")
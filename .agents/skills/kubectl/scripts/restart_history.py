@@ -0,0 +1,198 @@
+"""
+Per-pod restart count history for restart_monitor.py --rate.
+
+Samples live in a SQLite database (default:
+~/.cache/macos-development-environment/k8s/restart-history.sqlite3) and
+are stored only when a pod is first seen or its restart count changes, so
+a quiet pod costs one row no matter how often the monitor runs. The
+restart count at any time is the latest sample at or before it, and the
+restarts in a window are the current count minus that value.
+
+prune() keeps the table small over months of history: samples older than
+DOWNSAMPLE_AFTER are thinned to the last one per hour, and samples and
+pods older than the retention period are dropped. The latest sample before
+each cutoff is always kept so window baselines stay exact.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from k8s_ops import CACHE_DIR
+
+HISTORY_DB = os.environ.get("MDE_K8S_HISTORY_DB") or os.path.join(CACHE_DIR, "restart-history.sqlite3")
+
+# Samples older than this are thinned to one per pod per hour.
+DOWNSAMPLE_AFTER = 2 * 24 * 3600
+
+# Default --retention (days).
+RETENTION_DAYS = 90
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pods (
+    id INTEGER PRIMARY KEY,
+    context TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    name TEXT NOT NULL,
+    last_seen INTEGER NOT NULL,
+    UNIQUE (context, namespace, uid)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    pod_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    restarts INTEGER NOT NULL,
+    PRIMARY KEY (pod_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+"""
+
+
+def parse_duration(text: str) -> int:
+    """Turn "90s", "5m", "1h" or "7d" into seconds."""
+    match = re.fullmatch(r"\s*(\d+)\s*([smhd])\s*", text)
+    if not match:
+        raise ValueError(f"invalid duration {text!r} (use e.g. 5m, 1h, 24h)")
+    return int(match.group(1)) * UNITS[match.group(2)]
+
+
+def parse_rates(text: str) -> list:
+    """Parse "3/5m,10/1h" into [(label, seconds, min restarts), ...], shortest window first."""
+    rates = []
+    for part in text.split(","):
+        count, _, window = part.strip().partition("/")
+        if not count.isdigit() or not window:
+            raise ValueError(f"invalid rate {part!r} (use COUNT/WINDOW, e.g. 3/5m)")
+        rates.append((window.strip(), parse_duration(window), int(count)))
+    return sorted(rates, key=lambda rate: rate[1])
+
+
+class RestartHistory:
+    """Append-on-change store of per-pod restart counts.
+
+    One connection is shared by the monitor's threads behind a lock; WAL
+    mode lets a concurrent run (e.g. a cron job) read while another writes.
+    """
+
+    def __init__(self, path: str = HISTORY_DB):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def record(self, context: str, pods: list, now: Optional[int] = None) -> dict:
+        """Store the restart counts of PodRecords seen at `now`; return {uid: pod id}."""
+        now = int(now if now is not None else time.time())
+        ids = {}
+        with self._lock, self._db:
+            known = {
+                (namespace, uid): (pod_id, restarts)
+                for namespace, uid, pod_id, restarts in self._db.execute(
+                    """
+                    SELECT namespace, uid, id, (
+                        SELECT restarts FROM samples WHERE pod_id = pods.id ORDER BY ts DESC LIMIT 1
+                    ) FROM pods WHERE context = ?
+                    """,
+                    (context,),
+                )
+            }
+            seen, changed = [], []
+            for pod in pods:
+                uid = pod.uid or pod.name
+                pod_id, last = known.get((pod.namespace, uid), (None, None))
+                if pod_id is None:
+                    pod_id = self._db.execute(
+                        "INSERT INTO pods (context, namespace, uid, name, last_seen) VALUES (?, ?, ?, ?, ?)",
+                        (context, pod.namespace, uid, pod.name, now),
+                    ).lastrowid
+                else:
+                    seen.append((now, pod_id))
+                if last != pod.restarts:
+                    changed.append((pod_id, now, pod.restarts))
+                ids[uid] = pod_id
+            self._db.executemany("UPDATE pods SET last_seen = ? WHERE id = ?", seen)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO samples (pod_id, ts, restarts) VALUES (?, ?, ?)", changed
+            )
+        return ids
+
+    def increases(self, pod_ids: dict, pods: list, windows: list, now: Optional[int] = None) -> dict:
+        """Return {uid: [restarts in each window]} for pods that restarted in any window.
+
+        `windows` are lengths in seconds. A pod first seen inside a window
+        counts from its first sample, so restarts before the monitor first
+        saw it never alert.
+        """
+        now = int(now if now is not None else time.time())
+        longest = max(windows)
+        result = {}
+        with self._lock:
+            changed = {
+                row[0] for row in self._db.execute(
+                    "SELECT DISTINCT pod_id FROM samples WHERE ts > ?", (now - longest,)
+                )
+            }
+            for pod in pods:
+                uid = pod.uid or pod.name
+                pod_id = pod_ids.get(uid)
+                if pod_id not in changed:
+                    continue
+                counts = []
+                for window in windows:
+                    row = self._db.execute(
+                        "SELECT restarts FROM samples WHERE pod_id = ? AND ts <= ? ORDER BY ts DESC LIMIT 1",
+                        (pod_id, now - window),
+                    ).fetchone()
+                    if row is None:
+                        row = self._db.execute(
+                            "SELECT restarts FROM samples WHERE pod_id = ? ORDER BY ts LIMIT 1", (pod_id,)
+                        ).fetchone()
+                    counts.append(max(0, pod.restarts - row[0]))
+                if any(counts):
+                    result[uid] = counts
+        return result
+
+    def prune(self, retention: int = RETENTION_DAYS * 86400, now: Optional[int] = None) -> None:
+        """Downsample old samples and drop pods/samples past `retention` seconds."""
+        now = int(now if now is not None else time.time())
+        retain_from = now - retention
+        downsample_before = now - DOWNSAMPLE_AFTER
+        with self._lock, self._db:
+            # Keep the last sample per pod per hour before the downsample cutoff.
+            self._db.execute(
+                """
+                DELETE FROM samples WHERE ts < :cutoff AND EXISTS (
+                    SELECT 1 FROM samples later
+                    WHERE later.pod_id = samples.pod_id AND later.ts > samples.ts
+                      AND later.ts < :cutoff AND later.ts / 3600 = samples.ts / 3600
+                )
+                """,
+                {"cutoff": downsample_before},
+            )
+            # Past retention only each pod's latest sample (its baseline) survives.
+            self._db.execute(
+                """
+                DELETE FROM samples WHERE ts < :cutoff AND EXISTS (
+                    SELECT 1 FROM samples later
+                    WHERE later.pod_id = samples.pod_id AND later.ts > samples.ts
+                      AND later.ts < :cutoff
+                )
+                """,
+                {"cutoff": retain_from},
+            )
+            stale = "SELECT id FROM pods WHERE last_seen < ?"
+            self._db.execute(f"DELETE FROM samples WHERE pod_id IN ({stale})", (retain_from,))
+            self._db.execute("DELETE FROM pods WHERE last_seen < ?", (retain_from,))
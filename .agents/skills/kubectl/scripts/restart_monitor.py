@@ -3,115 +3,140 @@
 Pod Restart Monitor
 
 Monitors pods with high restart counts across environments.
-Usage: python3 restart_monitor.py [--threshold N] [--env ENV]
+Usage: python3 restart_monitor.py [--threshold N] [--env ENV] [--watch | --monitor]
 
 Options:
   --threshold N   Alert on pods with N or more restarts (default: 3)
   --env ENV       Environment to check: all, prod, staging, local (default: all)
+
+Run with --help for the fetch, event, log, rate and profiling options.
 """
 
-import subprocess
+import heapq
 import json
 import argparse
-from datetime import datetime
-from typing import Optional
-
-
-CLUSTERS = {
-    "prod": {
-        "name": "Production",
-        "context": "arn:aws:eks:us-east-1:830101142436:cluster/production",
-        "namespace": "production",
-        "alias": "k1"
-    },
-    "staging": {
-        "name": "Staging",
-        "context": "arn:aws:eks:us-east-1:830101142436:cluster/production",
-        "namespace": "staging",
-        "alias": "k2"
-    },
-    "local": {
-        "name": "Local K3s",
-        "context": "k3s-117",
-        "namespace": "simplex",
-        "alias": "k"
-    }
-}
-
-
-def run_kubectl(context: str, namespace: str, args: list) -> Optional[str]:
-    """Execute kubectl command and return output."""
-    cmd = ["kubectl", f"--context={context}", f"-n={namespace}"] + args
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+from typing import Callable, Optional
+
+from k8s_ops import (
+    CLUSTERS,
+    DEADLINES,
+    FETCHER,
+    TRACER,
+    AdaptiveScheduler,
+    ClusterTimeout,
+    FetchError,
+    PodRecord,
+    WatchExpired,
+    add_common_arguments,
+    apply_common_arguments,
+    report_profile,
+    run_scan,
+    to_records,
+)
+from aggregators import Offenders, fold
+from restart_history import HISTORY_DB, RETENTION_DAYS, RestartHistory, parse_rates
+from log_capture import LOG_CONCURRENCY, LOG_LIMIT_BYTES, LOG_TAIL, collect_logs, log_jobs
+
+# Warning events shown per pod with --with-events, newest first.
+EVENTS_PER_POD = 3
+
+
+def get_pod_events(context: str, namespace: str, pods: list) -> Optional[dict]:
+    """Return {pod uid: [EventRecord, ...]} of recent Warning events about `pods`.
+
+    The namespace's events are listed once (through FETCHER, so envs that
+    share a context share the call) and indexed by involvedObject uid, so
+    the cost does not grow with the number of pods. Each pod keeps its
+    EVENTS_PER_POD most recent warnings. Returns None if the events could
+    not be fetched.
+    """
+    wanted = {pod.uid for pod in pods if pod.uid}
+    if not wanted:
+        return {}
+    index = {}
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        if result.returncode == 0:
-            return result.stdout
+        for page in FETCHER.iter_pages(context, namespace, "events"):
+            with TRACER.phase("aggregate", context, "events"):
+                for event in page:
+                    if event.type == "Warning" and event.object_kind == "Pod" and event.object_uid in wanted:
+                        index.setdefault(event.object_uid, []).append(event)
+    except (FetchError, json.JSONDecodeError):
         return None
-    except (subprocess.TimeoutExpired, Exception):
+    newest = lambda event: event.last_seen or 0  # noqa: E731
+    return {uid: heapq.nlargest(EVENTS_PER_POD, events, key=newest) for uid, events in index.items()}
+
+
+def get_restart_offenders(context: str, namespace: str, threshold: int,
+                          top: int = 0, with_events: bool = False) -> Optional[tuple]:
+    """Return (count, pods) for pods with restart count >= threshold.
+
+    `pods` holds the `top` offenders (all of them if top is 0) as PodRecords,
+    most restarts first. Pages are folded into a heap bounded by `top`, so
+    only the selected records are kept and no full sort is needed. With
+    `with_events`, a third element holds get_pod_events() for those pods.
+    Returns None if the cluster ran out of time.
+    """
+    try:
+        pages = FETCHER.iter_pages(context, namespace, "pods")
+        count, pods = fold(pages, {"offenders": Offenders(threshold, top)}, context)["offenders"]
+    except ClusterTimeout:
         return None
+    except (FetchError, json.JSONDecodeError):
+        count, pods = 0, []
+    if with_events:
+        return count, pods, get_pod_events(context, namespace, pods)
+    return count, pods
 
 
 def get_pods_with_restarts(context: str, namespace: str, threshold: int) -> list:
-    """Get pods with restart count >= threshold."""
-    output = run_kubectl(context, namespace, ["get", "pods", "-o", "json"])
+    """Get PodRecords with restart count >= threshold, most restarts first."""
+    return (get_restart_offenders(context, namespace, threshold) or (0, []))[1]
+
 
-    if not output:
-        return []
+def get_restart_rates(context: str, namespace: str, history: RestartHistory,
+                      rates: list, top: int = 0, with_events: bool = False) -> Optional[tuple]:
+    """Record restart counts and return (count, [(pod, increases), ...]).
 
+    `rates` comes from parse_rates(); a pod is listed when its restarts in
+    any window reach that window's count. `increases` holds the restarts per
+    window, and pods are ordered by them, shortest window first. With
+    `with_events`, a third element holds get_pod_events() for the listed
+    pods. Returns None if the cluster ran out of time.
+    """
     try:
-        data = json.loads(output)
-        pods = data.get("items", [])
-
-        results = []
-        for pod in pods:
-            name = pod.get("metadata", {}).get("name", "unknown")
-            container_statuses = pod.get("status", {}).get("containerStatuses", [])
-
-            total_restarts = 0
-            last_restart = None
-
-            for cs in container_statuses:
-                restarts = cs.get("restartCount", 0)
-                total_restarts += restarts
-
-                # Get last termination time
-                last_state = cs.get("lastState", {})
-                terminated = last_state.get("terminated", {})
-                if terminated:
-                    finished = terminated.get("finishedAt")
-                    if finished:
-                        try:
-                            dt = datetime.fromisoformat(finished.replace("Z", "+00:00"))
-                            if last_restart is None or dt > last_restart:
-                                last_restart = dt
-                        except ValueError:
-                            pass
-
-            if total_restarts >= threshold:
-                results.append({
-                    "name": name,
-                    "restarts": total_restarts,
-                    "last_restart": last_restart,
-                    "status": pod.get("status", {}).get("phase", "Unknown")
-                })
-
-        return sorted(results, key=lambda x: x["restarts"], reverse=True)
-    except json.JSONDecodeError:
-        return []
-
-
-def format_time_ago(dt: Optional[datetime]) -> str:
-    """Format datetime as relative time."""
-    if dt is None:
+        pods = [pod for page in FETCHER.iter_pages(context, namespace, "pods") for pod in page]
+    except ClusterTimeout:
+        return None
+    except (FetchError, json.JSONDecodeError):
+        return (0, [], {}) if with_events else (0, [])
+
+    now = int(time.time())
+    pod_ids = history.record(context, pods, now)
+    increases = history.increases(pod_ids, pods, [seconds for _, seconds, _ in rates], now)
+    with TRACER.phase("aggregate", context, "pods"):
+        offenders = [
+            (pod, increases[pod.uid or pod.name]) for pod in pods
+            if any(got >= want for got, (_, _, want) in zip(increases.get(pod.uid or pod.name, ()), rates))
+        ]
+        key = lambda offender: offender[1]  # noqa: E731
+        selected = heapq.nlargest(top, offenders, key=key) if top else sorted(offenders, key=key, reverse=True)
+    if with_events:
+        return len(offenders), selected, get_pod_events(context, namespace, [pod for pod, _ in selected])
+    return len(offenders), selected
+
+
+def format_time_ago(epoch: Optional[float]) -> str:
+    """Format epoch seconds as relative time."""
+    if epoch is None:
         return "N/A"
 
-    now = datetime.now(dt.tzinfo)
-    delta = now - dt
+    now = datetime.now(timezone.utc)
+    delta = now - datetime.fromtimestamp(epoch, timezone.utc)
 
     if delta.days > 0:
         return f"{delta.days}d ago"
@@ -123,26 +148,305 @@ def format_time_ago(dt: Optional[datetime]) -> str:
         return "just now"
 
 
-def check_environment(env_key: str, config: dict, threshold: int) -> int:
+def print_pod_details(pod: PodRecord, events: Optional[dict]) -> None:
+    """Print a pod's last termination and its get_pod_events() warnings."""
+    if pod.last_reason or pod.exit_code is not None:
+        exit_code = f" (exit {pod.exit_code})" if pod.exit_code is not None else ""
+        print(f"      Last exit: {pod.last_reason or 'Unknown'}{exit_code}")
+    for event in (events or {}).get(pod.uid, ()):
+        count = f" ×{event.count}" if event.count > 1 else ""
+        message = " ".join(event.message.split())
+        if len(message) > 100:
+            message = message[:99] + "…"
+        print(f"      ⚠️  {event.reason}{count} ({format_time_ago(event.last_seen)}): {message}")
+
+
+def check_environment(env_key: str, config: dict, threshold: int, top: int = 0) -> int:
     """Check a single environment and return count of problematic pods."""
+    offenders = get_restart_offenders(config['context'], config['namespace'], threshold, top)
+    return print_environment(config, threshold, offenders)
+
+
+def print_environment(config: dict, threshold: int, offenders: Optional[tuple]) -> int:
+    """Print one environment's get_restart_offenders() result; return its count."""
     print(f"\n📍 {config['name']} ({config['alias']})")
     print("-" * 50)
 
-    pods = get_pods_with_restarts(config['context'], config['namespace'], threshold)
+    if offenders is None:
+        print("   ⏱️  Timed out")
+        return 0
 
-    if not pods:
+    count, pods = offenders[:2]
+    if not count:
         print(f"   ✅ No pods with {threshold}+ restarts")
         return 0
 
-    print(f"   ⚠️  Found {len(pods)} pod(s) with {threshold}+ restarts:\n")
+    print(f"   ⚠️  Found {count} pod(s) with {threshold}+ restarts:\n")
+    with_events = len(offenders) > 2
+    if with_events and offenders[2] is None:
+        print("   (events unavailable)")
 
     for pod in pods:
-        icon = "🔴" if pod['restarts'] >= 10 else "🟡"
-        last = format_time_ago(pod['last_restart'])
-        print(f"   {icon} {pod['name']}")
-        print(f"      Restarts: {pod['restarts']} | Last: {last} | Status: {pod['status']}")
+        icon = "🔴" if pod.restarts >= 10 else "🟡"
+        last = format_time_ago(pod.last_termination)
+        print(f"   {icon} {pod.name}")
+        print(f"      Restarts: {pod.restarts} | Last: {last} | Status: {pod.phase}")
+        if with_events:
+            print_pod_details(pod, offenders[2])
+
+    if count > len(pods):
+        print(f"\n   … and {count - len(pods)} more (showing top {len(pods)})")
+
+    return count
+
+
+def print_rate_environment(config: dict, rates: list, offenders: Optional[tuple]) -> int:
+    """Print one environment's get_restart_rates() result; return its count."""
+    print(f"\n📍 {config['name']} ({config['alias']})")
+    print("-" * 50)
+
+    spec = ", ".join(f"{count}/{label}" for label, _, count in rates)
+    if offenders is None:
+        print("   ⏱️  Timed out")
+        return 0
+
+    count, pods = offenders[:2]
+    if not count:
+        print(f"   ✅ No pods restarting at {spec} or faster")
+        return 0
+
+    print(f"   ⚠️  Found {count} pod(s) restarting at {spec} or faster:\n")
+    with_events = len(offenders) > 2
+    if with_events and offenders[2] is None:
+        print("   (events unavailable)")
+
+    for pod, increases in pods:
+        # Red while the shortest window is still breached, i.e. crashlooping now.
+        icon = "🔴" if increases[0] >= rates[0][2] else "🟡"
+        windows = " | ".join(f"{label} +{got}" for (label, _, _), got in zip(rates, increases))
+        print(f"   {icon} {pod.name}")
+        print(f"      Restarts: {windows} | Total: {pod.restarts} | "
+              f"Last: {format_time_ago(pod.last_termination)} | Status: {pod.phase}")
+        if with_events:
+            print_pod_details(pod, offenders[2])
 
-    return len(pods)
+    if count > len(pods):
+        print(f"\n   … and {count - len(pods)} more (showing top {len(pods)})")
+
+    return count
+
+
+def print_restart_report(env_keys: list, clusters: dict, results: dict,
+                         print_env: Callable) -> bool:
+    """Print every env's result and the totals; return True if all pods are healthy.
+
+    `print_env(config, offenders=...)` prints one env (print_environment
+    with a threshold, or print_rate_environment with rates).
+    """
+    total_issues = 0
+    timed_out = 0
+    for env_key in env_keys:
+        total_issues += print_env(clusters[env_key], offenders=results[env_key])
+        timed_out += results[env_key] is None
+
+    print("\n" + "=" * 50)
+    if total_issues > 0:
+        print(f"⚠️  Total: {total_issues} pod(s) need attention")
+    elif not timed_out:
+        print("✅ All pods healthy")
+    if timed_out:
+        print(f"⏱️  {timed_out} environment(s) timed out")
+    return total_issues == 0 and not timed_out
+
+
+def collect_listed_logs(env_keys: list, results: dict, args) -> None:
+    """Run --collect-logs over the pods listed in each env's result and summarise."""
+    jobs = []
+    for env_key in env_keys:
+        if results[env_key] is None:
+            continue
+        pods = results[env_key][1]
+        if args.rate:
+            pods = [pod for pod, _ in pods]
+        jobs += log_jobs(env_key, CLUSTERS[env_key], pods)
+    if not jobs:
+        print("\n📦 No restarted containers to collect logs from")
+        return
+
+    start = time.monotonic()
+    tail = args.tail if args.tail >= 0 else None
+    entries = collect_logs(jobs, args.collect_logs, args.log_concurrency, tail,
+                           args.limit_bytes, args.gzip)
+    saved = [entry for entry in entries if entry["path"]]
+    failed = sum(1 for entry in entries if entry["error"])
+    truncated = sum(1 for entry in entries if entry["truncated"])
+    size = sum(entry["bytes"] for entry in entries)
+    pods = len({(entry["env"], entry["namespace"], entry["pod"]) for entry in entries})
+    print(f"\n📦 Saved {len(saved)} log(s) of {pods} pod(s), {size / 1024:.0f} KiB, "
+          f"to {args.collect_logs} in {time.monotonic() - start:.1f}s")
+    if truncated:
+        print(f"   ✂️  {truncated} log(s) cut at --limit-bytes {args.limit_bytes}")
+    if failed:
+        print(f"   ⚠️  {failed} log(s) unavailable (see index.json)")
+
+
+# Serialises alert output from the per-environment watch threads.
+PRINT_LOCK = threading.Lock()
+
+# Reconnect backoff bounds for --watch (seconds).
+WATCH_BACKOFF_MIN = 1
+WATCH_BACKOFF_MAX = 60
+
+
+def pod_key(pod: PodRecord) -> str:
+    """Stable key for the restart table (uid, falling back to name)."""
+    return pod.uid or pod.name
+
+
+def apply_pod_event(table: dict, pod: PodRecord, threshold: int) -> Optional[int]:
+    """Update the restart table; return the previous count if the pod crossed threshold."""
+    key = pod_key(pod)
+    previous = table.get(key, 0)
+    table[key] = pod.restarts
+    if previous < threshold <= pod.restarts:
+        return previous
+    return None
+
+
+def print_restart_alert(config: dict, pod: PodRecord, previous: int, threshold: int) -> None:
+    """Print a single threshold-crossing alert."""
+    icon = "🔴" if pod.restarts >= 10 else "🟡"
+    stamp = datetime.now().strftime("%H:%M:%S")
+    with PRINT_LOCK:
+        print(f"[{stamp}] {icon} {config['name']} ({config['alias']}): {pod.name}")
+        print(f"      Restarts: {previous} -> {pod.restarts} (threshold {threshold}) | "
+              f"Last: {format_time_ago(pod.last_termination)} | Status: {pod.phase}", flush=True)
+
+
+def relist_pods(config: dict, table: dict, threshold: int, baseline: bool) -> str:
+    """List pods, rebuild the restart table and return the list resourceVersion.
+
+    On the first (baseline) list only a summary is printed; on later relists
+    pods that crossed the threshold while disconnected are alerted. The
+    backend list keeps the server's resourceVersion (`kubectl get --raw`),
+    so the next watch replays only changes, not every pod as ADDED.
+    """
+    document = FETCHER.backend.list(config['context'], config['namespace'], "pods")
+    if document is None:
+        raise ConnectionError(f"unable to list pods in {config['namespace']}")
+
+    previous_table = dict(table)
+    table.clear()
+    for pod in to_records("pods", document.get("items", [])):
+        key = pod_key(pod)
+        if key in previous_table:
+            table[key] = previous_table[key]
+        previous = apply_pod_event(table, pod, threshold)
+        if previous is not None and not baseline:
+            print_restart_alert(config, pod, previous, threshold)
+
+    if baseline:
+        offenders = sum(1 for restarts in table.values() if restarts >= threshold)
+        with PRINT_LOCK:
+            print(f"📍 {config['name']} ({config['alias']}): watching {len(table)} pod(s), "
+                  f"{offenders} already at {threshold}+ restarts", flush=True)
+    return document.get("metadata", {}).get("resourceVersion", "")
+
+
+def watch_environment(config: dict, threshold: int, timeout_seconds: int) -> None:
+    """Follow pod changes for one environment, alerting on threshold crossings.
+
+    Resumes from the last seen resourceVersion after a disconnect and only
+    relists when the server reports it as expired (410 Gone) or resuming
+    keeps failing.
+    """
+    table = {}
+    resource_version = None
+    baseline = True
+    backoff = WATCH_BACKOFF_MIN
+    while True:
+        try:
+            if resource_version is None:
+                resource_version = relist_pods(config, table, threshold, baseline)
+                baseline = False
+            for event in FETCHER.backend.watch(
+                config['context'], config['namespace'], "pods", resource_version, timeout_seconds
+            ):
+                obj = event.get("object", {})
+                resource_version = obj.get("metadata", {}).get("resourceVersion", resource_version)
+                pod = PodRecord.from_object(obj)
+                if event.get("type") == "DELETED":
+                    table.pop(pod_key(pod), None)
+                elif event.get("type") in ("ADDED", "MODIFIED"):
+                    previous = apply_pod_event(table, pod, threshold)
+                    if previous is not None:
+                        print_restart_alert(config, pod, previous, threshold)
+                backoff = WATCH_BACKOFF_MIN
+        except WatchExpired:
+            resource_version = None
+        except Exception as exc:
+            with PRINT_LOCK:
+                print(f"   ⚠️  {config['name']}: watch interrupted ({exc}); "
+                      f"retrying in {backoff}s", file=sys.stderr, flush=True)
+            time.sleep(backoff)
+            if backoff >= WATCH_BACKOFF_MAX // 2:
+                # Resuming keeps failing; the resourceVersion may be gone.
+                resource_version = None
+            backoff = min(backoff * 2, WATCH_BACKOFF_MAX)
+
+
+def watch_environments(env_keys: list, threshold: int, timeout_seconds: int) -> int:
+    """Run watch_environment for each env in a daemon thread until interrupted."""
+    print("   Mode: watch (Ctrl-C to stop)")
+    print("=" * 50, flush=True)
+    for env_key in env_keys:
+        threading.Thread(
+            target=watch_environment,
+            args=(CLUSTERS[env_key], threshold, timeout_seconds),
+            name=f"watch-{env_key}",
+            daemon=True,
+        ).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        return 0
+
+
+def monitor_environments(env_keys: list, threshold: int, min_interval: float,
+                         max_interval: float, concurrency: int) -> int:
+    """Poll every env on an AdaptiveScheduler, alerting on threshold crossings."""
+    print(f"   Mode: monitor, every {min_interval:g}-{max_interval:g}s (Ctrl-C to stop)")
+    print("=" * 50, flush=True)
+    tables = {env_key: None for env_key in env_keys}
+
+    def poll(env_key: str) -> bool:
+        table = tables[env_key]
+        baseline = table is None
+        if baseline:
+            table = {}
+        before = dict(table)
+        relist_pods(CLUSTERS[env_key], table, threshold, baseline)
+        tables[env_key] = table
+        return table != before
+
+    def on_error(env_key: str, exc: Exception, retry_in: float) -> None:
+        config = CLUSTERS[env_key]
+        with PRINT_LOCK:
+            print(f"   ⚠️  {config['name']} ({config['alias']}): poll failed ({exc}); "
+                  f"retrying in {retry_in:.0f}s", file=sys.stderr, flush=True)
+
+    scheduler = AdaptiveScheduler(
+        poll, min_interval, max_interval, concurrency=concurrency,
+        group=lambda env_key: CLUSTERS[env_key]['context'], on_error=on_error,
+    )
+    for env_key in env_keys:
+        scheduler.add(env_key)
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
 
 
 def main():
@@ -154,37 +458,160 @@ def main():
         help="Alert on pods with N or more restarts (default: 3)"
     )
     parser.add_argument(
-        "--env", "-e",
-        choices=["all", "prod", "staging", "local"],
-        default="all",
-        help="Environment to check (default: all)"
+        "--top",
+        type=int,
+        default=0,
+        help="Show only the N pods with the most restarts per environment (default: all)"
+    )
+    add_common_arguments(parser, pods_only=True)
+    parser.add_argument(
+        "--watch", "-w",
+        action="store_true",
+        help="Keep running: follow the pod watch stream and alert as soon as a pod crosses the threshold"
+    )
+    parser.add_argument(
+        "--monitor",
+        action="store_true",
+        help=("Keep running, re-listing each environment as often as its pods change "
+              "(for clusters where long watches are unavailable); backs off per unreachable context")
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=5,
+        metavar="SECONDS",
+        help="Shortest --monitor poll interval (default: 5)"
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=300,
+        metavar="SECONDS",
+        help="Longest --monitor poll interval and backoff (default: 300)"
+    )
+    parser.add_argument(
+        "--watch-timeout",
+        type=int,
+        default=300,
+        help="Server-side timeout of each watch request in seconds (default: 300)"
+    )
+    parser.add_argument(
+        "--with-events",
+        action="store_true",
+        help=("Show last termination reasons and recent Warning events of listed pods "
+              "(one event list per namespace)")
+    )
+    parser.add_argument(
+        "--collect-logs",
+        metavar="DIR",
+        help=("Save previous and current logs of restarted containers of listed pods under DIR, "
+              "with an index.json describing every capture")
+    )
+    parser.add_argument(
+        "--log-concurrency",
+        type=int,
+        default=LOG_CONCURRENCY,
+        metavar="N",
+        help=f"Logs fetched in parallel with --collect-logs (default: {LOG_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--tail",
+        type=int,
+        default=LOG_TAIL,
+        metavar="LINES",
+        help=f"Lines kept from the end of each log, -1 for all (default: {LOG_TAIL})"
+    )
+    parser.add_argument(
+        "--limit-bytes",
+        type=int,
+        default=LOG_LIMIT_BYTES,
+        metavar="N",
+        help=f"Bytes kept per log, 0 for no limit (default: {LOG_LIMIT_BYTES})"
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Gzip the logs written by --collect-logs"
+    )
+    parser.add_argument(
+        "--rate",
+        metavar="SPEC",
+        help=("Alert on restarts per window instead of totals, e.g. 3/5m,10/1h,20/24h; "
+              "every run records counts in --history-db, so run it regularly for the windows to fill")
+    )
+    parser.add_argument(
+        "--history-db",
+        default=HISTORY_DB,
+        metavar="PATH",
+        help="SQLite restart history for --rate (default: $MDE_K8S_HISTORY_DB or the k8s cache dir)"
+    )
+    parser.add_argument(
+        "--retention",
+        type=float,
+        default=RETENTION_DAYS,
+        metavar="DAYS",
+        help=f"Days of restart history to keep (default: {RETENTION_DAYS})"
     )
     args = parser.parse_args()
+    rates = None
+    continuous = "--watch" if args.watch else "--monitor" if args.monitor else None
+    if args.watch and args.monitor:
+        parser.error("--watch cannot be combined with --monitor")
+    if args.with_events and continuous:
+        parser.error(f"--with-events cannot be combined with {continuous}")
+    if args.collect_logs and continuous:
+        parser.error(f"--collect-logs cannot be combined with {continuous}")
+    if not 0 < args.min_interval <= args.max_interval:
+        parser.error("--min-interval must be positive and at most --max-interval")
+    if args.rate:
+        if continuous:
+            parser.error(f"--rate cannot be combined with {continuous}")
+        try:
+            rates = parse_rates(args.rate)
+        except ValueError as exc:
+            parser.error(str(exc))
+    env_keys = apply_common_arguments(args)
 
     print("🔄 Pod Restart Monitor")
-    print(f"   Threshold: {args.threshold}+ restarts")
-    print("=" * 50)
+    if rates:
+        print(f"   Rate: {', '.join(f'{count}+ restarts in {label}' for label, _, count in rates)}")
+    else:
+        print(f"   Threshold: {args.threshold}+ restarts")
 
-    total_issues = 0
+    if args.watch or args.monitor:
+        # Deadlines bound one-shot scans; watch and monitor run until interrupted.
+        DEADLINES.configure()
+        if args.monitor:
+            return monitor_environments(env_keys, args.threshold, args.min_interval,
+                                        args.max_interval, args.concurrency)
+        return watch_environments(env_keys, args.threshold, args.watch_timeout)
 
-    if args.env == "all":
-        for env_key, config in CLUSTERS.items():
-            total_issues += check_environment(env_key, config, args.threshold)
-    else:
-        config = CLUSTERS.get(args.env)
-        if config:
-            total_issues += check_environment(args.env, config, args.threshold)
-        else:
-            print(f"Unknown environment: {args.env}")
-            return 1
+    print("=" * 50)
 
-    print("\n" + "=" * 50)
-    if total_issues > 0:
-        print(f"⚠️  Total: {total_issues} pod(s) need attention")
+    history = RestartHistory(args.history_db) if rates else None
+    if history:
+        check = partial(get_restart_rates, history=history, rates=rates, top=args.top,
+                        with_events=args.with_events)
     else:
-        print("✅ All pods healthy")
-
-    return 0 if total_issues == 0 else 1
+        check = partial(get_restart_offenders, threshold=args.threshold, top=args.top,
+                        with_events=args.with_events)
+    results = run_scan({
+        env_key: partial(check, CLUSTERS[env_key]['context'], CLUSTERS[env_key]['namespace'])
+        for env_key in env_keys
+    }, args.concurrency)
+    if history:
+        print_env = partial(print_rate_environment, rates=rates)
+    else:
+        print_env = partial(print_environment, threshold=args.threshold)
+    healthy = print_restart_report(env_keys, CLUSTERS, results, print_env)
+    if args.collect_logs:
+        collect_listed_logs(env_keys, results, args)
+    if history:
+        history.prune(int(args.retention * 86400))
+        history.close()
+
+    report_profile(args)
+    return 0 if healthy else 1
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+"""
+Thin client for the resident `cluster_status.py --daemon`.
+
+cluster_status.py hands `--client` runs to main() here before importing
+the fetch stack (k8s_ops, aggregators, ...), so polling the daemon from a
+prompt or dashboard costs one socket round trip. This module imports only
+small standard-library modules and parses its options by hand; the daemon
+decides which environments exist. query_status and the status report
+printer are shared with the daemon side.
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+
+# Unix socket of the cluster_status.py --daemon (MDE_K8S_SOCKET overrides);
+# the default lives in k8s_ops.CACHE_DIR.
+DAEMON_SOCKET = os.environ.get("MDE_K8S_SOCKET") or os.path.join(
+    os.environ.get("MDE_K8S_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "macos-development-environment", "k8s",
+    ),
+    "cluster_status.sock",
+)
+
+# Seconds a --client request waits for the daemon's first refresh.
+DAEMON_READY_TIMEOUT = 10
+
+# Summary for a fetch that ran past --cluster-timeout or --budget.
+TIMED_OUT = {"error": "Timed out"}
+
+# Options a --client run accepts -> key in parse_client_args()'s result.
+CLIENT_OPTIONS = {"--env": "env", "-e": "env", "--socket": "socket"}
+
+
+def query_status(path: str, request: dict, timeout: float = 5.0) -> dict:
+    """Send one request to a serve_status() socket and return its JSON reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as reply:
+            line = reply.readline()
+    if not line:
+        raise ConnectionError(f"no reply from {path}")
+    return json.loads(line)
+
+
+def print_cluster_status(env_key: str, config: dict, status: dict):
+    """Print status for a single cluster from its collected summaries."""
+    print(f"\n{'='*60}")
+    print(f"📍 {config['name']} ({config['alias']})")
+    print(f"   Context: {config['context']}")
+    print(f"   Namespace: {config['namespace']}")
+    print(f"{'='*60}")
+
+    # Pods
+    pods = status["pods"]
+    if "error" in pods:
+        print(f"\n🔴 Pods: {pods['error']}")
+    else:
+        status_icon = "🟢" if pods['failed'] == 0 and pods['pending'] == 0 else "🟡"
+        if pods['failed'] > 0:
+            status_icon = "🔴"
+        print(f"\n{status_icon} Pods: {pods['running']}/{pods['total']} running")
+        if pods['pending'] > 0:
+            print(f"   ⏳ Pending: {pods['pending']}")
+        if pods['failed'] > 0:
+            print(f"   ❌ Failed: {pods['failed']}")
+        if pods['restarts'] > 0:
+            print(f"   🔄 Total restarts: {pods['restarts']}")
+
+    # Deployments
+    deploys = status["deployments"]
+    if "error" in deploys:
+        print(f"\n🔴 Deployments: {deploys['error']}")
+    else:
+        status_icon = "🟢" if deploys['degraded'] == 0 else "🔴"
+        print(f"\n{status_icon} Deployments: {deploys['ready']}/{deploys['total']} ready")
+        if deploys['progressing'] > 0:
+            print(f"   🔄 Progressing: {deploys['progressing']}")
+        if deploys['degraded'] > 0:
+            print(f"   ❌ Degraded: {deploys['degraded']}")
+
+    # Nodes (only show once per unique context)
+    nodes = status["nodes"]
+    if nodes == TIMED_OUT:
+        print(f"\n🔴 Nodes: {nodes['error']}")
+    elif "error" not in nodes:
+        status_icon = "🟢" if nodes['not_ready'] == 0 else "🔴"
+        print(f"\n{status_icon} Nodes: {nodes['ready']}/{nodes['total']} ready")
+
+
+def print_report(env_keys: list, clusters: dict, results: dict, age: float = None):
+    """Print the full report; `age` notes how old a daemon snapshot is."""
+    print("🔍 Kubernetes Cluster Status Report")
+    if age is not None:
+        print(f"   Snapshot: {age:.0f}s old (from status daemon)")
+    print(f"{'='*60}")
+
+    for env_key in env_keys:
+        print_cluster_status(env_key, clusters[env_key], results[env_key])
+
+    print(f"\n{'='*60}")
+    print("✅ Status check complete")
+
+
+def client_requested(argv: list) -> bool:
+    """True for a --client run (--help still goes to cluster_status.py's parser)."""
+    return "--client" in argv and not {"-h", "--help"} & set(argv)
+
+
+def parse_client_args(argv: list) -> dict:
+    """Parse `--client [--env ENV] [--socket PATH]`; raise ValueError on anything else."""
+    options = {"env": "all", "socket": DAEMON_SOCKET}
+    args = iter(argv)
+    for arg in args:
+        if arg == "--client":
+            continue
+        name, sep, value = arg.partition("=")
+        if name not in CLIENT_OPTIONS:
+            raise ValueError(f"argument not supported with --client: {arg}")
+        if not sep:
+            value = next(args, None)
+            if value is None:
+                raise ValueError(f"argument {name}: expected one argument")
+        options[CLIENT_OPTIONS[name]] = value
+    return options
+
+
+def main(argv: list = None) -> int:
+    """Print the report from a running --daemon."""
+    try:
+        options = parse_client_args(sys.argv[1:] if argv is None else argv)
+    except ValueError as exc:
+        print(f"cluster_status.py: error: {exc}", file=sys.stderr)
+        return 2
+    try:
+        reply = query_status(options["socket"], {"env": options["env"]},
+                             timeout=DAEMON_READY_TIMEOUT + 5)
+    except OSError:
+        print(f"❌ No status daemon on {options['socket']} (start one with --daemon)", file=sys.stderr)
+        return 1
+    if "error" in reply:
+        print(f"❌ Status daemon: {reply['error']}", file=sys.stderr)
+        return 1
+    try:
+        print_report(reply["env_keys"], reply["clusters"], reply["results"],
+                     age=time.time() - reply["refreshed"])
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader (e.g. `| head`) went away; point stdout at devnull so
+        # the flush at exit does not fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    return 0
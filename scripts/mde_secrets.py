@@ -0,0 +1,379 @@
+"""Batched, memoized secret resolution for the scripts/ Python helpers.
+
+A SecretResolver looks up a whole list of Keychain services in one batch
+and remembers every answer for the life of the process. Between the
+environment variable and the secret store it keeps the precedence the
+verify scripts always used: with MDE_SECRET_OVERRIDE=1 (the default) the
+store wins, otherwise the environment does.
+
+The store is pluggable (MDE_SECRET_BACKEND or --backend):
+  keychain  macOS Keychain (default), parallel `security` calls; with
+            MDE_KEYCHAIN_FRAMEWORK=1, read in-process through
+            Security.framework (ctypes) first
+  file      KEY=VALUE lines of $MDE_ENV_FILE
+            (~/.config/macos-development-environment/secrets.env)
+  memory    a dict, for tests and for running on Linux
+
+Every store can also store() a value (set-keychain-secret.py --bulk).
+Run directly to report which secrets resolve (values are never printed);
+--env-first --any-account gives the lookup secrets-smoke-test.sh always
+made (environment first, Keychain items of any account).
+"""
+import argparse
+import ctypes
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ENV_FILE = os.environ.get("MDE_ENV_FILE") or os.path.expanduser(
+    "~/.config/macos-development-environment/secrets.env"
+)
+
+# Keychain service -> environment variable
+SECRETS = {
+    "mde-github-token": "GITHUB_TOKEN",
+    "mde-openai-api-key": "OPENAI_API_KEY",
+    "mde-anthropic-api-key": "ANTHROPIC_API_KEY",
+    "mde-langsmith-api-key": "LANGSMITH_API_KEY",
+    "mde-gemini-api-key": "GEMINI_API_KEY",
+}
+
+SECURITY_FRAMEWORK = "/System/Library/Frameworks/Security.framework/Security"
+ERR_SEC_ITEM_NOT_FOUND = -25300
+
+# Parallel `security` processes per Keychain lookup.
+CLI_CONCURRENCY = 8
+
+
+def service_for(env_var):
+    """Keychain service of an environment variable: FOO_BAR -> mde-foo-bar."""
+    for service, name in SECRETS.items():
+        if name == env_var:
+            return service
+    return "mde-" + env_var.lower().replace("_", "-")
+
+
+def env_var_for(service):
+    """Environment variable of a service: SECRETS, else mde-foo-bar -> FOO_BAR."""
+    if service in SECRETS:
+        return SECRETS[service]
+    name = service[4:] if service.startswith("mde-") else service
+    return name.replace("-", "_").upper()
+
+
+class MemoryBackend:
+    """Secrets from a dict of service -> value."""
+
+    name = "memory"
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.lookups = 0
+        self.writes = 0
+
+    def lookup(self, services, account):
+        self.lookups += 1
+        return {service: self.values.get(service, "") for service in services}
+
+    def store(self, service, value, account):
+        self.writes += 1
+        self.values[service] = value
+
+
+class FileBackend:
+    """Secrets from a shell-style env file, matched by each service's env var.
+
+    Template placeholders (values ending in "...") count as unset.
+    """
+
+    name = "file"
+
+    def __init__(self, path=ENV_FILE):
+        self.path = path
+        self._values = None
+        self._lock = threading.Lock()
+
+    def lookup(self, services, account):
+        with self._lock:
+            if self._values is None:
+                self._values = parse_env_file(self.path)
+            return {service: self._values.get(env_var_for(service), "") for service in services}
+
+    def store(self, service, value, account):
+        with self._lock:
+            update_env_file(self.path, env_var_for(service), value)
+            self._values = None
+
+
+class KeychainBackend:
+    """Generic passwords from the login Keychain.
+
+    Services are read with the `security` tool, CLI_CONCURRENCY at a time.
+    Items it created (set-keychain-secret.py) trust only /usr/bin/security,
+    so reading them from this process can raise an access prompt; the
+    in-process Security.framework path is therefore opt-in (`framework`,
+    default MDE_KEYCHAIN_FRAMEWORK=1), and services it cannot read fall
+    back to the CLI. An empty account matches items of any account.
+    """
+
+    name = "keychain"
+
+    def __init__(self, framework=None):
+        if framework is None:
+            framework = os.environ.get("MDE_KEYCHAIN_FRAMEWORK") == "1"
+        self._security = load_security_framework() if framework else None
+
+    def lookup(self, services, account):
+        found = {}
+        pending = list(services)
+        if self._security is not None:
+            pending = []
+            for service in services:
+                value = self._framework_lookup(service, account)
+                if value is None:
+                    pending.append(service)
+                else:
+                    found[service] = value
+        if pending and shutil.which("security"):
+            with ThreadPoolExecutor(max_workers=min(CLI_CONCURRENCY, len(pending))) as pool:
+                found.update(zip(pending, pool.map(lambda s: cli_lookup(s, account), pending)))
+        return found
+
+    def store(self, service, value, account):
+        # -U updates an existing item in place: one process instead of delete + add.
+        result = subprocess.run(
+            ["security", "add-generic-password", "-U", "-a", account, "-s", service, "-w", value],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"security exited {result.returncode}")
+
+    def _framework_lookup(self, service, account):
+        """Return the value, "" if not found, or None to defer to the CLI."""
+        service_bytes, account_bytes = service.encode(), account.encode()
+        length = ctypes.c_uint32()
+        data = ctypes.c_void_p()
+        status = self._security.SecKeychainFindGenericPassword(
+            None, len(service_bytes), service_bytes, len(account_bytes), account_bytes or None,
+            ctypes.byref(length), ctypes.byref(data), None,
+        )
+        if status == ERR_SEC_ITEM_NOT_FOUND:
+            return ""
+        if status != 0:
+            return None
+        try:
+            return ctypes.string_at(data, length.value).decode("utf-8", "replace").strip()
+        finally:
+            self._security.SecKeychainItemFreeContent(None, data)
+
+
+def load_security_framework():
+    if sys.platform != "darwin":
+        return None
+    try:
+        lib = ctypes.cdll.LoadLibrary(SECURITY_FRAMEWORK)
+        find = lib.SecKeychainFindGenericPassword
+    except (OSError, AttributeError):
+        return None
+    find.argtypes = [
+        ctypes.c_void_p, ctypes.c_uint32, ctypes.c_char_p, ctypes.c_uint32, ctypes.c_char_p,
+        ctypes.POINTER(ctypes.c_uint32), ctypes.POINTER(ctypes.c_void_p), ctypes.c_void_p,
+    ]
+    find.restype = ctypes.c_int32
+    lib.SecKeychainItemFreeContent.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+    lib.SecKeychainItemFreeContent.restype = ctypes.c_int32
+    return lib
+
+
+def cli_lookup(service, account):
+    account_args = ["-a", account] if account else []
+    try:
+        return subprocess.check_output(
+            ["security", "find-generic-password", *account_args, "-s", service, "-w"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return ""
+
+
+def parse_env_file(path):
+    """Parse KEY=VALUE lines of a file; a missing file has no values."""
+    try:
+        with open(path) as handle:
+            return parse_env_lines(handle.read().splitlines())
+    except OSError:
+        return {}
+
+
+def parse_env_lines(lines):
+    """Parse KEY=VALUE lines (optional `export`, quotes and comments)."""
+    values = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[len("export "):].lstrip()
+        key, sep, raw = line.partition("=")
+        if not sep or not key.strip().isidentifier():
+            continue
+        try:
+            parts = shlex.split(raw, comments=True)
+        except ValueError:
+            continue
+        value = parts[0] if parts else ""
+        if value.endswith("..."):
+            value = ""
+        values[key.strip()] = value
+    return values
+
+
+def update_env_file(path, key, value):
+    """Set KEY=VALUE in an env file (replacing an existing line), atomically, mode 600."""
+    try:
+        with open(path) as handle:
+            lines = handle.read().splitlines()
+    except FileNotFoundError:
+        lines = []
+    line = f"{key}={shlex.quote(value)}"
+    for index, existing in enumerate(lines):
+        stripped = existing.strip()
+        prefix = "export " if stripped.startswith("export ") else ""
+        if stripped[len(prefix):].lstrip().partition("=")[0].strip() == key:
+            lines[index] = prefix + line
+            break
+    else:
+        lines.append(line)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".secrets.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as handle:
+            handle.write("\n".join(lines) + "\n")
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+BACKENDS = {"keychain": KeychainBackend, "file": FileBackend, "memory": MemoryBackend}
+
+
+def default_backend():
+    name = os.environ.get("MDE_SECRET_BACKEND") or "keychain"
+    if name not in BACKENDS:
+        raise ValueError(f"unknown MDE_SECRET_BACKEND {name!r} (use {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+class SecretResolver:
+    """Resolve services to (value, source) against the environment and a store.
+
+    resolve() looks up every service not yet known in a single
+    store.lookup() call and memoizes the answers, so each secret costs at
+    most one lookup per process. `source` is "env", the store's name, or
+    "" if the secret is missing.
+    """
+
+    def __init__(self, store=None, environ=None, account=None, prefer_store=None):
+        self.store = store if store is not None else default_backend()
+        self.environ = os.environ if environ is None else environ
+        self.account = account if account is not None else self.environ.get("USER", "")
+        if prefer_store is None:
+            prefer_store = self.environ.get("MDE_SECRET_OVERRIDE", "1") == "1"
+        self.prefer_store = prefer_store
+        self._stored = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, services):
+        """Return {service: (value, source)} for every service."""
+        stored = self._lookup(services)
+        return {service: self._choose(env_var_for(service), value) for service, value in stored.items()}
+
+    def get(self, service, env_var=None):
+        """Resolve one service; `env_var` overrides its environment variable."""
+        return self._choose(env_var or env_var_for(service), self._lookup([service])[service])
+
+    def _lookup(self, services):
+        services = list(dict.fromkeys(services))
+        with self._lock:
+            missing = [service for service in services if service not in self._stored]
+            if missing:
+                found = self.store.lookup(missing, self.account)
+                self._stored.update((service, found.get(service, "")) for service in missing)
+            return {service: self._stored[service] for service in services}
+
+    def _choose(self, env_var, stored):
+        env_value = self.environ.get(env_var, "")
+        if self.prefer_store and stored:
+            return stored, self.store.name
+        if env_value:
+            return env_value, "env"
+        if stored:
+            return stored, self.store.name
+        return "", ""
+
+
+_DEFAULT = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_resolver():
+    """The process-wide SecretResolver (created on first use)."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = SecretResolver()
+        return _DEFAULT
+
+
+def resolve(services):
+    """Batch-resolve services with the process-wide resolver."""
+    return default_resolver().resolve(services)
+
+
+def read_secret(service, env_var=None):
+    """Return (value, source) for one service with the process-wide resolver."""
+    return default_resolver().get(service, env_var)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report which secrets resolve (values are never printed).")
+    parser.add_argument("services", nargs="*", help=f"Keychain services (default: {', '.join(SECRETS)})")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+                        help="Secret store (default: $MDE_SECRET_BACKEND or keychain)")
+    parser.add_argument("--env-first", action="store_true",
+                        help="Prefer the environment over the store, whatever MDE_SECRET_OVERRIDE says")
+    parser.add_argument("--any-account", action="store_true",
+                        help="Match Keychain items of any account, not only $USER's")
+    args = parser.parse_args()
+
+    store = BACKENDS[args.backend]() if args.backend else default_backend()
+    services = args.services or list(SECRETS)
+    resolver = SecretResolver(store, account="" if args.any_account else None,
+                              prefer_store=False if args.env_first else None)
+    resolved = resolver.resolve(services)
+    failures = 0
+    for service in services:
+        _, source = resolved[service]
+        if source == "env":
+            print(f"secret ok (env): {env_var_for(service)}")
+        elif source:
+            print(f"secret ok ({source}): {service}")
+        else:
+            print(f"secret missing: {env_var_for(service)} ({service})")
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,485 @@
+"""Shared helpers for the API key verification scripts (verify-*.py)."""
+import hashlib
+import http.client
+import json
+import math
+import os
+import socket
+import ssl
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+from mde_secrets import read_secret, resolve
+
+TIMEOUT = 15
+
+# Verification results are cached here for VERIFY_TTL seconds (invalid keys
+# for VERIFY_NEGATIVE_TTL); only fingerprints are stored, never keys.
+CACHE_PATH = os.environ.get("MDE_VERIFY_CACHE") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "macos-development-environment",
+    "verify-keys.json",
+)
+VERIFY_TTL = float(os.environ.get("MDE_VERIFY_TTL", "3600"))
+VERIFY_NEGATIVE_TTL = float(os.environ.get("MDE_VERIFY_NEGATIVE_TTL", "300"))
+
+# name -> key env var, Keychain service, base URL env var, default base URL
+PROVIDERS = {
+    "openai": {
+        "env": "OPENAI_API_KEY",
+        "service": "mde-openai-api-key",
+        "base_env": "OPENAI_BASE_URL",
+        "base_url": "https://api.openai.com/v1",
+    },
+    "anthropic": {
+        "env": "ANTHROPIC_API_KEY",
+        "service": "mde-anthropic-api-key",
+        "base_env": "ANTHROPIC_BASE_URL",
+        "base_url": "https://api.anthropic.com/v1",
+    },
+    "gemini": {
+        "env": "GEMINI_API_KEY",
+        "service": "mde-gemini-api-key",
+        "base_env": "GEMINI_BASE_URL",
+        "base_url": "https://generativelanguage.googleapis.com/v1beta",
+    },
+}
+
+
+def read_key(env_var, service):
+    return read_secret(service, env_var)
+
+
+def prefetch_keys(names):
+    """Resolve the keys of every provider in `names` in one batch."""
+    resolve([PROVIDERS[name]["service"] for name in names])
+
+
+def base_url(name):
+    provider = PROVIDERS[name]
+    return (os.environ.get(provider["base_env"]) or provider["base_url"]).rstrip("/")
+
+
+def auth_headers(name, key, project=None):
+    if name == "anthropic":
+        return {"x-api-key": key, "anthropic-version": "2023-06-01", "content-type": "application/json"}
+    if name == "gemini":
+        return {"x-goog-api-key": key}
+    headers = {"Authorization": f"Bearer {key}"}
+    if project is None:
+        project = os.environ.get("OPENAI_PROJECT", "")
+    if project:
+        headers["OpenAI-Project"] = project
+    return headers
+
+
+class UrllibClient:
+    """GET through urllib.request, one connection per request.
+
+    Honors HTTP(S)_PROXY/NO_PROXY and follows redirects, as the
+    single-provider verify scripts always have; they send one request, so
+    keep-alive would buy nothing.
+    """
+
+    def __init__(self, timeout=TIMEOUT):
+        self.timeout = timeout
+
+    def get(self, url, headers):
+        """Return (status, body) for a GET, or (None, error) if it failed."""
+        req = urllib.request.Request(url, headers=headers, method="GET")
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read().decode("utf-8", "ignore")
+        except urllib.error.HTTPError as exc:
+            try:
+                body = exc.read().decode("utf-8", "ignore")
+            except Exception:
+                body = ""
+            return exc.code, body
+        except Exception as exc:
+            return None, str(exc)
+
+
+class KeepAliveClient:
+    """GET over persistent HTTP(S) connections, reused per host across threads.
+
+    Proxies come from urllib.request.getproxies() (HTTP(S)_PROXY, or the
+    system settings) unless proxy_bypass() exempts the host (NO_PROXY):
+    https is tunnelled with CONNECT, http sent to the proxy as absolute
+    URLs. Redirects are not followed. An idle connection the server has
+    closed is reopened once.
+    """
+
+    def __init__(self, timeout=TIMEOUT):
+        self.timeout = timeout
+        self._proxies = urllib.request.getproxies()
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, headers):
+        """Return (status, body) for a GET, or (None, error) if it failed."""
+        parts = urlsplit(url)
+        host = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        proxy = self._proxy(*host)
+        if proxy and parts.scheme == "http":
+            path = f"http://{parts.netloc}{path}"
+            headers = dict(headers, **proxy_headers(proxy))
+        for attempt in (0, 1):
+            conn, reused = self._checkout(host, proxy)
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except (http.client.HTTPException, ConnectionError) as exc:
+                conn.close()
+                if attempt or not reused:
+                    return None, str(exc)
+                continue
+            except OSError as exc:
+                conn.close()
+                return None, str(exc)
+            if resp.will_close:
+                conn.close()
+            else:
+                self._checkin(host, conn)
+            return resp.status, body.decode("utf-8", "ignore")
+        return None, "request failed"
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+    def _proxy(self, scheme, netloc):
+        return proxy_for(scheme, netloc, self._proxies)
+
+    def _checkout(self, host, proxy=None):
+        with self._lock:
+            idle = self._idle.get(host)
+            if idle:
+                return idle.pop(), True
+        scheme, netloc = host
+        if proxy:
+            address = urlsplit(proxy)
+            target, netloc = netloc, f"{address.hostname}:{address.port or 80}"
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            if proxy:
+                conn.set_tunnel(target, headers=proxy_headers(proxy))
+            return conn, False
+        return http.client.HTTPConnection(netloc, timeout=self.timeout), False
+
+    def _checkin(self, host, conn):
+        with self._lock:
+            self._idle.setdefault(host, []).append(conn)
+
+
+def proxy_for(scheme, netloc, proxies=None):
+    """Return the proxy URL for a host, or None to connect directly.
+
+    `proxies` defaults to urllib.request.getproxies() (HTTP(S)_PROXY or the
+    system settings); proxy_bypass() exempts hosts (NO_PROXY).
+    """
+    proxy = (urllib.request.getproxies() if proxies is None else proxies).get(scheme)
+    if not proxy or urllib.request.proxy_bypass(netloc):
+        return None
+    return proxy if "://" in proxy else "http://" + proxy
+
+
+def proxy_headers(proxy):
+    """Proxy-Authorization for a proxy URL with user:password, else nothing."""
+    address = urlsplit(proxy)
+    if address.username is None:
+        return {}
+    pair = f"{unquote(address.username)}:{unquote(address.password or '')}"
+    return {"Proxy-Authorization": "Basic " + b64encode(pair.encode()).decode()}
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def fingerprint(name, key, base, project=""):
+    """Identify a (provider, key, base URL, project) check without storing the key."""
+    return sha256("\0".join((name, key, base, project or "")))
+
+
+class ResultCache:
+    """Verification results by fingerprint, kept in a JSON file between runs.
+
+    Valid keys are trusted for `ttl` seconds and rejected ones (401/403)
+    for `negative_ttl`; anything else (timeouts, 429, 5xx) is never
+    cached. Call save() once after a batch of put()s.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=VERIFY_TTL, negative_ttl=VERIFY_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(path) as handle:
+                self._entries = json.load(handle)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, fp):
+        """Return (entry, age) for a fresh entry, or (None, None)."""
+        with self._lock:
+            entry = self._entries.get(fp)
+        if not isinstance(entry, dict):
+            return None, None
+        age = time.time() - entry.get("checked", 0)
+        if 0 <= age < (self.ttl if entry.get("ok") else self.negative_ttl):
+            return entry, age
+        return None, None
+
+    def put(self, fp, result):
+        if not result["ok"] and result["status"] not in (401, 403):
+            return
+        with self._lock:
+            self._entries[fp] = {"ok": result["ok"], "status": result["status"],
+                                 "error": result["error"], "checked": time.time()}
+            self._dirty = True
+
+    def save(self):
+        """Write the cache atomically (mode 600), dropping expired entries."""
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            longest = max(self.ttl, self.negative_ttl)
+            entries = {fp: e for fp, e in self._entries.items()
+                       if isinstance(e, dict) and now - e.get("checked", 0) < longest}
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+                with os.fdopen(fd, "w") as handle:
+                    json.dump(entries, handle)
+                os.replace(tmp, self.path)
+            except OSError:
+                return
+            self._dirty = False
+
+
+def verify(name, client, key=None, source="", base=None, project=None, cache=None, force=False):
+    """Check one provider's key against {base}/models; return a result dict.
+
+    The key is looked up (read_key) unless given; "configured" is False
+    when there is none. With a ResultCache, a fresh cached answer is
+    returned ("cached" set) unless `force`, and new answers are stored.
+    """
+    provider = PROVIDERS[name]
+    if key is None:
+        key, source = read_key(provider["env"], provider["service"])
+    base = (base or base_url(name)).rstrip("/")
+    result = {"provider": name, "configured": bool(key), "source": source, "base_url": base,
+              "ok": False, "status": None, "seconds": 0.0, "error": "", "cached": False}
+    if not key:
+        result["error"] = f"{provider['env']} missing (env or keychain: {provider['service']})"
+        return result
+    if project is None and name == "openai":
+        project = os.environ.get("OPENAI_PROJECT", "")
+    fp = fingerprint(name, key, base, project) if cache is not None else None
+    if fp and not force:
+        entry, age = cache.get(fp)
+        if entry is not None:
+            result.update(ok=entry["ok"], status=entry["status"], error=entry["error"],
+                          cached=True, age=round(age, 1))
+            return result
+    start = time.perf_counter()
+    status, body = client.get(f"{base}/models", auth_headers(name, key, project))
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    result["status"] = status
+    result["ok"] = status == 200
+    if not result["ok"]:
+        result["error"] = body[:300].strip()
+    if fp:
+        cache.put(fp, result)
+    return result
+
+
+def verify_all(names, client, bases=None, cache=None, force=False):
+    """Verify every provider in `names` concurrently; results keep `names` order."""
+    bases = bases or {}
+    prefetch_keys(names)
+    with ThreadPoolExecutor(max_workers=max(1, len(names))) as pool:
+        results = list(pool.map(
+            lambda name: verify(name, client, base=bases.get(name), cache=cache, force=force), names
+        ))
+    if cache is not None:
+        cache.save()
+    return results
+
+
+# Phases timed by timed_get(); all but "total" are individual durations.
+PROBE_PHASES = ("dns", "connect", "tls", "ttfb", "total")
+PERCENTILES = (50, 90, 99)
+
+
+def timed_get(url, headers, timeout=TIMEOUT):
+    """GET over a fresh connection, timing DNS, connect, TLS, first byte and total.
+
+    Returns {"status", "error", "dns", "connect", "tls", "ttfb", "total"}
+    in seconds; ttfb runs from sending the request to the response
+    headers, tls is 0 for http URLs, and phases not reached stay None.
+    Proxies are used like KeepAliveClient does: dns and connect then time
+    the proxy, connect including the CONNECT tunnel for https.
+    """
+    parts = urlsplit(url)
+    https = parts.scheme == "https"
+    port = parts.port or (443 if https else 80)
+    path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+    proxy = proxy_for(parts.scheme, parts.netloc)
+    host = parts.hostname
+    if proxy:
+        address = urlsplit(proxy)
+        host, port = address.hostname, address.port or 80
+        if not https:
+            path = f"http://{parts.netloc}{path}"
+            headers = dict(headers, **proxy_headers(proxy))
+    sample = dict.fromkeys(PROBE_PHASES)
+    sample.update(status=None, error="")
+    start = time.perf_counter()
+    mark = start
+    sock = None
+
+    def lap(phase):
+        nonlocal mark
+        now = time.perf_counter()
+        sample[phase] = now - mark
+        mark = now
+
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        lap("dns")
+        for family, socktype, proto, _, address in infos:
+            sock = socket.socket(family, socktype, proto)
+            sock.settimeout(timeout)
+            try:
+                sock.connect(address)
+                break
+            except OSError:
+                sock.close()
+                if address == infos[-1][4]:
+                    raise
+        if proxy and https:
+            open_tunnel(sock, f"{parts.hostname}:{parts.port or 443}", proxy)
+        lap("connect")
+        if https:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+            lap("tls")
+        else:
+            sample["tls"] = 0.0
+        conn = (http.client.HTTPSConnection if https else http.client.HTTPConnection)(
+            parts.netloc, timeout=timeout
+        )
+        conn.sock = sock
+        conn.request("GET", path, headers=headers)
+        resp = conn.getresponse()
+        lap("ttfb")
+        resp.read()
+        sample["status"] = resp.status
+    except (OSError, http.client.HTTPException) as exc:
+        sample["error"] = str(exc) or type(exc).__name__
+    finally:
+        if sock is not None:
+            sock.close()
+    sample["total"] = time.perf_counter() - start if not sample["error"] else None
+    return sample
+
+
+def open_tunnel(sock, target, proxy):
+    """Ask the proxy on `sock` to CONNECT to target (host:port); raise OSError if refused."""
+    request = f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n"
+    for name, value in proxy_headers(proxy).items():
+        request += f"{name}: {value}\r\n"
+    sock.sendall((request + "\r\n").encode("latin-1"))
+    # Read only the proxy's reply headers; the tunnel is silent until the TLS handshake.
+    reply = b""
+    while b"\r\n\r\n" not in reply:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise ConnectionError("proxy closed the connection during CONNECT")
+        reply += chunk
+    status_line = reply.split(b"\r\n", 1)[0].decode("latin-1")
+    if status_line.split(" ")[1:2] != ["200"]:
+        raise ConnectionError(f"proxy CONNECT failed: {status_line}")
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def probe(name, key, base, count, concurrency=1, project=None, timeout=TIMEOUT):
+    """Send `count` timed GETs to {base}/models, `concurrency` at a time; return the samples."""
+    url = f"{base.rstrip('/')}/models"
+    headers = auth_headers(name, key, project)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return list(pool.map(lambda _: timed_get(url, headers, timeout), range(count)))
+
+
+def summarize_probe(samples):
+    """Return {"requests", "errors", "statuses", "phases": {phase: {p50, p90, p99, max}}} in ms.
+
+    Errors are requests without a response (DNS, connect, TLS or read
+    failures); their partial timings are left out of the percentiles.
+    HTTP statuses are counted separately.
+    """
+    answered = [s for s in samples if not s["error"]]
+    statuses = {}
+    for s in answered:
+        statuses[str(s["status"])] = statuses.get(str(s["status"]), 0) + 1
+    phases = {}
+    for phase in PROBE_PHASES:
+        ordered = sorted(s[phase] * 1000 for s in answered)
+        if ordered:
+            phases[phase] = {f"p{pct}": round(percentile(ordered, pct), 2) for pct in PERCENTILES}
+            phases[phase]["max"] = round(ordered[-1], 2)
+    errors = sorted({s["error"] for s in samples if s["error"]})
+    return {"requests": len(samples), "errors": len(samples) - len(answered),
+            "error_messages": errors[:5], "statuses": statuses, "phases": phases}
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--force", action="store_true", help="Ignore cached results and re-check")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the result cache")
+    parser.add_argument("--ttl", type=float, default=VERIFY_TTL,
+                        help=f"Seconds a valid result is reused (default: $MDE_VERIFY_TTL or {VERIFY_TTL:g})")
+    parser.add_argument("--negative-ttl", type=float, default=VERIFY_NEGATIVE_TTL,
+                        help="Seconds a rejected-key result is reused "
+                             f"(default: $MDE_VERIFY_NEGATIVE_TTL or {VERIFY_NEGATIVE_TTL:g})")
+
+
+def cache_from_args(args):
+    if args.no_cache:
+        return None
+    return ResultCache(ttl=args.ttl, negative_ttl=args.negative_ttl)
+
+
+def print_result(result, label=None):
+    """Print a result the way the single-provider verify scripts always have."""
+    label = label or result["source"]
+    if result.get("cached"):
+        label += f", cached {result['age']:.0f}s ago"
+    if result["ok"]:
+        print(f"ok: {result['provider']} key valid ({label})")
+        print(f"status: {result['status']}")
+        return
+    print(f"error: {result['provider']} key invalid ({label})")
+    print(f"status: {result['status']}")
+    if result["error"]:
+        print(f"response: {result['error']}")
@@ -31,6 +31,16 @@ check_secret() {
 
 main() {
   local failures=0
+  local script_dir
+  script_dir="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
+  # One batched lookup (no process per secret) when python3 is available,
+  # with the same precedence and lookup as check_secret: env first, then
+  # Keychain items of any account.
+  if have_cmd python3 && [[ -f "$script_dir/mde_secrets.py" ]]; then
+    python3 "$script_dir/mde_secrets.py" --env-first --any-account | while IFS= read -r line; do log "$line"; done
+    return
+  fi
 
   check_secret "mde-github-token" GITHUB_TOKEN || failures=1
   check_secret "mde-openai-api-key" OPENAI_API_KEY || failures=1
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 import argparse
 import hashlib
+import json
 import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from mde_secrets import BACKENDS, default_backend, parse_env_lines, service_for
+
+# Default --concurrency of --bulk writes.
+BULK_CONCURRENCY = 4
 
 
 def read_value(args):
@@ -18,15 +25,119 @@ def sha256(text):
     return hashlib.sha256(text.encode()).hexdigest()
 
 
+def parse_bulk(text):
+    """Return {service: value} from an env file or a JSON object on stdin.
+
+    Keys are Keychain services (mde-openai-api-key) or environment
+    variables (OPENAI_API_KEY -> mde-openai-api-key).
+    """
+    if text.lstrip().startswith("{"):
+        data = json.loads(text)
+        if not isinstance(data, dict) or not all(isinstance(v, str) for v in data.values()):
+            raise ValueError("JSON input must be an object of string values")
+    else:
+        data = parse_env_lines(text.splitlines())
+    return {(service_for(key) if key.isupper() else key): value.strip() for key, value in data.items()}
+
+
+def plan_bulk(store, entries, account):
+    """Compare SHA-256 fingerprints with the stored values (one batched lookup).
+
+    Returns [(service, action)] with action added, updated, unchanged or
+    skipped (empty value).
+    """
+    current = store.lookup(list(entries), account)
+    plan = []
+    for service, value in entries.items():
+        stored = current.get(service, "")
+        if not value:
+            action = "skipped"
+        elif not stored:
+            action = "added"
+        elif sha256(stored) == sha256(value):
+            action = "unchanged"
+        else:
+            action = "updated"
+        plan.append((service, action))
+    return plan
+
+
+def apply_bulk(store, entries, plan, account, concurrency, verify=True):
+    """Write added/updated entries, `concurrency` at a time; return {service: error}."""
+    changed = [service for service, action in plan if action in ("added", "updated")]
+
+    def write(service):
+        try:
+            store.store(service, entries[service], account)
+        except Exception as exc:
+            return service, str(exc) or type(exc).__name__
+        return service, None
+
+    errors = {}
+    if changed:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(changed)))) as pool:
+            errors = {service: error for service, error in pool.map(write, changed) if error}
+    written = [service for service in changed if service not in errors]
+    if verify and written:
+        stored = store.lookup(written, account)
+        for service in written:
+            if sha256(stored.get(service, "")) != sha256(entries[service]):
+                errors[service] = "stored secret does not match input"
+    return errors
+
+
+def bulk_main(parser, args):
+    try:
+        entries = parse_bulk(sys.stdin.read())
+    except ValueError as exc:
+        parser.error(f"--bulk: {exc}")
+    if not entries:
+        parser.error("--bulk: no secrets on stdin")
+    store = BACKENDS[args.backend]() if args.backend else default_backend()
+
+    plan = plan_bulk(store, entries, args.account)
+    errors = {} if args.dry_run else apply_bulk(
+        store, entries, plan, args.account, args.concurrency, verify=not args.no_verify
+    )
+    counts = {action: 0 for action in ("added", "updated", "unchanged", "skipped")}
+    for service, action in plan:
+        if service in errors:
+            print(f"error: {service}: {errors[service]}", file=sys.stderr)
+            continue
+        counts[action] += 1
+        print(f"{action}: {service}" + (" (dry run)" if args.dry_run and action in ("added", "updated") else ""))
+
+    summary = ", ".join(f"{count} {action}" for action, count in counts.items())
+    if errors:
+        print(f"error: {len(errors)} failed; {summary}", file=sys.stderr)
+        return 1
+    print(f"ok: {summary} ({store.name})")
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(description="Set a Keychain generic password from stdin or --value.")
-    parser.add_argument("--service", required=True, help="Keychain service name, e.g. mde-openai-api-key")
+    parser.add_argument("--service", help="Keychain service name, e.g. mde-openai-api-key")
     parser.add_argument("--account", default=os.environ.get("USER", ""), help="Keychain account (default: $USER)")
     parser.add_argument("--stdin", action="store_true", help="Read secret from stdin")
     parser.add_argument("--value", help="Secret value (avoid shell history)")
     parser.add_argument("--no-verify", action="store_true", help="Skip read-back hash verification")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Import an env file or JSON map from stdin, writing only changed secrets")
+    parser.add_argument("--dry-run", action="store_true", help="With --bulk, show the changes without writing")
+    parser.add_argument("--concurrency", type=int, default=BULK_CONCURRENCY,
+                        help=f"Parallel writes with --bulk (default: {BULK_CONCURRENCY})")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+                        help="Secret store for --bulk (default: $MDE_SECRET_BACKEND or keychain)")
     args = parser.parse_args()
 
+    if args.bulk:
+        if args.service or args.value is not None:
+            parser.error("--bulk reads every secret from stdin; drop --service/--value")
+        return bulk_main(parser, args)
+    if not args.service:
+        parser.error("--service is required (or use --bulk)")
+
     value = read_value(args)
     if not value:
         parser.error("secret is empty; provide --stdin or --value")
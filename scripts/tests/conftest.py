@@ -0,0 +1,229 @@
+"""Shared helpers for the scripts/ tests (run with: python3 -m pytest scripts/tests).
+
+StubApi stands in for a provider API (GET .../models answers 200 for the key
+"good" and 401 for anything else) and StubProxy for an HTTP(S)_PROXY, so the
+verify scripts run without network access.
+"""
+
+import importlib.util
+import json
+import os
+import shutil
+import socket
+import socketserver
+import ssl
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import mde_secrets  # noqa: E402
+
+GOOD_KEY = "good"
+
+
+def load_script(filename):
+    """Import a script whose file name is not a module name (verify-keys.py)."""
+    name = filename[:-len(".py")].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        # Through an http proxy the request line carries the absolute URL.
+        path = urlsplit(self.path).path
+        with self.server.lock:
+            self.server.requests.append((path, dict(self.headers)))
+        time.sleep(self.server.delay)
+        keys = {self.headers.get("Authorization"), self.headers.get("x-api-key"),
+                self.headers.get("x-goog-api-key")}
+        if self.server.status:
+            status = self.server.status
+        elif not path.endswith("/models"):
+            status = 404
+        else:
+            status = 200 if keys & {f"Bearer {GOOD_KEY}", GOOD_KEY} else 401
+        body = json.dumps({"data": []} if status == 200 else {"error": f"status {status}"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Hang up without announcing it, like an idle timeout on the server.
+        self.close_connection = self.server.drop_idle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubApi(ThreadingHTTPServer):
+    """Keep-alive HTTP(S) server counting connections and requests.
+
+    Set `delay` to hold every response, `status` to answer every request
+    with that status and `drop_idle` to close connections after each
+    response without a Connection: close header.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, cert=None):
+        super().__init__(("127.0.0.1", 0), StubApiHandler)
+        self.scheme = "http"
+        if cert:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*cert)
+            self.socket = context.wrap_socket(self.socket, server_side=True)
+            self.scheme = "https"
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = []
+        self.delay = 0.0
+        self.status = None
+        self.drop_idle = False
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"{self.scheme}://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class StubProxyHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        head = []
+        while True:
+            line = self.rfile.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            head.append(line.decode("latin-1").rstrip("\r\n"))
+        if not head:
+            return
+        method, target, _ = head[0].split(" ", 2)
+        headers = dict(line.split(": ", 1) for line in head[1:])
+        with self.server.lock:
+            self.server.requests.append((method, target, headers))
+        if method == "CONNECT":
+            host, port = target.rsplit(":", 1)
+            upstream = socket.create_connection((host, int(port)))
+            self.wfile.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        else:
+            # Forward the absolute-URL request as is; StubApi accepts it.
+            address = urlsplit(target)
+            upstream = socket.create_connection((address.hostname, address.port))
+            upstream.sendall(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        self.wfile.flush()
+        pump = threading.Thread(target=relay, args=(upstream, self.connection), daemon=True)
+        pump.start()
+        relay(self.connection, upstream, self.rfile)
+        pump.join()
+        upstream.close()
+
+
+def relay(source, target, reader=None):
+    """Copy bytes from `source` (or its buffered `reader`) to `target` until EOF."""
+    try:
+        while True:
+            data = reader.read1(65536) if reader else source.recv(65536)
+            if not data:
+                break
+            target.sendall(data)
+    except OSError:
+        pass
+    try:
+        target.shutdown(socket.SHUT_WR)
+    except OSError:
+        pass
+
+
+class StubProxy(socketserver.ThreadingTCPServer):
+    """Forward proxy: CONNECT tunnels and absolute-URL http requests.
+
+    Records (method, target, headers) of every request it receives.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubProxyHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def url(self, credentials=""):
+        return f"http://{credentials}127.0.0.1:{self.server_address[1]}"
+
+
+@pytest.fixture
+def api():
+    server = StubApi()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="session")
+def tls_cert(tmp_path_factory):
+    """A self-signed certificate for 127.0.0.1 as (cert, key) paths."""
+    if not shutil.which("openssl"):
+        pytest.skip("openssl is not installed")
+    directory = tmp_path_factory.mktemp("tls")
+    cert, key = str(directory / "cert.pem"), str(directory / "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return cert, key
+
+
+@pytest.fixture
+def tls_api(tls_cert, monkeypatch):
+    """StubApi over HTTPS, with its certificate trusted by default SSL contexts."""
+    monkeypatch.setenv("SSL_CERT_FILE", tls_cert[0])
+    server = StubApi(tls_cert)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def proxy():
+    server = StubProxy()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_proxy_env(monkeypatch):
+    """Start every test without proxy settings from the environment."""
+    for name in ("http_proxy", "https_proxy", "all_proxy", "no_proxy"):
+        monkeypatch.delenv(name, raising=False)
+        monkeypatch.delenv(name.upper(), raising=False)
+
+
+@pytest.fixture
+def secrets(monkeypatch):
+    """Install a process-wide resolver over a MemoryBackend; returns its values dict."""
+    store = mde_secrets.MemoryBackend()
+    monkeypatch.setattr(mde_secrets, "_DEFAULT",
+                        mde_secrets.SecretResolver(store, environ={}, account="test"))
+    return store.values
@@ -0,0 +1,101 @@
+import sys
+
+import pytest
+
+import mde_secrets
+from mde_secrets import MemoryBackend, SecretResolver
+
+OPENAI = "mde-openai-api-key"
+GITHUB = "mde-github-token"
+
+
+class RecordingBackend(MemoryBackend):
+    """MemoryBackend that also records each lookup's services and account."""
+
+    def __init__(self, values=None):
+        super().__init__(values)
+        self.calls = []
+
+    def lookup(self, services, account):
+        self.calls.append((list(services), account))
+        return super().lookup(services, account)
+
+
+def test_resolve_is_one_lookup_per_batch():
+    store = RecordingBackend({OPENAI: "sk-store"})
+    resolver = SecretResolver(store, environ={"USER": "me"})
+    resolved = resolver.resolve([OPENAI, GITHUB, OPENAI])
+    assert resolved == {OPENAI: ("sk-store", "memory"), GITHUB: ("", "")}
+    assert store.calls == [([OPENAI, GITHUB], "me")]
+
+
+def test_answers_are_memoized_across_get_and_resolve():
+    store = RecordingBackend({OPENAI: "sk-store", GITHUB: "ghp-store"})
+    resolver = SecretResolver(store, environ={})
+    assert resolver.get(OPENAI) == ("sk-store", "memory")
+    resolver.resolve([OPENAI, GITHUB])
+    resolver.resolve([GITHUB])
+    assert resolver.get(GITHUB) == ("ghp-store", "memory")
+    # Only the service not seen before is looked up; a miss is remembered too.
+    assert [services for services, _ in store.calls] == [[OPENAI], [GITHUB]]
+    resolver.get("mde-gemini-api-key")
+    resolver.get("mde-gemini-api-key")
+    assert store.lookups == 3
+
+
+@pytest.mark.parametrize("override,prefer_store,expected", [
+    (None, None, ("sk-store", "memory")),
+    ("1", None, ("sk-store", "memory")),
+    ("0", None, ("sk-env", "env")),
+    ("1", False, ("sk-env", "env")),
+    ("0", True, ("sk-store", "memory")),
+])
+def test_precedence(override, prefer_store, expected):
+    environ = {"OPENAI_API_KEY": "sk-env"}
+    if override is not None:
+        environ["MDE_SECRET_OVERRIDE"] = override
+    resolver = SecretResolver(MemoryBackend({OPENAI: "sk-store"}), environ=environ,
+                              prefer_store=prefer_store)
+    assert resolver.get(OPENAI) == expected
+
+
+@pytest.mark.parametrize("prefer_store", [None, False])
+def test_either_source_fills_in_for_the_other(prefer_store):
+    resolver = SecretResolver(MemoryBackend({OPENAI: "sk-store"}),
+                              environ={"GITHUB_TOKEN": "ghp-env"}, prefer_store=prefer_store)
+    assert resolver.resolve([OPENAI, GITHUB]) == {
+        OPENAI: ("sk-store", "memory"),
+        GITHUB: ("ghp-env", "env"),
+    }
+
+
+def test_main_env_first_any_account(monkeypatch, capsys):
+    store = RecordingBackend({OPENAI: "sk-store"})
+    monkeypatch.setitem(mde_secrets.BACKENDS, "memory", lambda: store)
+    monkeypatch.setenv("MDE_SECRET_OVERRIDE", "1")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-env")
+    monkeypatch.setenv("USER", "me")
+    monkeypatch.setattr(sys, "argv", ["mde_secrets.py", "--backend", "memory",
+                                      "--env-first", "--any-account", OPENAI])
+    assert mde_secrets.main() == 0
+    assert capsys.readouterr().out == "secret ok (env): OPENAI_API_KEY\n"
+    assert store.calls == [([OPENAI], "")]
+
+
+def test_main_reports_missing_secrets(monkeypatch, capsys):
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    monkeypatch.setattr(sys, "argv", ["mde_secrets.py", "--backend", "memory", GITHUB])
+    assert mde_secrets.main() == 1
+    assert "secret missing: GITHUB_TOKEN (mde-github-token)" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("setting,loaded", [(None, False), ("0", False), ("1", True)])
+def test_keychain_framework_is_opt_in(monkeypatch, setting, loaded):
+    calls = []
+    monkeypatch.setattr(mde_secrets, "load_security_framework", lambda: calls.append(1))
+    if setting is None:
+        monkeypatch.delenv("MDE_KEYCHAIN_FRAMEWORK", raising=False)
+    else:
+        monkeypatch.setenv("MDE_KEYCHAIN_FRAMEWORK", setting)
+    mde_secrets.KeychainBackend()
+    assert bool(calls) == loaded
@@ -0,0 +1,74 @@
+import io
+import sys
+
+import pytest
+
+from conftest import load_script
+from mde_secrets import BACKENDS, MemoryBackend
+
+set_keychain_secret = load_script("set-keychain-secret.py")
+
+STORED = {"mde-openai-api-key": "sk-old", "mde-anthropic-api-key": "sk-same"}
+BULK = ("OPENAI_API_KEY=sk-new\nANTHROPIC_API_KEY=sk-same\n"
+        "GEMINI_API_KEY=sk-added\nTAVILY_API_KEY=\n")
+
+
+class DriftingBackend(MemoryBackend):
+    """Stores something other than what it was given, like a mangled write."""
+
+    def store(self, service, value, account):
+        super().store(service, value + "-mangled", account)
+
+
+@pytest.fixture
+def run_bulk(monkeypatch):
+    """Run `set-keychain-secret.py --bulk` on BULK against `store`; return the exit code."""
+    def run(store, *options):
+        monkeypatch.setitem(BACKENDS, "memory", lambda: store)
+        monkeypatch.setattr(sys, "stdin", io.StringIO(BULK))
+        monkeypatch.setattr(sys, "argv", ["set-keychain-secret.py", "--bulk", "--backend", "memory",
+                                          "--account", "test", *options])
+        return set_keychain_secret.main()
+    return run
+
+
+def test_plan_bulk_classifies_entries_with_one_lookup():
+    store = MemoryBackend(STORED)
+    plan = set_keychain_secret.plan_bulk(store, set_keychain_secret.parse_bulk(BULK), "test")
+    assert plan == [("mde-openai-api-key", "updated"), ("mde-anthropic-api-key", "unchanged"),
+                    ("mde-gemini-api-key", "added"), ("mde-tavily-api-key", "skipped")]
+    assert (store.lookups, store.writes) == (1, 0)
+
+
+def test_bulk_writes_only_changed_entries(run_bulk, capsys):
+    store = MemoryBackend(STORED)
+    assert run_bulk(store) == 0
+    assert store.values == dict(STORED, **{"mde-openai-api-key": "sk-new", "mde-gemini-api-key": "sk-added"})
+    assert store.writes == 2
+    # One lookup to plan, one to verify the writes.
+    assert store.lookups == 2
+    assert "ok: 1 added, 1 updated, 1 unchanged, 1 skipped (memory)" in capsys.readouterr().out
+
+
+def test_bulk_dry_run_writes_nothing(run_bulk, capsys):
+    store = MemoryBackend(STORED)
+    assert run_bulk(store, "--dry-run") == 0
+    assert (store.values, store.writes) == (STORED, 0)
+    out = capsys.readouterr().out
+    assert "updated: mde-openai-api-key (dry run)" in out
+    assert "added: mde-gemini-api-key (dry run)" in out
+
+
+def test_bulk_reports_failed_verification(run_bulk, capsys):
+    store = DriftingBackend(STORED)
+    assert run_bulk(store) == 1
+    err = capsys.readouterr().err
+    assert "error: mde-openai-api-key: stored secret does not match input" in err
+    assert "error: mde-gemini-api-key: stored secret does not match input" in err
+    assert "error: 2 failed; 0 added, 0 updated, 1 unchanged, 1 skipped" in err
+
+
+def test_bulk_no_verify_skips_the_read_back(run_bulk):
+    store = DriftingBackend(STORED)
+    assert run_bulk(store, "--no-verify") == 0
+    assert store.lookups == 1
@@ -0,0 +1,185 @@
+import json
+import sys
+import time
+from base64 import b64encode
+
+import pytest
+
+import mde_verify
+from conftest import GOOD_KEY, load_script
+from mde_verify import KeepAliveClient, ResultCache, verify, verify_all
+
+verify_keys = load_script("verify-keys.py")
+
+KEYS = {"mde-openai-api-key": GOOD_KEY, "mde-anthropic-api-key": GOOD_KEY,
+        "mde-gemini-api-key": GOOD_KEY}
+
+
+def test_verify_all_runs_providers_concurrently(api, secrets):
+    secrets.update(KEYS)
+    api.delay = 0.5
+    client = KeepAliveClient()
+    start = time.perf_counter()
+    results = verify_all(list(mde_verify.PROVIDERS), client,
+                         {name: api.url for name in mde_verify.PROVIDERS})
+    elapsed = time.perf_counter() - start
+    client.close()
+    assert [r["provider"] for r in results] == list(mde_verify.PROVIDERS)
+    assert all(r["ok"] and r["status"] == 200 for r in results)
+    # Three delayed responses, answered in about one delay, not three.
+    assert len(api.requests) == 3
+    assert elapsed < 2 * api.delay
+
+
+def test_keep_alive_client_reuses_one_connection(api):
+    client = KeepAliveClient()
+    for _ in range(5):
+        assert client.get(f"{api.url}/models", {"x-api-key": GOOD_KEY})[0] == 200
+    client.close()
+    assert api.connections == 1
+    assert len(api.requests) == 5
+
+
+def test_keep_alive_client_reopens_a_closed_connection(api):
+    api.drop_idle = True
+    client = KeepAliveClient()
+    for _ in range(3):
+        assert client.get(f"{api.url}/models", {"x-api-key": GOOD_KEY})[0] == 200
+    client.close()
+    assert api.connections == 3
+
+
+def test_base_url_option_overrides_the_environment(api, secrets, monkeypatch, capsys):
+    secrets["mde-openai-api-key"] = GOOD_KEY
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://127.0.0.1:9/unreachable")
+    monkeypatch.setattr(sys, "argv", ["verify-keys.py", "--provider", "openai", "--no-cache",
+                                      "--json", "--base-url", f"openai={api.url}"])
+    assert verify_keys.main() == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["ok"] and report["results"][0]["base_url"] == api.url
+    assert [(path, headers["Authorization"]) for path, headers in api.requests] == \
+        [("/v1/models", f"Bearer {GOOD_KEY}")]
+
+
+def test_base_url_option_rejects_unknown_providers(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["verify-keys.py", "--base-url", "nope=http://x"])
+    with pytest.raises(SystemExit) as exc:
+        verify_keys.main()
+    assert exc.value.code == 2
+
+
+def test_https_is_tunnelled_through_the_proxy(tls_api, proxy, monkeypatch):
+    monkeypatch.setenv("HTTPS_PROXY", proxy.url("user:p%40ss@"))
+    client = KeepAliveClient()
+    for _ in range(3):
+        assert client.get(f"{tls_api.url}/models", {"x-api-key": GOOD_KEY})[0] == 200
+    client.close()
+    # One CONNECT carries every request; the proxy never sees them.
+    target = tls_api.url.split("/")[2]
+    assert [(method, t) for method, t, _ in proxy.requests] == [("CONNECT", target)]
+    assert proxy.requests[0][2]["Proxy-Authorization"] == "Basic " + b64encode(b"user:p@ss").decode()
+    assert tls_api.connections == 1 and len(tls_api.requests) == 3
+
+
+def test_http_is_sent_to_the_proxy(api, proxy, monkeypatch):
+    monkeypatch.setenv("HTTP_PROXY", proxy.url())
+    client = KeepAliveClient()
+    assert client.get(f"{api.url}/models", {"x-api-key": GOOD_KEY})[0] == 200
+    client.close()
+    assert [(method, t) for method, t, _ in proxy.requests] == [("GET", f"{api.url}/models")]
+
+
+def test_no_proxy_bypasses_the_proxy(api, proxy, monkeypatch):
+    monkeypatch.setenv("HTTP_PROXY", proxy.url())
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    client = KeepAliveClient()
+    assert client.get(f"{api.url}/models", {"x-api-key": GOOD_KEY})[0] == 200
+    client.close()
+    assert proxy.requests == []
+
+
+@pytest.mark.parametrize("key,status", [("bad", 401), (GOOD_KEY, 200)])
+def test_results_are_cached_until_forced(api, tmp_path, key, status):
+    cache = ResultCache(str(tmp_path / "verify.json"))
+    client = KeepAliveClient()
+    first = verify("openai", client, key=key, base=api.url, cache=cache)
+    cache.save()
+    again = verify("openai", client, key=key, base=api.url, cache=ResultCache(cache.path))
+    forced = verify("openai", client, key=key, base=api.url, cache=cache, force=True)
+    client.close()
+    assert (first["status"], first["cached"]) == (status, False)
+    assert (again["status"], again["cached"]) == (status, True)
+    assert (forced["status"], forced["cached"]) == (status, False)
+    assert len(api.requests) == 2
+
+
+def test_negative_results_expire_sooner(api, tmp_path):
+    cache = ResultCache(str(tmp_path / "verify.json"), ttl=3600, negative_ttl=0)
+    client = KeepAliveClient()
+    verify("openai", client, key="bad", base=api.url, cache=cache)
+    assert not verify("openai", client, key="bad", base=api.url, cache=cache)["cached"]
+    client.close()
+    assert len(api.requests) == 2
+
+
+@pytest.mark.parametrize("status", [429, 500])
+def test_transient_failures_are_not_cached(api, tmp_path, status):
+    api.status = status
+    cache = ResultCache(str(tmp_path / "verify.json"))
+    client = KeepAliveClient()
+    for _ in range(2):
+        assert verify("openai", client, key=GOOD_KEY, base=api.url, cache=cache)["status"] == status
+    client.close()
+    assert len(api.requests) == 2
+
+
+def test_cache_never_stores_keys(api, tmp_path):
+    cache = ResultCache(str(tmp_path / "verify.json"))
+    verify("openai", KeepAliveClient(), key="sk-secret-value", base=api.url, cache=cache)
+    cache.save()
+    assert "sk-secret-value" not in (tmp_path / "verify.json").read_text()
+
+
+def test_probe_reports_phase_percentiles(api):
+    summary = mde_verify.summarize_probe(mde_verify.probe("openai", GOOD_KEY, api.url, 8, 4))
+    assert (summary["requests"], summary["errors"], summary["statuses"]) == (8, 0, {"200": 8})
+    assert set(summary["phases"]) == set(mde_verify.PROBE_PHASES)
+    for stats in summary["phases"].values():
+        assert stats["p50"] <= stats["p90"] <= stats["p99"] <= stats["max"]
+    assert summary["phases"]["tls"]["max"] == 0
+    # Every probe request opens its own connection.
+    assert api.connections == 8
+    assert not verify_keys.probe_failed(summary)
+
+
+def test_probe_fails_on_non_2xx_responses(api, secrets, monkeypatch, capsys):
+    secrets["mde-openai-api-key"] = "bad"
+    monkeypatch.setattr(sys, "argv", ["verify-keys.py", "--provider", "openai", "--probe", "3",
+                                      "--json", "--base-url", f"openai={api.url}"])
+    assert verify_keys.main() == 1
+    [report] = json.loads(capsys.readouterr().out)["probes"]
+    assert (report["errors"], report["statuses"]) == (0, {"401": 3})
+
+
+def test_probe_counts_transport_errors():
+    summary = mde_verify.summarize_probe(mde_verify.probe("openai", GOOD_KEY, "http://127.0.0.1:9/v1", 3))
+    assert (summary["requests"], summary["errors"], summary["statuses"]) == (3, 3, {})
+    assert summary["phases"] == {} and summary["error_messages"]
+    assert verify_keys.probe_failed(summary)
+
+
+def test_probe_sends_http_to_the_proxy(api, proxy, monkeypatch):
+    monkeypatch.setenv("HTTP_PROXY", proxy.url())
+    summary = mde_verify.summarize_probe(mde_verify.probe("openai", GOOD_KEY, api.url, 2))
+    assert summary["statuses"] == {"200": 2}
+    assert [(method, t) for method, t, _ in proxy.requests] == [("GET", f"{api.url}/models")] * 2
+
+
+def test_probe_tunnels_https_through_the_proxy(tls_api, proxy, monkeypatch):
+    monkeypatch.setenv("HTTPS_PROXY", proxy.url("user:p%40ss@"))
+    summary = mde_verify.summarize_probe(mde_verify.probe("openai", GOOD_KEY, tls_api.url, 2))
+    assert summary["statuses"] == {"200": 2} and summary["phases"]["tls"]["max"] > 0
+    target = tls_api.url.split("/")[2]
+    assert [(method, t) for method, t, _ in proxy.requests] == [("CONNECT", target)] * 2
+    assert proxy.requests[0][2]["Proxy-Authorization"] == "Basic " + b64encode(b"user:p@ss").decode()
+    assert len(tls_api.requests) == 2
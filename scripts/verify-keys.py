@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sys
+import time
+
+from mde_verify import (
+    PERCENTILES,
+    PROBE_PHASES,
+    PROVIDERS,
+    TIMEOUT,
+    KeepAliveClient,
+    add_cache_arguments,
+    base_url,
+    cache_from_args,
+    prefetch_keys,
+    probe,
+    read_key,
+    summarize_probe,
+    verify_all,
+)
+
+
+def parse_base_urls(parser, values):
+    bases = {}
+    for value in values:
+        name, sep, url = value.partition("=")
+        if not sep or name not in PROVIDERS or not url:
+            parser.error(f"--base-url expects PROVIDER=URL with PROVIDER in {', '.join(PROVIDERS)}")
+        bases[name] = url
+    return bases
+
+
+def run_probes(args, names, bases):
+    """Probe each provider in turn; return (report, exit code)."""
+    report = []
+    prefetch_keys(names)
+    for name in names:
+        provider = PROVIDERS[name]
+        key, source = read_key(provider["env"], provider["service"])
+        if not key:
+            if args.provider:
+                report.append({"provider": name, "error": f"{provider['env']} missing"})
+            continue
+        base = (bases.get(name) or base_url(name)).rstrip("/")
+        start = time.perf_counter()
+        samples = probe(name, key, base, args.probe, args.probe_concurrency, timeout=args.timeout)
+        summary = summarize_probe(samples)
+        summary.update(provider=name, source=source, base_url=base,
+                       concurrency=args.probe_concurrency,
+                       seconds=round(time.perf_counter() - start, 3))
+        report.append(summary)
+    if not report:
+        return report, 2
+    return report, 1 if any(probe_failed(r) for r in report) else 0
+
+
+def probe_failed(r):
+    """A probe fails on a missing key, a transport error or any non-2xx response."""
+    if r.get("error") or r["errors"]:
+        return True
+    statuses = r["statuses"]
+    return not statuses or any(not status.startswith("2") for status in statuses)
+
+
+def print_probes(report):
+    for r in report:
+        if r.get("error"):
+            print(f"error: {r['provider']}: {r['error']}")
+            continue
+        statuses = ", ".join(f"{status}x{count}" for status, count in sorted(r["statuses"].items()))
+        print(f"probe: {r['provider']} {r['base_url']} ({r['source']}): {r['requests']} request(s), "
+              f"{r['errors']} error(s), status {statuses or '-'}, concurrency {r['concurrency']}, "
+              f"{r['seconds']}s")
+        if r["phases"]:
+            print("  " + "phase".ljust(8) + "".join(f"p{pct}".rjust(10) for pct in PERCENTILES) + "max".rjust(10))
+            for phase in PROBE_PHASES:
+                stats = r["phases"].get(phase)
+                if stats:
+                    cells = [stats[f"p{pct}"] for pct in PERCENTILES] + [stats["max"]]
+                    print("  " + phase.ljust(8) + "".join(f"{value:.1f}ms".rjust(10) for value in cells))
+        for message in r["error_messages"]:
+            print(f"  error: {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Verify every configured provider API key concurrently via its /models endpoint."
+    )
+    parser.add_argument(
+        "--provider",
+        action="append",
+        choices=sorted(PROVIDERS),
+        help="Provider to check (repeatable; default: every provider with a key)",
+    )
+    parser.add_argument(
+        "--base-url",
+        action="append",
+        default=[],
+        metavar="PROVIDER=URL",
+        help="Override a provider's base URL (default: $OPENAI_BASE_URL, $ANTHROPIC_BASE_URL, ...)",
+    )
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help=f"Per-request timeout (default: {TIMEOUT})")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument(
+        "--probe",
+        type=int,
+        metavar="N",
+        help="Instead of verifying, send N timed requests per provider and report "
+             "DNS/connect/TLS/TTFB/total percentiles; exits 1 unless every response is 2xx",
+    )
+    parser.add_argument(
+        "--probe-concurrency",
+        type=int,
+        default=1,
+        metavar="C",
+        help="Probe requests in flight per provider (default: 1, sequential)",
+    )
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    bases = parse_base_urls(parser, args.base_url)
+    names = args.provider or list(PROVIDERS)
+    if args.probe is not None:
+        if args.probe < 1 or args.probe_concurrency < 1:
+            parser.error("--probe and --probe-concurrency must be at least 1")
+        report, status = run_probes(args, names, bases)
+        if args.json:
+            json.dump({"ok": status == 0, "probes": report}, sys.stdout, indent=2)
+            print()
+        else:
+            print_probes(report)
+            if not report:
+                print("error: no provider keys configured", file=sys.stderr)
+        return status
+    client = KeepAliveClient(args.timeout)
+    start = time.perf_counter()
+    results = verify_all(names, client, bases, cache_from_args(args), args.force)
+    elapsed = round(time.perf_counter() - start, 3)
+    client.close()
+
+    # Without --provider, providers that have no key are skipped, not failed.
+    checked = [r for r in results if r["configured"] or args.provider]
+    failed = [r for r in checked if not r["ok"]]
+    if args.json:
+        json.dump({"ok": bool(checked) and not failed, "seconds": elapsed, "results": results},
+                  sys.stdout, indent=2)
+        print()
+    else:
+        for r in results:
+            if not r["configured"]:
+                level = "error" if args.provider else "skip"
+                print(f"{level}: {r['provider']}: {r['error']}")
+            else:
+                timing = f"cached {r['age']:.0f}s ago" if r["cached"] else f"in {r['seconds']}s"
+                if r["ok"]:
+                    print(f"ok: {r['provider']} key valid ({r['source']}) status {r['status']} {timing}")
+                else:
+                    detail = f": {r['error']}" if r["error"] else ""
+                    print(f"error: {r['provider']} key invalid ({r['source']}) status {r['status']} {timing}{detail}")
+        print(f"checked {len(checked)} provider(s) in {elapsed}s")
+
+    if not checked:
+        if not args.json:
+            print("error: no provider keys configured", file=sys.stderr)
+        return 2
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
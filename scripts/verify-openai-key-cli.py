@@ -1,22 +1,8 @@
 #!/usr/bin/env python3
 import argparse
 import sys
-import urllib.error
-import urllib.request
 
-
-def http_status(req):
-    try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            return resp.status, ""
-    except urllib.error.HTTPError as exc:
-        try:
-            body = exc.read().decode("utf-8", "ignore")
-        except Exception:
-            body = ""
-        return exc.code, body[:300].strip()
-    except Exception as exc:
-        return None, str(exc)
+from mde_verify import UrllibClient, add_cache_arguments, cache_from_args, print_result, verify
 
 
 def main():
@@ -25,6 +11,7 @@ def main():
     parser.add_argument("--stdin", action="store_true", help="Read API key from stdin.")
     parser.add_argument("--base-url", default="https://api.openai.com/v1", help="Override API base URL.")
     parser.add_argument("--project", default="", help="Optional OpenAI project id (proj_...).")
+    add_cache_arguments(parser)
     args = parser.parse_args()
 
     if args.stdin:
@@ -38,23 +25,12 @@ def main():
         print("error: key is empty", file=sys.stderr)
         return 2
 
-    base = args.base_url.rstrip("/")
-    headers = {"Authorization": f"Bearer {key}"}
-    if args.project:
-        headers["OpenAI-Project"] = args.project
-
-    req = urllib.request.Request(f"{base}/models", headers=headers, method="GET")
-    status, body = http_status(req)
-    if status == 200:
-        print("ok: openai key valid (cli)")
-        print(f"status: {status}")
-        return 0
-
-    print("error: openai key invalid (cli)")
-    print(f"status: {status}")
-    if body:
-        print(f"response: {body}")
-    return 1
+    cache = cache_from_args(args)
+    result = verify("openai", UrllibClient(), key, "cli", args.base_url, args.project, cache, args.force)
+    if cache is not None:
+        cache.save()
+    print_result(result)
+    return 0 if result["ok"] else 1
 
 
 if __name__ == "__main__":